@@ -1,13 +1,29 @@
 import argparse
-import grasim.game as grasim
+import sys
+from grasim import batch, benchmark, cache, graph_generator, importers, record, server
 
 def start():
     parser = argparse.ArgumentParser("Grasim")
     parser.add_argument("-d", "--dir", help="Set directory of save files", type=str, default=".")
+    subparsers = parser.add_subparsers(dest="command")
+    batch.add_solve_parser(subparsers)
+    batch.add_check_parser(subparsers)
+    cache.add_compile_parser(subparsers)
+    graph_generator.add_generate_parser(subparsers)
+    benchmark.add_bench_parser(subparsers)
+    importers.add_import_parser(subparsers)
+    server.add_serve_parser(subparsers)
+    server.add_loadtest_parser(subparsers)
+    record.add_record_parser(subparsers)
 
     args = parser.parse_args()
 
+    if args.command is not None:
+        sys.exit(args.func(args))
+
+    # Imported here to keep pygame out of the headless commands
+    import grasim.game as grasim
     grasim.start_game(args.dir)
 
 if __name__ == "__main__":
-    start()
\ No newline at end of file
+    start()
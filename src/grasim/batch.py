@@ -0,0 +1,149 @@
+"""Solve and check many graphs without a display, used by `grasim solve` and `grasim check`"""
+import json
+import os
+import pathlib
+import sys
+import time
+from typing import Iterable, Iterator
+from grasim import savefile
+from grasim.dijkstra import dijkstra
+from grasim.dijkstra.heap import HeapSearch
+from grasim.dijkstra.bidirectional import BidirectionalSearch
+from grasim.errors import ParseError
+
+
+def find_saves(paths : Iterable[str]) -> list[pathlib.Path]:
+    """Expand directories to all .graph files below them"""
+    saves = []
+    for path in map(pathlib.Path, paths):
+        if path.is_dir():
+            saves.extend(sorted(x for x in path.rglob("*.graph") if x.is_file()))
+        else:
+            saves.append(path)
+    return saves
+
+def solve_file(path : str, dijkstra_mode : bool, engine : str = "heap", landmarks : int = 0) -> dict:
+    """
+    Parse a save and search until END is done or nothing is left to explore,
+    A* uses the heuristic of that many landmarks instead of the file if landmarks is set
+    """
+    result = {"file": str(path), "algorithm": "dijkstra" if dijkstra_mode else "astar"}
+    timings = result["time"] = {}
+
+    started = time.perf_counter()
+    try:
+        if pathlib.Path(path).suffix == ".npz":
+            from grasim import cache # cache imports this module
+            graph = cache.read_compiled(pathlib.Path(path))[0]
+        else:
+            graph = savefile.parse_file(path)
+        timings["parse"] = time.perf_counter() - started
+    except (OSError, ParseError, ValueError, KeyError) as e:
+        result["error"] = str(e)
+        return result
+
+    heuristics_to_start = None
+    if landmarks and not dijkstra_mode:
+        from grasim import cache # cache imports this module
+        started = time.perf_counter()
+        alt = cache.load_landmarks(path, graph, landmarks)
+        graph.heuristics = alt.heuristics(graph.end_idx)
+        heuristics_to_start = alt.heuristics_from(graph.start_idx)
+        timings["landmarks"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if engine == "heap":
+        search = HeapSearch(graph, dijkstra_mode)
+        dijkstra_table = search.dijkstra_table
+        step = search.step
+    elif engine == "bidirectional":
+        search = BidirectionalSearch(graph, dijkstra_mode, heuristics_to_start)
+        dijkstra_table = search.dijkstra_table
+        step = search.step
+    else:
+        dijkstra_table = dijkstra.init_dijkstra_table(graph.num_nodes, graph.start_idx)
+        step = lambda: dijkstra.dijkstra_step(dijkstra_table, graph, dijkstra_mode)
+    expanded = 0
+    while dijkstra_table[graph.end_idx, 2] != 1 and step():
+        expanded += 1
+    if engine == "bidirectional":
+        expanded = search.expanded # the last step joins the paths
+    timings["search"] = time.perf_counter() - started
+
+    path = dijkstra.extract_path(dijkstra_table, graph.start_idx, graph.end_idx)
+    names = graph.node_names
+    result["path"] = None if path is None else [names[idx] for idx in path]
+    result["cost"] = None if path is None else float(dijkstra_table[graph.end_idx, 0])
+    result["expanded"] = expanded
+    return result
+
+def solve_many(paths : list[pathlib.Path], dijkstra_mode : bool, workers : int | None = None,
+               engine : str = "heap", landmarks : int = 0) -> Iterator[dict]:
+    """Solve every save on a process pool, results are yielded as soon as they are done"""
+    if workers == 1:
+        for path in paths:
+            yield solve_file(str(path), dijkstra_mode, engine, landmarks)
+        return
+
+    # Imported here, the process pool takes longer to import than the rest of the module
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(solve_file, str(path), dijkstra_mode, engine, landmarks) for path in paths]
+        for future in as_completed(futures):
+            yield future.result()
+
+def solve_command(args) -> int:
+    saves = find_saves(args.paths)
+    failed = 0
+    for result in solve_many(saves, args.algorithm == "dijkstra", args.workers, args.engine, args.landmarks):
+        failed += "error" in result
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+    return 1 if failed else 0
+
+def check_file(path : str, from_coordinates : bool = False) -> dict:
+    """Every edge on which the heuristic is inconsistent, and the heuristic of END which has to be 0"""
+    result = {"file": str(path)}
+    try:
+        graph = savefile.parse_file(path)
+    except (OSError, ParseError) as e:
+        result["error"] = str(e)
+        return result
+
+    heuristics = graph.coordinate_heuristics() if from_coordinates else graph.heuristics
+    names = graph.node_names
+    sources = graph.edge_sources()
+    result["end_heuristic"] = float(heuristics[graph.end_idx])
+    result["inconsistent"] = [
+        {"from": names[sources[position]], "to": names[graph.indices[position]], "distance": float(graph.weights[position]),
+         "heuristic_from": float(heuristics[sources[position]]), "heuristic_to": float(heuristics[graph.indices[position]])}
+        for position in graph.inconsistent_edges(heuristics).tolist()
+    ]
+    return result
+
+def check_command(args) -> int:
+    failed = 0
+    for path in find_saves(args.paths):
+        result = check_file(str(path), args.from_coordinates)
+        failed += "error" in result or bool(result["inconsistent"]) or result["end_heuristic"] != 0
+        sys.stdout.write(json.dumps(result) + "\n")
+    return 1 if failed else 0
+
+def add_check_parser(subparsers):
+    parser = subparsers.add_parser("check", help="Report the edges on which the A* heuristic is inconsistent")
+    parser.add_argument("paths", nargs="+", help=".graph files or directories containing them")
+    parser.add_argument("--from-coordinates", action="store_true",
+                        help="Check the heuristic computed from the node coordinates instead of the one of the file")
+    parser.set_defaults(func=check_command)
+
+def add_solve_parser(subparsers):
+    parser = subparsers.add_parser("solve", help="Search graphs without a display and print JSON lines")
+    parser.add_argument("paths", nargs="+", help=".graph files or directories containing them")
+    parser.add_argument("-a", "--algorithm", choices=["astar", "dijkstra"], default="astar")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--engine", choices=["heap", "scan", "bidirectional"], default="heap",
+                        help="heap: HeapSearch, scan: dijkstra_step table scan, both expand the same nodes. "
+                             "bidirectional: search from START and END")
+    parser.add_argument("--landmarks", type=int, default=0, metavar="K",
+                        help="A* uses the distances to K landmarks as heuristic instead of the one in the file")
+    parser.set_defaults(func=solve_command)
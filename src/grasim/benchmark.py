@@ -0,0 +1,199 @@
+"""Timings of parsing, layout, search and rendering, used by `grasim bench`"""
+import io
+import json
+import os
+import pathlib
+import platform
+import sys
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Callable
+import numpy as np
+from grasim import graph_generator, layout, savefile
+from grasim.batch import find_saves
+from grasim.dijkstra import dijkstra
+from grasim.dijkstra.heap import HeapSearch
+from grasim.errors import ParseError
+
+# Increase when the results are no longer comparable to older ones
+BENCHMARK_VERSION = 1
+STAGES = ["parse", "layout", "search_scan", "search_heap", "render", "render_search"]
+SCREEN_SIZE = (1280, 720)
+
+
+@dataclass
+class BenchmarkCase:
+    name : str
+    lines : list[str]
+
+def shipped_cases(savedir : pathlib.Path) -> list[BenchmarkCase]:
+    """Every parseable save below savedir"""
+    cases = []
+    for save in find_saves([savedir]):
+        lines = save.read_text().split("\n")
+        try:
+            savefile.parse_text(lines)
+        except ParseError:
+            continue
+        cases.append(BenchmarkCase(str(save.relative_to(savedir)), lines))
+    return cases
+
+def generated_cases(sizes : list[int], kind : str = "knn", seed : int = 0) -> list[BenchmarkCase]:
+    cases = []
+    for size in sizes:
+        text = io.StringIO()
+        graph_generator.write_graph_text(graph_generator.generate_graph(kind, size, seed), text)
+        cases.append(BenchmarkCase(f"{kind}-{size}", text.getvalue().split("\n")))
+    return cases
+
+def measure(function : Callable, repeat : int) -> tuple[list[float], Any]:
+    """Seconds of every run and the result of the last one"""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        runs.append(time.perf_counter() - started)
+    return runs, result
+
+def _full_search(graph : savefile.WaypointGraph, step : Callable[[], bool], dijkstra_table : np.ndarray):
+    while dijkstra_table[graph.end_idx, 2] != 1 and step():
+        pass
+
+def _scan_search(graph : savefile.WaypointGraph):
+    dijkstra_table = dijkstra.init_dijkstra_table(graph.num_nodes, graph.start_idx)
+    _full_search(graph, lambda: dijkstra.dijkstra_step(dijkstra_table, graph, False), dijkstra_table)
+
+def _heap_search(graph : savefile.WaypointGraph) -> np.ndarray:
+    search = HeapSearch(graph, False)
+    _full_search(graph, search.step, search.dijkstra_table)
+    return search.dijkstra_table
+
+def _render_game():
+    """Screen and text cache of a headless game, like show_level uses them"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    import grasim.config as config
+    from grasim.textcache import TextCache
+    pygame.init()
+    font = pygame.font.Font(pygame.font.get_default_font(), config.FONT_SIZE)
+    return SimpleNamespace(screen=pygame.display.set_mode(SCREEN_SIZE), text_cache=TextCache(font))
+
+def run_case(case : BenchmarkCase, repeat : int, stages : list[str], max_layout_nodes : int,
+             max_scan_nodes : int, game=None) -> list[dict]:
+    """Time the stages of a case, stages that would take too long for its size are left out"""
+    graph = savefile.parse_text(case.lines)
+    results = []
+    def record(stage, function):
+        runs, result = measure(function, repeat)
+        results.append({"case": case.name, "stage": stage, "nodes": graph.num_nodes, "edges": graph.num_edges,
+                        "seconds": min(runs), "runs": runs})
+        return result
+
+    if "parse" in stages:
+        record("parse", lambda: savefile.parse_text(case.lines))
+
+    points = None
+    if "layout" in stages and graph.num_nodes <= max_layout_nodes:
+        edges = layout.layout_edges(graph)
+        points = record("layout", lambda: layout.compute_layout(graph.num_nodes, edges))
+
+    if "search_scan" in stages and graph.num_nodes <= max_scan_nodes:
+        record("search_scan", lambda: _scan_search(graph))
+    if "search_heap" in stages:
+        record("search_heap", lambda: _heap_search(graph))
+
+    if game is not None and ("render" in stages or "render_search" in stages):
+        from grasim.renderer import LevelRenderer, fit_points
+        if points is None:
+            points = np.random.default_rng(0).random((graph.num_nodes, 2))
+        points = fit_points(points, game.screen.get_size())
+        dijkstra_table = _heap_search(graph)
+        renderer = LevelRenderer(game, graph, points, False)
+        renderer.draw(dijkstra_table, 0) # the spatial index is built once per level
+
+        def frame(static : bool):
+            renderer.static_dirty = static
+            renderer.draw(dijkstra_table, 0)
+        if "render" in stages:
+            record("render", lambda: frame(True)) # after pan, zoom or rotation
+        if "render_search" in stages:
+            record("render_search", lambda: frame(False)) # only the search layers
+    return results
+
+def run_benchmarks(cases : list[BenchmarkCase], repeat : int = 3, stages : list[str] = STAGES,
+                   max_layout_nodes : int = 20000, max_scan_nodes : int = 5000, progress=None) -> dict:
+    game = _render_game() if "render" in stages or "render_search" in stages else None
+    results = []
+    for case in cases:
+        if progress is not None:
+            print(f"{case.name}...", file=progress, flush=True)
+        results.extend(run_case(case, repeat, stages, max_layout_nodes, max_scan_nodes, game))
+    return {
+        "version": BENCHMARK_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "numpy": np.__version__,
+        "results": results,
+    }
+
+def compare(report : dict, baseline : dict, tolerance : float = 0.2, min_seconds : float = 0.001) -> list[dict]:
+    """
+    Relative time of every result that is also in the baseline, regression
+    is set if it got more than tolerance slower. Stages faster than
+    min_seconds are too noisy to count as regressions.
+    """
+    baseline_seconds = {(x["case"], x["stage"]): x["seconds"] for x in baseline["results"]}
+    comparison = []
+    for result in report["results"]:
+        key = (result["case"], result["stage"])
+        if key not in baseline_seconds:
+            continue
+        ratio = result["seconds"] / max(baseline_seconds[key], 1e-9)
+        comparison.append({"case": key[0], "stage": key[1], "seconds": result["seconds"],
+                           "baseline": baseline_seconds[key], "ratio": ratio,
+                           "regression": ratio > 1 + tolerance and result["seconds"] >= min_seconds})
+    return comparison
+
+def bench_command(args) -> int:
+    cases = []
+    if not args.no_saves:
+        cases.extend(shipped_cases(pathlib.Path(args.saves)))
+    cases.extend(generated_cases(args.sizes, args.kind))
+    report = run_benchmarks(cases, args.repeat, args.stages, args.max_layout_nodes, args.max_scan_nodes, progress=sys.stderr)
+
+    failed = 0
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f), args.tolerance)
+        for row in report["comparison"]:
+            if row["regression"]:
+                failed += 1
+                print(f"regression {row['case']} {row['stage']}: {row['baseline']:.4f}s -> {row['seconds']:.4f}s "
+                      f"({row['ratio']:.2f}x)", file=sys.stderr)
+
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=1)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+    return 1 if failed else 0
+
+def add_bench_parser(subparsers):
+    parser = subparsers.add_parser("bench", help="Time parsing, layout, search and rendering and print JSON")
+    parser.add_argument("--saves", default="saves", help="Directory of the saves to time")
+    parser.add_argument("--no-saves", action="store_true", help="Only time generated graphs")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[100, 1000, 10000, 100000],
+                        help="Number of nodes of the generated graphs")
+    parser.add_argument("--kind", choices=list(graph_generator.GENERATORS), default="knn", help="Kind of the generated graphs")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Runs per stage, the fastest one is reported")
+    parser.add_argument("--max-layout-nodes", type=int, default=20000, help="Larger graphs skip the layout stage")
+    parser.add_argument("--max-scan-nodes", type=int, default=5000, help="Larger graphs skip the dijkstra_step search")
+    parser.add_argument("-o", "--output", help="Write the JSON to this file instead of stdout")
+    parser.add_argument("-b", "--baseline", help="JSON of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="A stage is a regression if it is this much slower than the baseline (0.2 = 20%%)")
+    parser.set_defaults(func=bench_command)
@@ -0,0 +1,156 @@
+"""Compiled binary copies of parsed graphs, so unchanged saves are loaded without parsing"""
+import hashlib
+import os
+import pathlib
+import sys
+import tempfile
+import numpy as np
+import grasim.config as config
+from grasim import savefile
+from grasim.batch import find_saves
+from grasim.errors import ParseError
+from grasim.savefile import NumberedNodes, WaypointGraph
+from grasim.dijkstra.landmarks import Landmarks, select_landmarks
+
+# Increase when the layout of the compiled files changes
+CACHE_VERSION = 2
+
+
+def default_cache_dir() -> pathlib.Path:
+    if config.CACHE_DIR is not None:
+        return pathlib.Path(config.CACHE_DIR)
+    return pathlib.Path(os.environ.get("XDG_CACHE_HOME", pathlib.Path.home().joinpath(".cache"))).joinpath("grasim")
+
+def cache_file(save : pathlib.Path, cache_dir : pathlib.Path) -> pathlib.Path:
+    """Path of the compiled file of a save, keyed by the absolute path of the save"""
+    key = hashlib.sha1(str(save.resolve()).encode()).hexdigest()
+    return cache_dir.joinpath(f"{key}.npz")
+
+def _write_arrays(target : pathlib.Path, **arrays):
+    """Atomically write arrays to target, readers never see a half written file"""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=target.parent, suffix=".tmp", delete=False) as f:
+        np.savez(f, version=CACHE_VERSION, **arrays)
+    os.replace(f.name, target)
+
+def write_compiled(graph : WaypointGraph, target : pathlib.Path, **extra):
+    """Atomically write the arrays of a graph (and any extra arrays) to target"""
+    if graph.coords is not None:
+        extra.update(coords=graph.coords, metric=graph.metric, coordinate_scale=graph.coordinate_scale)
+    if isinstance(graph.node_lookup, NumberedNodes):
+        extra.update(node_ids=graph.node_lookup.ids)
+    else:
+        extra.update(node_names=np.array(list(graph.node_lookup.keys()), dtype=str))
+    _write_arrays(
+        target,
+        indptr=graph.indptr,
+        indices=graph.indices,
+        weights=graph.weights,
+        heuristics=graph.heuristics,
+        start_idx=graph.start_idx,
+        end_idx=graph.end_idx,
+        **extra,
+    )
+
+def read_compiled(source : pathlib.Path) -> tuple[WaypointGraph, dict]:
+    """Read a graph written by write_compiled, also returns all stored arrays"""
+    with np.load(source, allow_pickle=False) as data:
+        arrays = dict(data)
+    if arrays["version"] != CACHE_VERSION:
+        raise ValueError(f"Compiled graph has version {arrays['version']}, expected {CACHE_VERSION}")
+    start_idx, end_idx = int(arrays["start_idx"]), int(arrays["end_idx"])
+    if "node_ids" in arrays:
+        node_lookup = NumberedNodes(arrays["node_ids"], start_idx, end_idx)
+    else:
+        node_names = arrays["node_names"].tolist()
+        node_lookup = dict(zip(node_names, range(len(node_names))))
+    graph = WaypointGraph(
+        arrays["indptr"],
+        arrays["indices"],
+        arrays["weights"],
+        start_idx,
+        end_idx,
+        node_lookup,
+        arrays["heuristics"],
+        arrays.get("coords"),
+        str(arrays.get("metric", "euclidean")),
+        float(arrays.get("coordinate_scale", 1.0)),
+    )
+    return graph, arrays
+
+def load_graph(save : str | os.PathLike, cache_dir : pathlib.Path | None = None, progress=None) -> WaypointGraph:
+    """
+    Load a save from the cache if it did not change since it was compiled,
+    otherwise parse it (progress is passed to parse_file) and update the cache
+    """
+    save = pathlib.Path(save)
+    if save.suffix == ".npz":
+        # Already compiled, e.g. by grasim import or grasim generate
+        return read_compiled(save)[0]
+    cache_dir = default_cache_dir() if cache_dir is None else cache_dir
+    stat = save.stat()
+    compiled = cache_file(save, cache_dir)
+
+    try:
+        graph, arrays = read_compiled(compiled)
+        if arrays["size"] == stat.st_size and arrays["mtime_ns"] == stat.st_mtime_ns:
+            return graph
+    except (OSError, ValueError, KeyError):
+        pass # missing, outdated or broken cache file
+
+    graph = savefile.parse_file(save, progress)
+    try:
+        write_compiled(graph, compiled, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    except OSError:
+        pass # The cache is only an optimization
+    return graph
+
+def load_landmarks(save : str | os.PathLike, graph : WaypointGraph, count : int,
+                   cache_dir : pathlib.Path | None = None) -> Landmarks:
+    """
+    The landmarks of a save from the cache if the save did not change,
+    otherwise select them and store them next to the compiled graph
+    """
+    save = pathlib.Path(save)
+    cache_dir = default_cache_dir() if cache_dir is None else cache_dir
+    stat = save.stat()
+    compiled = cache_file(save, cache_dir).with_suffix(".landmarks.npz")
+
+    try:
+        with np.load(compiled, allow_pickle=False) as data:
+            if data["version"] == CACHE_VERSION and data["size"] == stat.st_size \
+                and data["mtime_ns"] == stat.st_mtime_ns and data["count"] == count:
+                return Landmarks(data["landmarks"], data["from_landmark"], data["to_landmark"])
+    except (OSError, ValueError, KeyError):
+        pass # missing or broken cache file
+
+    landmarks = select_landmarks(graph, count)
+    try:
+        _write_arrays(compiled, size=stat.st_size, mtime_ns=stat.st_mtime_ns, count=count,
+                      landmarks=landmarks.landmarks, from_landmark=landmarks.from_landmark,
+                      to_landmark=landmarks.to_landmark)
+    except OSError:
+        pass # The cache is only an optimization
+    return landmarks
+
+def compile_command(args) -> int:
+    cache_dir = None if args.cache_dir is None else pathlib.Path(args.cache_dir)
+    failed = 0
+    for save in find_saves(args.paths):
+        try:
+            graph = load_graph(save, cache_dir)
+            if args.landmarks:
+                load_landmarks(save, graph, args.landmarks, cache_dir)
+            print(f"compiled {save}")
+        except (OSError, ParseError) as e:
+            failed += 1
+            print(f"failed {save}: {e}", file=sys.stderr)
+    return 1 if failed else 0
+
+def add_compile_parser(subparsers):
+    parser = subparsers.add_parser("compile", help="Build the binary cache for saves")
+    parser.add_argument("paths", nargs="+", help=".graph files or directories containing them")
+    parser.add_argument("--cache-dir", help="Directory of the compiled graphs, defaults to $XDG_CACHE_HOME/grasim")
+    parser.add_argument("--landmarks", type=int, default=0, metavar="K",
+                        help="Also select K landmarks for the A* heuristic of graphs without heuristics")
+    parser.set_defaults(func=compile_command)
@@ -2,6 +2,9 @@ LEVEL_SELECTION_BACKGROUND = "white"
 LEVEL_SELECTION_TEXT_BACK = "black"
 LEVEL_SELECTION_TEXT_BACK_HOVER = "red"
 LEVEL_SELECTION_TEXT = "white"
+LEVEL_SELECTION_SUMMARY_TEXT = "#dddddd"
+# Seconds between checks of the save directory for new and changed saves
+INDEX_REFRESH_SECONDS = 2
 
 ERROR_TEXT_COLOR = "red"
 BACKGROUND_COLOR = "white"
@@ -18,10 +21,59 @@ NODE_NAME_BACKGROUND = "white"
 PATH_FINAL_COLOR = "#ffbb00"
 PATH_DONE = "#7cbb00"
 PATH_OPEN = "black"
+PATH_CLOSED = "#dddddd" # edges closed in the level screen
 PATH_TEXT_COLOR = "black"
 
 LEGEND_BACKGROUND = "white"
 LEGEND_TEXT = "black"
 
+TIMELINE_BACKGROUND = "#dddddd"
+TIMELINE_COLOR = "#00a1f1"
+
+# Performance overlay, toggled with p in the level screen
+HUD_BACKGROUND = "black"
+HUD_TEXT = "#7cbb00"
+HUD_WIDTH = 300
+# Messages of the level screen (e.g. after an export) are shown under the step counter this long
+MESSAGE_SECONDS = 3
+
 FONT_SIZE = 15
-NODE_TEXT_OFFSET = 0.05
\ No newline at end of file
+NODE_TEXT_OFFSET = 0.05
+
+# Directory for compiled graphs, None means $XDG_CACHE_HOME/grasim (~/.cache/grasim)
+CACHE_DIR = None
+
+# Number of landmarks for the A* heuristic of graphs without heuristics
+LANDMARKS = 16
+
+# Memory budget for rendered labels that are kept for the next frames
+TEXT_CACHE_BYTES = 32 * 1024 * 1024
+
+# A search step that touches more nodes than this redraws the whole level
+MAX_DIRTY_RECTS = 64
+
+# Labels are only drawn if at most this many nodes are on screen
+MAX_LABELED_NODES = 1500
+# and the edges on screen are at least this long (median, in pixels)
+MIN_LABELED_EDGE_LENGTH = 15
+# How far (in pixels) the labels of a node can reach from its circle
+LABEL_MARGIN = 100
+
+# Graphs with more nodes use igraph's DrL layout, which is made for large graphs
+LAYOUT_LARGE_GRAPH_NODES = 5000
+# Graphs with more nodes are laid out in a separate process so the window stays responsive
+LAYOUT_IN_PROCESS_NODES = 1000
+
+# TCP port of grasim serve
+SERVE_PORT = 8765
+# Answers kept by grasim serve, the least recently used ones are dropped first
+SERVE_CACHE_ENTRIES = 10000
+
+# grasim record: frames per second of the animation
+RECORD_FPS = 20
+# Longer searches skip steps between the frames
+RECORD_MAX_FRAMES = 300
+# Rendered frames that may wait for the encoder, rendering waits when it is full
+RECORD_QUEUE_FRAMES = 32
+# The last frame (the final path) is shown this long
+RECORD_FINAL_FRAME_SECONDS = 2
@@ -0,0 +1,32 @@
+"""Distances between node coordinates, for heuristics and the layout"""
+import numpy as np
+
+# Mean earth radius, haversine distances are in kilometers
+EARTH_RADIUS_KM = 6371.0088
+# euclidean: [x, y] in the unit of the edges, haversine: [latitude, longitude] in degrees
+METRICS = ["euclidean", "haversine"]
+
+
+def euclidean(coords : np.ndarray, target : np.ndarray) -> np.ndarray:
+    return np.hypot(*(coords - target).T)
+
+def haversine(coords : np.ndarray, target : np.ndarray) -> np.ndarray:
+    """Great circle distance in km of [latitude, longitude] pairs to target"""
+    lat, lon = np.radians(coords).T
+    target_lat, target_lon = np.radians(target)
+    a = np.sin((lat - target_lat) / 2) ** 2 + np.cos(lat) * np.cos(target_lat) * np.sin((lon - target_lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1)))
+
+def coordinate_distances(coords : np.ndarray, target_idx : int, metric : str = "euclidean") -> np.ndarray:
+    """Distance of every node to target_idx, nan for nodes without coordinates"""
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric}, expected one of {METRICS}")
+    distance = euclidean if metric == "euclidean" else haversine
+    return distance(coords, coords[target_idx])
+
+def project(coords : np.ndarray, metric : str = "euclidean") -> np.ndarray:
+    """Screen positions (y down) of the coordinates, latitude and longitude are projected equirectangular"""
+    if metric == "haversine":
+        lat, lon = coords.T
+        return np.column_stack((lon * np.cos(np.radians(np.nanmean(lat))), -lat))
+    return coords * [1, -1]
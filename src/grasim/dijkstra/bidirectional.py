@@ -0,0 +1,148 @@
+import heapq
+import numpy as np
+from grasim.savefile import WaypointGraph
+from grasim.dijkstra.dijkstra import init_dijkstra_table
+
+FORWARD, BACKWARD = 0, 1
+
+
+class BidirectionalSearch:
+    """
+    Dijkstra / A* from START over the edges and from END over the reversed
+    edges at the same time, the sides take turns.
+
+    A* uses the average potential of the heuristic to END (h_end) and a
+    heuristic to START (h_start):
+        forward  p(v) = (h_end(v) - h_start(v) + h_end(START)) / 2
+        backward p(v) = (h_start(v) - h_end(v) + h_start(END)) / 2
+    Both sides then search the same reduced graph, so the search can stop as
+    soon as the smallest keys of both sides add up to the best path found
+    plus the constant sum of the potentials. Without h_start the heuristics
+    of the file give h_start(v) = h_end(START) - h_end(v), which is a lower
+    bound if they are consistent.
+
+    dijkstra_table shows both searches in the table layout of dijkstra_step:
+    nodes reached from START with the forward row, the others and the ones
+    done by the backward side with the backward row (the last_idx column
+    points towards END). Once the search is
+    done the rows along the best path are joined, so extract_path works on it
+    and END is marked done.
+    """
+
+    def __init__(self, graph : WaypointGraph, dijkstra_mode : bool, heuristics_to_start=None):
+        self.graph = graph
+        self.dijkstra_mode = dijkstra_mode
+        start_idx, end_idx = graph.start_idx, graph.end_idx
+        if dijkstra_mode:
+            to_end = to_start = np.zeros(graph.num_nodes)
+        else:
+            to_end = graph.heuristics
+            if heuristics_to_start is None:
+                heuristics_to_start = np.maximum(to_end[start_idx] - to_end, 0)
+            to_start = heuristics_to_start
+        self.potentials = ((to_end - to_start + to_end[start_idx]) / 2,
+                           (to_start - to_end + to_start[end_idx]) / 2)
+        self.potential_sum = (to_end[start_idx] + to_start[end_idx]) / 2
+
+        self.tables = (init_dijkstra_table(graph.num_nodes, start_idx),
+                       init_dijkstra_table(graph.num_nodes, end_idx))
+        self.tables[FORWARD][start_idx, 3] = self.potentials[FORWARD][start_idx]
+        self.tables[BACKWARD][end_idx, 3] = self.potentials[BACKWARD][end_idx]
+        self.heaps = ([(float(self.tables[FORWARD][start_idx, 3]), start_idx)],
+                      [(float(self.tables[BACKWARD][end_idx, 3]), end_idx)])
+        self.edges = (graph.neighbors, graph.predecessors)
+
+        self.dijkstra_table = init_dijkstra_table(graph.num_nodes, start_idx)
+        self.dijkstra_table[start_idx] = self.tables[FORWARD][start_idx]
+        self.best_distance = np.inf # length of the best path found so far
+        self.meeting_idx = -1 # node of the best path where both sides meet
+        if start_idx == end_idx:
+            self.best_distance, self.meeting_idx = 0.0, start_idx
+        self.side = FORWARD
+        self.expanded = 0
+        self.relaxed = 0 # edges that lowered the distance of a node
+        self.finished = False
+        self.touched : list[int] = [] # expanded and updated nodes of the last step
+
+    def counters(self) -> dict[str, int]:
+        return {"expanded": self.expanded, "relaxed": self.relaxed, "frontier": sum(map(len, self.heaps))}
+
+    def _top(self, side : int) -> float:
+        """Smallest key of a side, outdated heap entries are dropped"""
+        heap, table = self.heaps[side], self.tables[side]
+        while heap:
+            key, idx = heap[0]
+            if table[idx, 2] == 0 and table[idx, 3] == key:
+                return key
+            heapq.heappop(heap)
+        return np.inf
+
+    def _show(self, idx : int):
+        """
+        Copy the row of idx to dijkstra_table. Rows of done nodes are kept
+        even if the other side reaches them, END stays open until the paths are joined.
+        """
+        if idx == self.graph.end_idx or self.dijkstra_table[idx, 2] == 1:
+            return
+        forward, backward = self.tables
+        if forward[idx, 0] != np.inf and not backward[idx, 2]:
+            self.dijkstra_table[idx] = forward[idx]
+        else:
+            self.dijkstra_table[idx] = backward[idx]
+        self.touched.append(idx)
+
+    def _join(self):
+        """Point the rows from the meeting node to END along the best path"""
+        forward, backward = self.tables
+        idx = self.meeting_idx
+        self.dijkstra_table[idx] = forward[idx]
+        self.dijkstra_table[idx, 2] = 1
+        self.touched.append(idx)
+        while idx != self.graph.end_idx:
+            next_idx = int(backward[idx, 1])
+            distance = self.best_distance - backward[next_idx, 0]
+            self.dijkstra_table[next_idx] = [distance, idx, 1, distance]
+            self.touched.append(next_idx)
+            idx = next_idx
+
+    def step(self) -> bool:
+        """
+        Expand a node of one side, or join the paths once the best one is certain
+
+        warning: this does change the dijkstra_table
+        """
+        self.touched = []
+        if self.finished:
+            return False
+        top_forward, top_backward = self._top(FORWARD), self._top(BACKWARD)
+        if top_forward + top_backward >= self.best_distance + self.potential_sum:
+            # also true once a side ran out of nodes
+            self.finished = True
+            if self.meeting_idx == -1:
+                return False
+            self._join()
+            return True
+
+        side = self.side
+        self.side = 1 - side
+        self.expanded += 1
+
+        table, other, potential = self.tables[side], self.tables[1 - side], self.potentials[side]
+        _, next_idx = heapq.heappop(self.heaps[side])
+        table[next_idx, 2] = 1
+        self._show(next_idx)
+        next_distance = table[next_idx, 0]
+
+        targets, lengths = self.edges[side](next_idx)
+        for idx_expand, length in zip(targets.tolist(), lengths.tolist()):
+            distance = length + next_distance
+            if table[idx_expand, 2] == 0 and distance < table[idx_expand, 0]:
+                estimated_total = distance + potential[idx_expand]
+                table[idx_expand] = [distance, next_idx, 0, estimated_total]
+                heapq.heappush(self.heaps[side], (float(estimated_total), idx_expand))
+                self.relaxed += 1
+                self._show(idx_expand)
+                if distance + other[idx_expand, 0] < self.best_distance:
+                    self.best_distance = distance + other[idx_expand, 0]
+                    self.meeting_idx = idx_expand
+        return True
@@ -29,14 +29,24 @@ def dijkstra_step(dijkstra_table, graph : WaypointGraph, dijkstra_mode : bool) -
 
         dijkstra_table[next_idx][2] = 1
 
-        for idx_expand in np.where(graph.graph_matrix[next_idx] != -1)[0]:
-            distance = graph.graph_matrix[next_idx, idx_expand] + dijkstra_table[next_idx, 0]
+        targets, lengths = graph.neighbors(next_idx)
+        for idx_expand, length in zip(targets, lengths):
+            distance = length + dijkstra_table[next_idx, 0]
             estimated_total = distance + (0 if dijkstra_mode else graph.heuristics[idx_expand])
             # if is not done and distance is smaller than already there
             if dijkstra_table[idx_expand][2] == 0 \
-                and dijkstra_table[idx_expand][0] > estimated_total:
+                and dijkstra_table[idx_expand][0] > distance:
                 dijkstra_table[idx_expand] = [distance, next_idx, 0, estimated_total]
 
         return True
     else:
         return False
+
+def extract_path(dijkstra_table, start_idx : int, end_idx : int) -> list[int] | None:
+    """Node indices from start to end, None if end is not done yet"""
+    if dijkstra_table[end_idx, 2] != 1:
+        return None
+    path = [end_idx]
+    while path[-1] != start_idx:
+        path.append(int(dijkstra_table[path[-1], 1]))
+    return path[::-1]
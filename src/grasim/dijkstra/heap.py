@@ -0,0 +1,68 @@
+import heapq
+import numpy as np
+from grasim.savefile import WaypointGraph
+from grasim.dijkstra.dijkstra import init_dijkstra_table
+
+
+class HeapSearch:
+    """
+    Dijkstra / A* on a binary heap instead of scanning the whole table.
+
+    Works on the same table as dijkstra_step and expands the same node in every
+    step (smallest estimated total, lowest index on ties), so a full search
+    costs O((V+E) log V) instead of O(V^2).
+    Outdated heap entries are skipped when they are popped (lazy deletion).
+    """
+
+    def __init__(self, graph : WaypointGraph, dijkstra_mode : bool, dijkstra_table=None):
+        self.graph = graph
+        self.dijkstra_mode = dijkstra_mode
+        if dijkstra_table is None:
+            dijkstra_table = init_dijkstra_table(graph.num_nodes, graph.start_idx)
+        self.dijkstra_table = dijkstra_table
+
+        open_idx = np.where((dijkstra_table[:, 2] == 0) & (dijkstra_table[:, 3] != np.inf))[0]
+        self.heap = list(zip(dijkstra_table[open_idx, 3].tolist(), open_idx.tolist()))
+        heapq.heapify(self.heap)
+        self.touched : list[int] = [] # expanded and updated nodes of the last step
+        self.expanded = 0
+        self.relaxed = 0 # edges that lowered the distance of a node
+
+    def counters(self) -> dict[str, int]:
+        return {"expanded": self.expanded, "relaxed": self.relaxed, "frontier": len(self.heap)}
+
+    def step(self) -> bool:
+        """
+        Do a dijkstra step
+
+        warning: this does change the dijkstra_table
+        """
+        dijkstra_table = self.dijkstra_table
+        # pop until an entry is found that is still up to date
+        while self.heap:
+            estimated_total, next_idx = heapq.heappop(self.heap)
+            if dijkstra_table[next_idx, 2] == 0 and dijkstra_table[next_idx, 3] == estimated_total:
+                break
+        else:
+            self.touched = []
+            return False
+
+        dijkstra_table[next_idx, 2] = 1
+        self.expanded += 1
+        self.touched = [next_idx]
+        next_distance = dijkstra_table[next_idx, 0]
+
+        targets, lengths = self.graph.neighbors(next_idx)
+        heuristics = self.graph.heuristics
+        for idx_expand, length in zip(targets.tolist(), lengths.tolist()):
+            distance = length + next_distance
+            estimated_total = distance + (0 if self.dijkstra_mode else heuristics[idx_expand])
+            # if is not done and distance is smaller than already there
+            if dijkstra_table[idx_expand, 2] == 0 \
+                and dijkstra_table[idx_expand, 0] > distance:
+                dijkstra_table[idx_expand] = [distance, next_idx, 0, estimated_total]
+                heapq.heappush(self.heap, (float(estimated_total), idx_expand))
+                self.touched.append(idx_expand)
+                self.relaxed += 1
+
+        return True
@@ -0,0 +1,87 @@
+"""ALT: lower bounds from the distances to and from a few landmark nodes (A*, Landmarks, Triangle inequality)"""
+import heapq
+from dataclasses import dataclass
+import numpy as np
+from grasim.savefile import WaypointGraph
+
+
+def shortest_distances(indptr : np.ndarray, indices : np.ndarray, weights : np.ndarray, source : int) -> np.ndarray:
+    """Distance from source to every node over CSR edges, inf if not reachable"""
+    distances = np.full(len(indptr) - 1, np.inf)
+    distances[source] = 0
+    done = np.zeros(len(indptr) - 1, dtype=bool)
+    heap = [(0.0, source)]
+    indptr, indices, weights = indptr.tolist(), indices.tolist(), weights.tolist()
+    while heap:
+        distance, idx = heapq.heappop(heap)
+        if done[idx]:
+            continue
+        done[idx] = True
+        for position in range(indptr[idx], indptr[idx + 1]):
+            target = indices[position]
+            new_distance = distance + weights[position]
+            if new_distance < distances[target]:
+                distances[target] = new_distance
+                heapq.heappush(heap, (new_distance, target))
+    return distances
+
+@dataclass
+class Landmarks:
+    """
+    Distances from (from_landmark[i, v] = d(landmarks[i], v)) and to
+    (to_landmark[i, v] = d(v, landmarks[i])) every landmark.
+
+    By the triangle inequality
+        d(v, t) >= d(L, t) - d(L, v)   and   d(v, t) >= d(v, L) - d(t, L)
+    for every landmark L. The largest of these bounds is admissible and
+    consistent for any target t.
+    """
+    landmarks : np.ndarray
+    from_landmark : np.ndarray
+    to_landmark : np.ndarray
+
+    def heuristics(self, end_idx : int) -> np.ndarray:
+        """Lower bound of the distance from every node to end_idx"""
+        # inf - inf is nan where neither the node nor the target is connected to a landmark, fmax skips those
+        with np.errstate(invalid="ignore"):
+            return self._bounds(self.from_landmark[:, [end_idx]] - self.from_landmark,
+                                self.to_landmark - self.to_landmark[:, [end_idx]])
+
+    def heuristics_from(self, start_idx : int) -> np.ndarray:
+        """Lower bound of the distance from start_idx to every node"""
+        with np.errstate(invalid="ignore"):
+            return self._bounds(self.from_landmark - self.from_landmark[:, [start_idx]],
+                                self.to_landmark[:, [start_idx]] - self.to_landmark)
+
+    @staticmethod
+    def _bounds(from_bounds : np.ndarray, to_bounds : np.ndarray) -> np.ndarray:
+        bounds = np.fmax(np.fmax.reduce(from_bounds, axis=0), np.fmax.reduce(to_bounds, axis=0))
+        # Nodes that are not connected to the target can not use the bound
+        bounds[~np.isfinite(bounds)] = 0
+        return np.maximum(bounds, 0)
+
+def select_landmarks(graph : WaypointGraph, k : int, seed : int = 0) -> Landmarks:
+    """
+    Pick k landmarks far apart from each other: every landmark is the node
+    farthest away from the ones picked before (nodes that none of them reach
+    first, so every component gets one)
+    """
+    k = min(k, graph.num_nodes)
+    rng = np.random.default_rng(seed)
+    # The first landmark is the node farthest from a random node
+    distances = shortest_distances(graph.indptr, graph.indices, graph.weights, int(rng.integers(graph.num_nodes)))
+    landmark = int(np.argmax(np.where(np.isfinite(distances), distances, -1)))
+
+    landmarks = np.zeros(k, dtype=np.int64)
+    from_landmark = np.zeros((k, graph.num_nodes))
+    to_landmark = np.zeros((k, graph.num_nodes))
+    nearest = np.full(graph.num_nodes, np.inf) # distance from the closest landmark
+    for i in range(k):
+        if i > 0:
+            landmark = int(np.argmax(nearest))
+        landmarks[i] = landmark
+        from_landmark[i] = shortest_distances(graph.indptr, graph.indices, graph.weights, landmark)
+        to_landmark[i] = shortest_distances(graph.rev_indptr, graph.rev_indices, graph.rev_weights, landmark)
+        nearest = np.minimum(nearest, from_landmark[i])
+        nearest[landmarks[:i + 1]] = -1 # never pick a landmark twice
+    return Landmarks(landmarks, from_landmark, to_landmark)
@@ -0,0 +1,166 @@
+import heapq
+import numpy as np
+from grasim.savefile import WaypointGraph
+from grasim.dijkstra.dijkstra import init_dijkstra_table
+
+
+class LPAStar:
+    """
+    Lifelong Planning A*: a search from START to END that is repaired
+    instead of restarted when edge weights change (update_edge).
+
+    Every node has g, its distance when it was last expanded, and rhs, the
+    best distance over its predecessors right now. Nodes with g != rhs are
+    inconsistent and wait in the heap, ordered by (min(g, rhs) + h, min(g, rhs)).
+    Without changes this expands the same nodes as A*, after a change only the
+    nodes whose distance changed are expanded again.
+
+    dijkstra_table shows the state in the layout of dijkstra_step:
+    distance is rhs, last_idx the predecessor rhs comes from, done is set for
+    consistent nodes and estimated_total is rhs + h. A table of a HeapSearch
+    or dijkstra_step (with a consistent heuristic) can be taken over, the
+    search then continues where that one stopped.
+    """
+
+    def __init__(self, graph : WaypointGraph, dijkstra_mode : bool, dijkstra_table=None):
+        self.graph = graph
+        self.dijkstra_mode = dijkstra_mode
+        self.heuristics = np.zeros(graph.num_nodes) if dijkstra_mode else graph.heuristics
+        if dijkstra_table is None:
+            dijkstra_table = init_dijkstra_table(graph.num_nodes, graph.start_idx)
+        self.dijkstra_table = dijkstra_table
+
+        # Done nodes were expanded with their distance, open ones only have rhs
+        self.rhs = dijkstra_table[:, 0].copy()
+        self.g = np.where(dijkstra_table[:, 2] == 1, self.rhs, np.inf)
+        self.keys = np.full(graph.num_nodes, np.inf) # first part of the heap key of open nodes, inf if not open
+        self.heap : list[tuple[float, float, int]] = []
+        for idx in np.nonzero(self.g != self.rhs)[0].tolist():
+            self._push(idx)
+        dijkstra_table[:, 3] = self.rhs + self.heuristics
+
+        self.expanded = 0
+        self.relaxed = 0 # rhs values that were lowered or computed again
+        self.touched : list[int] = [] # nodes whose row changed in the last step or update
+
+    def counters(self) -> dict[str, int]:
+        return {"expanded": self.expanded, "relaxed": self.relaxed, "frontier": int(np.isfinite(self.keys).sum())}
+
+    def _push(self, idx : int):
+        best = min(self.g[idx], self.rhs[idx])
+        self.keys[idx] = best + self.heuristics[idx]
+        heapq.heappush(self.heap, (float(self.keys[idx]), float(best), idx))
+
+    def _show(self, idx : int):
+        self.dijkstra_table[idx, 0] = self.rhs[idx]
+        self.dijkstra_table[idx, 2] = self.g[idx] == self.rhs[idx] != np.inf
+        self.dijkstra_table[idx, 3] = self.rhs[idx] + self.heuristics[idx]
+        self.touched.append(idx)
+
+    def _update(self, idx : int):
+        """Put idx into the heap if it is inconsistent, take it out otherwise"""
+        if self.g[idx] != self.rhs[idx]:
+            self._push(idx)
+        else:
+            self.keys[idx] = np.inf # the heap entry is dropped when it is popped
+        self._show(idx)
+
+    def _recompute_rhs(self, idx : int):
+        """rhs and predecessor of idx from all its predecessors"""
+        self.relaxed += 1
+        if idx == self.graph.start_idx:
+            return
+        sources, lengths = self.graph.predecessors(idx)
+        if len(sources) == 0:
+            self.rhs[idx] = np.inf
+            return
+        distances = self.g[sources] + lengths
+        best = int(np.argmin(distances))
+        self.rhs[idx] = distances[best]
+        if distances[best] != np.inf:
+            self.dijkstra_table[idx, 1] = sources[best]
+
+    def _top(self) -> tuple[float, float, int] | None:
+        """Heap entry of the open node with the smallest key, outdated entries are dropped"""
+        heap = self.heap
+        while heap:
+            key, best, idx = heap[0]
+            if self.keys[idx] == key and min(self.g[idx], self.rhs[idx]) == best:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def _end_key(self) -> tuple[float, float]:
+        end_idx = self.graph.end_idx
+        best = min(self.g[end_idx], self.rhs[end_idx])
+        return (best + self.heuristics[end_idx], best)
+
+    @property
+    def finished(self) -> bool:
+        """The distance of END is certain"""
+        top = self._top()
+        end_idx = self.graph.end_idx
+        return top is None or ((top[0], top[1]) >= self._end_key() and self.g[end_idx] == self.rhs[end_idx])
+
+    def step(self) -> bool:
+        """
+        Expand the inconsistent node with the smallest key, False if the path to END is certain
+
+        warning: this does change the dijkstra_table
+        """
+        self.touched = []
+        if self.finished:
+            return False
+        _, _, idx = heapq.heappop(self.heap)
+        self.keys[idx] = np.inf
+        self.expanded += 1
+        targets, lengths = self.graph.neighbors(idx)
+
+        if self.g[idx] > self.rhs[idx]:
+            # The distance got shorter: the successors may get shorter too
+            self.g[idx] = self.rhs[idx]
+            self._show(idx)
+            for target, length in zip(targets.tolist(), lengths.tolist()):
+                if self.g[idx] + length < self.rhs[target]:
+                    self.relaxed += 1
+                    self.rhs[target] = self.g[idx] + length
+                    self.dijkstra_table[target, 1] = idx
+                    self._update(target)
+        else:
+            # The distance got longer: successors that came over idx have to look again
+            self.g[idx] = np.inf
+            for target in [*targets.tolist(), idx]:
+                if target == idx or self.dijkstra_table[target, 1] == idx:
+                    self._recompute_rhs(target)
+                    self._update(target)
+        return True
+
+    def run(self) -> int:
+        """Expand until the path to END is certain, returns the number of expanded nodes"""
+        expanded = self.expanded
+        while self.step():
+            pass
+        return self.expanded - expanded
+
+    def update_edge(self, idx1 : int, idx2 : int, weight : float):
+        """
+        Change the weight of the edge idx1 -> idx2 (inf closes it) and mark
+        what it affects, step() or run() then repairs the search.
+
+        Lower weights can make the heuristic inadmissible
+        """
+        self.touched = []
+        old_weight = self.graph.set_edge_weight(idx1, idx2, weight)
+        if idx2 == self.graph.start_idx:
+            return
+        if weight < old_weight:
+            if self.g[idx1] + weight < self.rhs[idx2]:
+                self.relaxed += 1
+                self.rhs[idx2] = self.g[idx1] + weight
+                self.dijkstra_table[idx2, 1] = idx1
+        elif self.dijkstra_table[idx2, 1] == idx1:
+            self._recompute_rhs(idx2)
+        self._update(idx2)
+
+    def distance(self) -> float:
+        return float(self.g[self.graph.end_idx])
@@ -0,0 +1,149 @@
+import heapq
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+import numpy as np
+import numpy.typing as nptype
+from grasim.savefile import WaypointGraph
+
+
+class SearchState:
+    """
+    Compact per-query arrays for searches that do not need to be shown:
+    float64 distance and estimated total, int32 predecessor and a bool done
+    mask, 25 bytes per node instead of the 32 of a dijkstra table.
+
+    Every node carries the generation in which it was last written, nodes
+    of older generations count as not reached. reset() only increases the
+    generation, so a state can be reused for the next query in O(1).
+    """
+
+    def __init__(self, num_nodes : int):
+        self.distance = np.empty(num_nodes, dtype=np.float64)
+        self.estimate = np.empty(num_nodes, dtype=np.float64) # distance + heuristic
+        self.previous = np.empty(num_nodes, dtype=np.int32)
+        self.done = np.zeros(num_nodes, dtype=bool)
+        self.stamp = np.zeros(num_nodes, dtype=np.uint32) # generation of the values of a node
+        self.generation = 0
+        self.expanded = 0 # nodes expanded by the last search
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.distance)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (self.distance, self.estimate, self.previous, self.done, self.stamp))
+
+    def reset(self):
+        """Forget all nodes"""
+        self.generation += 1
+        if self.generation > np.iinfo(np.uint32).max:
+            # Only after 4 billion resets, the stamps have to be cleared once
+            self.stamp[:] = 0
+            self.generation = 1
+        self.expanded = 0
+
+    def reached(self) -> nptype.NDArray[np.bool_]:
+        """Mask of the nodes that got a distance since the last reset"""
+        return self.stamp == self.generation
+
+    def path(self, start_idx : int, end_idx : int) -> list[int] | None:
+        """Node indices from start to end, None if end is not done"""
+        if self.stamp[end_idx] != self.generation or not self.done[end_idx]:
+            return None
+        path = [end_idx]
+        while path[-1] != start_idx:
+            path.append(int(self.previous[path[-1]]))
+        return path[::-1]
+
+    def to_dijkstra_table(self) -> nptype.NDArray[np.float64]:
+        """The state in the layout of init_dijkstra_table, e.g. for extract_path or the renderer"""
+        reached = self.reached()
+        dijkstra_table = np.zeros((self.num_nodes, 4))
+        dijkstra_table[:, [0, 3]] = np.inf
+        dijkstra_table[reached, 0] = self.distance[reached]
+        dijkstra_table[reached, 1] = self.previous[reached]
+        dijkstra_table[reached, 2] = self.done[reached]
+        dijkstra_table[reached, 3] = self.estimate[reached]
+        return dijkstra_table
+
+def search(graph : WaypointGraph, state : SearchState, start_idx : int, end_idx : int, heuristics=None) -> float:
+    """
+    Dijkstra (or A* with heuristics to end_idx) from start_idx on a reset
+    state until end_idx is done, returns its distance (inf if not reachable).
+    Expands the same nodes as HeapSearch.
+    """
+    state.reset()
+    distance, estimate, previous, done, stamp = state.distance, state.estimate, state.previous, state.done, state.stamp
+    generation = state.generation
+    indptr, indices, weights = graph.indptr, graph.indices, graph.weights
+
+    stamp[start_idx] = generation
+    distance[start_idx], previous[start_idx], done[start_idx] = 0, start_idx, False
+    estimate[start_idx] = 0 if heuristics is None else heuristics[start_idx]
+    heap = [(float(estimate[start_idx]), start_idx)]
+    while heap:
+        estimated_total, idx = heapq.heappop(heap)
+        if done[idx] or estimate[idx] != estimated_total:
+            continue # outdated entry
+        done[idx] = True
+        state.expanded += 1
+        if idx == end_idx:
+            return float(distance[idx])
+
+        idx_distance = distance[idx]
+        begin, end = indptr[idx], indptr[idx + 1]
+        for target, length in zip(indices[begin:end].tolist(), weights[begin:end].tolist()):
+            target_distance = idx_distance + length
+            if stamp[target] != generation:
+                stamp[target] = generation
+                done[target] = False
+            elif done[target] or distance[target] <= target_distance:
+                continue
+            distance[target], previous[target] = target_distance, idx
+            estimate[target] = target_distance + (0 if heuristics is None else heuristics[target])
+            heapq.heappush(heap, (float(estimate[target]), target))
+    return np.inf
+
+class SearchStatePool:
+    """
+    Search states of one graph that are handed out to queries, so one loaded
+    graph answers many START / END queries without allocating tables.
+    Threads can query at the same time, each one gets its own state; at most
+    max_states are created, further queries wait for a free one.
+    """
+
+    def __init__(self, graph : WaypointGraph, max_states : int | None = None):
+        self.graph = graph
+        self.max_states = (os.cpu_count() or 1) if max_states is None else max_states
+        self.created = 0
+        self._free : list[SearchState] = []
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def state(self) -> Iterator[SearchState]:
+        """A state that belongs to the caller until the with block ends"""
+        with self._condition:
+            while not self._free and self.created >= self.max_states:
+                self._condition.wait()
+            if self._free:
+                state = self._free.pop()
+            else:
+                self.created += 1
+                state = None
+        if state is None:
+            state = SearchState(self.graph.num_nodes) # allocated outside of the lock
+        try:
+            yield state
+        finally:
+            with self._condition:
+                self._free.append(state)
+                self._condition.notify()
+
+    def query(self, start_idx : int, end_idx : int, heuristics=None) -> tuple[float, list[int] | None]:
+        """Distance and path from start_idx to end_idx, heuristics have to estimate the distance to end_idx"""
+        with self.state() as state:
+            distance = search(self.graph, state, start_idx, end_idx, heuristics)
+            return distance, state.path(start_idx, end_idx)
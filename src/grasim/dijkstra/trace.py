@@ -0,0 +1,183 @@
+import pathlib
+import numpy as np
+from grasim.savefile import WaypointGraph, _GrowableArray
+from grasim.dijkstra.heap import HeapSearch
+from grasim.dijkstra.lpastar import LPAStar
+
+# Increase when stored traces are no longer valid
+TRACE_VERSION = 1
+
+
+class SearchTrace:
+    """
+    The changes of every step of a search.
+
+    A step stores the rows it changed, the expanded node first and then the
+    relaxed ones, each with the row before and after the step. The changes of
+    all steps are kept in flat arrays with step_indptr pointing to the first
+    change of every step (like the edges of a WaypointGraph).
+    A table is moved to any recorded step by only applying or undoing the
+    steps in between.
+    """
+
+    def __init__(self, initial_table : np.ndarray):
+        self.initial_table = initial_table.copy()
+        self._last_table = initial_table.copy() # the table after the last recorded step
+        self._nodes = _GrowableArray(np.int32, 1024)
+        self._old_rows = _GrowableArray(np.float64, 4096)
+        self._new_rows = _GrowableArray(np.float64, 4096)
+        self._step_indptr = _GrowableArray(np.int64, 1024)
+        self._step_indptr.extend([0])
+
+    @property
+    def num_steps(self) -> int:
+        return self._step_indptr.size - 1
+
+    @property
+    def step_indptr(self) -> np.ndarray:
+        return self._step_indptr.view()
+
+    @property
+    def nodes(self) -> np.ndarray:
+        return self._nodes.view()
+
+    @property
+    def old_rows(self) -> np.ndarray:
+        return self._old_rows.view().reshape(-1, 4)
+
+    @property
+    def new_rows(self) -> np.ndarray:
+        return self._new_rows.view().reshape(-1, 4)
+
+    def record(self, dijkstra_table : np.ndarray, touched : list[int]):
+        """Append a step that changed the rows touched of dijkstra_table"""
+        touched = np.asarray(touched, dtype=np.int64)
+        new_rows = dijkstra_table[touched]
+        self._nodes.extend(touched)
+        self._old_rows.extend(self._last_table[touched].ravel())
+        self._new_rows.extend(new_rows.ravel())
+        self._last_table[touched] = new_rows
+        self._step_indptr.extend([self._nodes.size])
+
+    def expanded(self, step : int) -> int:
+        """The node expanded in step (1 is the first step)"""
+        return int(self.nodes[self.step_indptr[step - 1]])
+
+    def seek(self, dijkstra_table : np.ndarray, current : int, target : int) -> np.ndarray:
+        """
+        Move dijkstra_table from step current to step target, returns the changed nodes
+
+        warning: this does change the dijkstra_table
+        """
+        target = min(max(target, 0), self.num_steps)
+        first, last = sorted((current, target))
+        begin, end = self.step_indptr[first], self.step_indptr[last]
+        nodes = self.nodes[begin:end]
+        if target > current:
+            # A node can change in several steps, the last change wins
+            nodes, last_change = np.unique(nodes[::-1], return_index=True)
+            dijkstra_table[nodes] = self.new_rows[end - 1 - last_change]
+        else:
+            # and going back the row before the first change
+            nodes, first_change = np.unique(nodes, return_index=True)
+            dijkstra_table[nodes] = self.old_rows[begin + first_change]
+        return nodes
+
+    def table_at(self, step : int) -> np.ndarray:
+        dijkstra_table = self.initial_table.copy()
+        self.seek(dijkstra_table, 0, step)
+        return dijkstra_table
+
+    def save(self, path : pathlib.Path):
+        np.savez_compressed(path, version=TRACE_VERSION, initial_table=self.initial_table,
+                            step_indptr=self.step_indptr, nodes=self.nodes,
+                            old_rows=self.old_rows, new_rows=self.new_rows)
+
+    @classmethod
+    def load(cls, path : pathlib.Path) -> "SearchTrace":
+        with np.load(path, allow_pickle=False) as data:
+            if data["version"] != TRACE_VERSION:
+                raise ValueError(f"Unsupported trace version {data['version']}")
+            trace = cls(data["initial_table"])
+            trace._step_indptr.extend(data["step_indptr"][1:])
+            trace._nodes.extend(data["nodes"])
+            trace._old_rows.extend(data["old_rows"].ravel())
+            trace._new_rows.extend(data["new_rows"].ravel())
+        trace._last_table = trace.table_at(trace.num_steps)
+        return trace
+
+
+class TracedSearch:
+    """
+    A search that records every step, so it can go back and forth.
+
+    dijkstra_table is the table at step position. Steps that were already
+    recorded are replayed from the trace, the search only runs for new ones.
+    Any search with dijkstra_table, touched and step() can be recorded,
+    a HeapSearch is used by default.
+    """
+
+    def __init__(self, graph : WaypointGraph, dijkstra_mode : bool, search=None):
+        self.graph = graph
+        self.dijkstra_mode = dijkstra_mode
+        self.search = HeapSearch(graph, dijkstra_mode) if search is None else search
+        self.trace = SearchTrace(self.search.dijkstra_table)
+        self.dijkstra_table = self.search.dijkstra_table.copy()
+        self.position = 0
+        self.finished = False # the search has no nodes left to expand
+        self.touched : list[int] = [] # nodes changed by the last step or seek
+
+    def _record_step(self) -> bool:
+        if self.finished or not self.search.step():
+            self.finished = True
+            return False
+        self.trace.record(self.search.dijkstra_table, self.search.touched)
+        return True
+
+    def step(self) -> bool:
+        """One step forward, False if the search is finished"""
+        position = self.position
+        return self.seek(position + 1) != position
+
+    def seek(self, step : int) -> int:
+        """Go to step, the search runs until it is recorded or finished. Returns the new position"""
+        while self.trace.num_steps < step and self._record_step():
+            pass
+        target = min(max(step, 0), self.trace.num_steps)
+        self.touched = self.trace.seek(self.dijkstra_table, self.position, target).tolist()
+        self.position = target
+        return target
+
+    def update_edge(self, idx1 : int, idx2 : int, weight : float):
+        """
+        Change the weight of an edge at the newest step. A HeapSearch is taken
+        over by LPAStar, which repairs the search in the following steps.
+        The change itself is recorded as a step.
+        """
+        if isinstance(self.search, HeapSearch):
+            self.search = LPAStar(self.graph, self.dijkstra_mode, self.search.dijkstra_table)
+        elif not isinstance(self.search, LPAStar):
+            raise ValueError(f"{type(self.search).__name__} can not be repaired after an edge changed")
+        self.seek(self.trace.num_steps)
+        self.search.update_edge(idx1, idx2, weight)
+        self.trace.record(self.search.dijkstra_table, self.search.touched)
+        self.finished = False
+        self.seek(self.trace.num_steps)
+
+    def counters(self) -> dict[str, int]:
+        """Counters of the recorded search and the step shown"""
+        counters = self.search.counters() if hasattr(self.search, "counters") else {}
+        return {**counters, "position": self.position, "recorded": self.trace.num_steps}
+
+    def run_to_end(self) -> int:
+        """Record the whole search, returns the number of steps"""
+        while self._record_step():
+            pass
+        return self.trace.num_steps
+
+
+def record_trace(graph : WaypointGraph, dijkstra_mode : bool) -> SearchTrace:
+    """Run the whole search and record it"""
+    search = TracedSearch(graph, dijkstra_mode)
+    search.run_to_end()
+    return search.trace
@@ -1,179 +1,202 @@
-from grasim.graph_generator import create_random_graph
 import pygame
 import numpy as np
-import igraph as ig
 import traceback
 from dataclasses import dataclass
-from grasim import savefile
-from grasim.dijkstra import dijkstra
+from grasim.loader import LevelLoader, LoadedLevel
+from grasim.dijkstra.trace import TracedSearch
+from grasim.dijkstra.bidirectional import BidirectionalSearch
 import os
 import pathlib
+import time
 from grasim.errors import ParseError
 import grasim.config as config
+from grasim.textcache import TextCache
+from grasim.renderer import LevelRenderer, TIMELINE_HEIGHT, fit_points
+from grasim.profiling import profiler
+from grasim.saveindex import SaveIndex, SaveInfo
 
 @dataclass
 class Game:
     """The game class that holds all the game state"""
-    pygame.init()
-    screen = pygame.display.set_mode((1280, 720), pygame.RESIZABLE)
-    clock = pygame.time.Clock()
-    font = pygame.font.Font(pygame.font.get_default_font(), config.FONT_SIZE)
-    dijkstra_mode = False
-
-def read_file(file: pathlib.Path):
-    with file.open("r") as f:
-        return f.readlines()
+    screen : pygame.Surface
+    clock : pygame.time.Clock
+    font : pygame.font.Font
+    text_cache : TextCache
+    dijkstra_mode : bool = False
+    bidirectional : bool = False
+
+    @classmethod
+    def create(cls) -> "Game":
+        """Open the window, nothing is initialized before the game starts"""
+        pygame.init()
+        screen = pygame.display.set_mode((1280, 720), pygame.RESIZABLE)
+        font = pygame.font.Font(pygame.font.get_default_font(), config.FONT_SIZE)
+        return cls(screen, pygame.time.Clock(), font, TextCache(font))
 
 def show_error(message: str, game):
-    error_font_display = game.font.render("We cannot parse this! " + message, True, config.ERROR_TEXT_COLOR)
+    error_font_display = game.text_cache.render("We cannot parse this! " + message, True, config.ERROR_TEXT_COLOR)
     game.screen.blit(error_font_display, (100, 0))
     pygame.display.flip()
     game.clock.tick(1)
     return
     
-def interpolate_coords(point1 : np.ndarray, point2 : np.ndarray, percent : float) -> np.ndarray:
-    return (point2 - point1) * percent + point1 
-
-def show_level(unparsed_save: str, game : Game):
+def wait_for_level(loader : LevelLoader, game : Game) -> LoadedLevel | None:
+    """Keep the window responsive while the level is loaded, None if the user went back"""
+    while not loader.done():
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_BACKSPACE):
+                loader.cancel()
+                return None
+
+        game.screen.fill(config.LEVEL_SELECTION_BACKGROUND)
+        spinner = "|/-\\"[int(loader.elapsed() * 8) % 4]
+        text = f"{spinner} {loader.save.name}: {loader.describe()}, {loader.elapsed():.1f}s   <BACK> to cancel"
+        text_surface = game.text_cache.render(text, True, config.LEGEND_TEXT)
+        game.screen.blit(text_surface, (100, 100))
+        if loader.phase == "parse" and loader.total_bytes:
+            bar = pygame.Rect(100, 130, game.screen.get_size()[0] - 200, TIMELINE_HEIGHT)
+            pygame.draw.rect(game.screen, config.TIMELINE_BACKGROUND, bar)
+            bar.width = round(bar.width * loader.done_bytes / loader.total_bytes)
+            pygame.draw.rect(game.screen, config.TIMELINE_COLOR, bar)
+        pygame.display.flip()
+        game.clock.tick(20)
+    return loader.result()
+
+# Factor of the edge weight for the keys that change the edge under the mouse
+EDGE_KEYS = {pygame.K_x: np.inf, pygame.K_RIGHTBRACKET: 2.0, pygame.K_LEFTBRACKET: 0.5}
+
+def change_edge(search : TracedSearch, idx1 : int, idx2 : int, factor : float):
+    """
+    Multiply the weight of an edge (inf closes it), the way back too if it has the same weight.
+    Raises ValueError if the search can not be repaired
+    """
+    graph = search.graph
+    weight = graph.edge_weight(idx1, idx2)
+    edges = [(idx1, idx2)]
+    if graph.edge_weight(idx2, idx1) == weight:
+        edges.append((idx2, idx1))
+    for edge in edges:
+        search.update_edge(*edge, np.inf if factor == np.inf else weight * factor)
+
+def start_search(level : LoadedLevel, dijkstra_mode : bool, bidirectional : bool) -> TracedSearch:
+    """The search of a level, every step is recorded so it can be rewound and replayed"""
+    graph = level.graph
+    heuristics_to_start = None
+    if level.landmarks is not None:
+        # Without heuristics in the file A* uses the landmarks
+        graph.heuristics = level.landmarks.heuristics(graph.end_idx)
+        heuristics_to_start = level.landmarks.heuristics_from(graph.start_idx)
+
+    if bidirectional:
+        return TracedSearch(graph, dijkstra_mode, BidirectionalSearch(graph, dijkstra_mode, heuristics_to_start))
+    return TracedSearch(graph, dijkstra_mode)
+
+def show_level(save: pathlib.Path, game : Game):
     """The level screen"""
     offset = np.array([0.0, 0.0])
     zoom = 1
 
+    # Landmarks are only needed by A* on graphs without heuristics
+    loader = LevelLoader(save, 0 if game.dijkstra_mode else config.LANDMARKS)
     try:
-        graph = savefile.parse_text(unparsed_save)
+        level = wait_for_level(loader, game)
     except ParseError as parse:
-        show_error("This file cannot be parsed! " + parse.msg, game)
+        show_error(f"This file cannot be parsed! Line {parse.lineno}: {parse.msg}", game)
         return
     except Exception as e:
         traceback.print_exc()
-        show_error("This file cannot be parsed! Uncaptured error: " + str(e), game)
+        show_error("This file cannot be loaded! Uncaptured error: " + str(e), game)
         return
+    if level is None: # cancelled
+        return
+    graph, points = level.graph, level.points
 
-    adjancy_matrix = graph.graph_matrix.copy()
-    # adjancy_matrix[adjancy_matrix == -1] = 0 # TODO: https://github.com/green-sh/grasim/issues/20
-    # adjancy_matrix[adjancy_matrix != 0] = 1
-
-    # Use igraph to make the graph pretty: position nodes better
-    # Fix issue https://github.com/green-sh/grasim/issues/15 ugly graphs
-    full_graph_adjancy = adjancy_matrix + adjancy_matrix.T
-    full_graph_adjancy = np.where(full_graph_adjancy > -1, 1, 0) 
-
-    layout = "auto"
-    if len(graph.node_lookup) < 5:
-        layout = "circle"
-    points = np.array(ig.Graph.Adjacency(full_graph_adjancy, mode="directed").layout(layout).coords)
-
-    points = points + abs(points.min(0))
-    points = ((points / (abs(points).max(0) + 0.02)) * game.screen.get_size() * 0.9)
+    points = fit_points(points, game.screen.get_size())
 
     cos, sin = np.cos(0.07), np.sin(0.07)
     ROTATION_MATRIX = np.array([[cos, sin], [-sin, cos]])
 
-    dijkstra_table = dijkstra.init_dijkstra_table(num_nodes=graph.graph_matrix.shape[0], start_idx = graph.start_idx)
-    dijkstra.dijkstra_step(dijkstra_table, graph, game.dijkstra_mode)
+    search = start_search(level, game.dijkstra_mode, game.bidirectional)
+    dijkstra_table = search.dijkstra_table
+    search.step()
 
-    screen_size = np.array(game.screen.get_size())
-    font_display = pygame.surface.Surface(screen_size)
-    font_display.set_colorkey((255, 0, 255))
+    renderer = LevelRenderer(game, graph, points, game.dijkstra_mode, game.bidirectional)
     running = True # This can stop the game
     can_continue = False # c key continues until target reached
-    should_draw = True # Only draw if something changed
+    should_draw = True # Redraw everything, otherwise only what the last steps touched
+    touched : list[int] = [] # Nodes changed since the last frame
     counter = 0
     skip_until_end = False
     hide_labels = False
     move_mode = False
+    scrub_mode = False # the timeline is dragged with the mouse
+    seek_to = None # step to jump to
+    show_hud = False
     while running:
 
-        if should_draw or skip_until_end:
+        renderer.set_view(points, zoom, offset, hide_labels)
+        renderer.set_timeline(search.position, search.trace.num_steps)
+        if should_draw or renderer.static_dirty or renderer.message_changed():
             should_draw = False
-            # drawing Nodes
-            game.screen.fill(config.BACKGROUND_COLOR)
-            font_display.fill((255, 0, 255))
-            points_absolute_pos = (points - screen_size/2) * zoom + offset * zoom + screen_size/2
-            # Draw nodes
-            for point, name in zip(points_absolute_pos, graph.node_lookup.keys()):
-                # If node is not done draw purple, otherwise green
-                node_idx = graph.node_lookup[name]
-                if graph.end_idx == node_idx:
-                    pygame.draw.circle(game.screen, config.NODE_END_COLOR, point, 5)
-                elif dijkstra_table[node_idx, 0] == np.inf:
-                    pygame.draw.circle(game.screen, config.NODE_UNIDSCOVERED_COLOR, point, 5)
-                elif dijkstra_table[node_idx, 2] != 1:
-                    pygame.draw.circle(game.screen, config.NODE_DISCOVERED_COLOR, point, 5)
-                else:
-                    pygame.draw.circle(game.screen, config.NODE_DONE_COLOR, point, 5)
-                
-                heuristic_text = "" if game.dijkstra_mode else f"{graph.heuristics[graph.node_lookup[name]]:.0f}"
-                estimated_total = f"{dijkstra_table[graph.node_lookup[name], 3]:.0f}"
-                draw_name = "" if hide_labels else name
-
-                font_screen = game.font.render(f"{draw_name}", False, config.NODE_NAME_COLOR, config.NODE_NAME_BACKGROUND)
-                heur_screen = game.font.render(f"{heuristic_text}", False, config.NODE_HEURISTIC_COLOR)
-                total_screen = game.font.render(f"{estimated_total}", False, config.NODE_ESTIMATED_TOTAL_COLOR)
-                font_size = font_screen.get_size()
-                font_display.blit(font_screen, point - [font_size[0]/2, font_size[1]+10])
-                font_display.blit(heur_screen, point - [font_size[0]/2, font_size[1]*3+10])
-                font_display.blit(total_screen, point - [font_size[0]/2, font_size[1]*2+10])
-
-            # Draw final path
-            if dijkstra_table[graph.end_idx, 2] == 1:
-                skip_until_end = False
-                traverse_idx = graph.end_idx
-                while traverse_idx != graph.start_idx:
-                    traverse_idx2 = int(dijkstra_table[traverse_idx, 1])
-                    pygame.draw.line(game.screen,config.PATH_FINAL_COLOR , points_absolute_pos[traverse_idx], points_absolute_pos[traverse_idx2], 10)
-                    traverse_idx = traverse_idx2
-
-            # Draw Paths
-            for idx1, idx2 in np.column_stack(np.where(graph.graph_matrix != -1)):
-
-                # if path is explored draw green otherwise white
-                if ((int(dijkstra_table[idx1, 1]) == idx2) and dijkstra_table[idx1, 2] == 1.0) or \
-                    ((int(dijkstra_table[idx2, 1]) == idx1) and dijkstra_table[idx2, 2] == 1.0):
-                    pygame.draw.line(game.screen,config.PATH_DONE, points_absolute_pos[idx1], points_absolute_pos[idx2], 5)
-                else:
-                    pygame.draw.line(game.screen,config.PATH_OPEN, points_absolute_pos[idx1], points_absolute_pos[idx2])
-                # check if connection is directed
-                if graph.graph_matrix[idx1, idx2] == graph.graph_matrix[idx2, idx1] and idx1 < idx2:
-                    font_screen = game.font.render(f"{graph.graph_matrix[idx1, idx2]:.0f}", True, config.PATH_TEXT_COLOR)
-                    direction = (points_absolute_pos[idx1] - points_absolute_pos[idx2])
-                    distance = np.linalg.norm(direction)
-                    moveAsideOffset = direction / distance
-                    font_display.blit(font_screen, (points_absolute_pos[idx1] + points_absolute_pos[idx2])/2 + (moveAsideOffset * distance * config.NODE_TEXT_OFFSET))
-                elif idx1 < idx2: # directed
-                    distance1 = graph.graph_matrix[idx1, idx2]
-                    distance2 = graph.graph_matrix[idx2, idx1]
-                    if distance1 != -1:
-                        font_screen_left = game.font.render(f"{distance1:.0f}", True, config.PATH_TEXT_COLOR)
-                        font_display.blit(font_screen_left, interpolate_coords(points_absolute_pos[idx1], points_absolute_pos[idx2], 0.8))
-                    if distance2 != -1:
-                        font_screen_right = game.font.render(f"{distance2:.0f}", True, config.PATH_TEXT_COLOR)
-                        font_display.blit(font_screen_right, interpolate_coords(points_absolute_pos[idx1], points_absolute_pos[idx2], 0.2))
-
-            font_screen = game.font.render("Inputs: Step: <ENTER>, <BACK>, [c]ontinue, [r]otate, [h]ide labels | Navigate: +, -, <UP>, <DOWN>, <LEFT>, <RIGHT>", True, config.LEGEND_TEXT, config.LEGEND_BACKGROUND)
-            font_display.blit(font_screen, screen_size-font_screen.get_size())
-
-            counter_screen = game.font.render(f"Steps: {counter}", True, "white", "black")
-            font_display.blit(counter_screen, (screen_size[0] - counter_screen.get_size()[0], counter_screen.get_size()[1]))
-            # End drawing
-        
+            renderer.draw(dijkstra_table, counter)
+        elif touched:
+            renderer.draw_changes(dijkstra_table, counter, touched)
+        touched = []
+        if show_hud:
+            renderer.draw_hud(profiler.summary())
+
         # poll for events
         # pygame.QUIT event means the user clicked X to close your window
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
-            if event.type == pygame.KEYDOWN:
+            if event.type == pygame.VIDEORESIZE:
+                renderer.resize()
+            if event.type == pygame.WINDOWEXPOSED:
                 should_draw = True
+            if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_BACKSPACE:
                     running = False
                 if event.key == pygame.K_RETURN:
                     can_continue = True
                 if event.key == pygame.K_h:
                     hide_labels = not hide_labels
+                if event.key == pygame.K_COMMA:
+                    seek_to = search.position - 1
+                if event.key == pygame.K_PERIOD:
+                    seek_to = search.position + 1
+                if event.key == pygame.K_HOME:
+                    seek_to = 1
+                if event.key == pygame.K_END:
+                    seek_to = search.run_to_end()
+                if event.key == pygame.K_e:
+                    trace_file = pathlib.Path(f"{save.stem}.trace.npz")
+                    search.trace.save(trace_file)
+                    renderer.set_message(f"Exported {search.trace.num_steps} steps to {trace_file}")
+                if event.key in EDGE_KEYS:
+                    edge = renderer.edge_at(pygame.mouse.get_pos())
+                    try:
+                        if edge is not None:
+                            change_edge(search, int(renderer.edge_sources[edge]), int(graph.indices[edge]), EDGE_KEYS[event.key])
+                            renderer.static_dirty = True # new edge label
+                            touched.extend(search.touched)
+                            skip_until_end = True # show the repair
+                    except ValueError as e:
+                        renderer.set_message(str(e), config.ERROR_TEXT_COLOR)
+                if event.key == pygame.K_p:
+                    show_hud = not show_hud
+                    should_draw = not show_hud # clear the HUD
+                if event.key == pygame.K_o:
+                    message = toggle_profile_recording()
+                    if message is None:
+                        show_hud = True # shows the recorded frames
+                    else:
+                        renderer.set_message(message)
             if event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_left, _, mouse_right = pygame.mouse.get_pressed(3)
-                should_draw = True
-                if mouse_left:
+                if mouse_left and renderer.timeline_rect.inflate(0, 8).collidepoint(event.pos):
+                    scrub_mode = True
+                elif mouse_left:
                     move_mode = True
                     pygame.mouse.get_rel() # reset relative position of mouse
                 if mouse_right:
@@ -183,66 +206,83 @@ def show_level(unparsed_save: str, game : Game):
             if event.type == pygame.MOUSEBUTTONUP:
                 if mouse_left:
                     move_mode = False
+                    scrub_mode = False
 
         mouse_left, _, _ = pygame.mouse.get_pressed()
         if mouse_left and move_mode:
             offset += np.array(pygame.mouse.get_rel()) / abs(zoom)
-            should_draw = True
+        if mouse_left and scrub_mode:
+            seek_to = renderer.timeline_step(pygame.mouse.get_pos()[0])
             
         keys = pygame.key.get_pressed()
         if keys[pygame.K_UP]:
             offset[1] += 20 / abs(zoom)
-            should_draw = True
         elif keys[pygame.K_DOWN]:
             offset[1] -= 20 / abs(zoom)
-            should_draw = True
         if keys[pygame.K_LEFT]:
             offset[0] += 20 / abs(zoom)
-            should_draw = True
         elif keys[pygame.K_RIGHT]:
             offset[0] -= 20 / abs(zoom)
-            should_draw = True
         if keys[pygame.K_PLUS]:
             zoom *= 1.05
             #offset -= screen_size*0.1/2
-            should_draw = True
         elif keys[pygame.K_MINUS]:
             zoom /= 1.05
             #offset += screen_size*0.1/2
-            should_draw = True
         elif keys[pygame.K_r]:
-            points = np.dot(ROTATION_MATRIX, (points - screen_size/2).T).T + screen_size/2
-            should_draw = True
+            points = np.dot(ROTATION_MATRIX, (points - renderer.screen_size/2).T).T + renderer.screen_size/2
         elif keys[pygame.K_c]:
             skip_until_end = True
         
-        if can_continue or skip_until_end:
-            can_continue = False
-            if dijkstra.dijkstra_step(dijkstra_table, graph, game.dijkstra_mode):
-                counter += 1
-        
-        game.screen.blit(font_display, (0, 0))
-
-        pygame.display.flip()
-
-        # use this to make screen video
-        # filename = "screen_%04d.png" % ( counter )
-        # pygame.image.save( game.screen, filename )
-
-        game.clock.tick(20)  # limits FPS to 60
-
+        with profiler.phase("search"):
+            if seek_to is not None:
+                # The first step is done when the level is shown
+                search.seek(max(seek_to, 1))
+                touched.extend(search.touched)
+                seek_to = None
+            elif can_continue or skip_until_end:
+                can_continue = False
+                if search.step():
+                    touched.extend(search.touched)
+                if dijkstra_table[graph.end_idx, 2] == 1:
+                    skip_until_end = False
+        counter = search.position - 1
+
+        profiler.set_counters(**search.counters())
+        with profiler.phase("tick"):
+            game.clock.tick(20)  # limits FPS to 60
+        profiler.end_frame()
+
+    if profiler.recording:
+        toggle_profile_recording()
+
+
+def toggle_profile_recording() -> str | None:
+    """Start recording the frames, or write the recorded ones to the working directory and describe them"""
+    if not profiler.recording:
+        profiler.start_recording()
+        return None
+    frames = profiler.stop_recording()
+    profiler.write_json(frames, "grasim-profile.json")
+    profiler.write_chrome_trace(frames, "grasim-profile.trace.json")
+    return f"Wrote {len(frames)} frames to grasim-profile.json and grasim-profile.trace.json"
 
 def select_level_screen(game: Game, savedir : pathlib.Path):
-
-    saves = [x for x in savedir.glob("*") if x.is_dir or x.suffix == ".graph"]
-
-    if len(saves) == 0:
-        saves.append(f"Couldn't find any saves in dir \"{savedir.name}\". You can start the programm with the -d <Directory> flag")
-
-    saves.sort(key=lambda x: x.name)
+    root = savedir.resolve()
+    indexes : dict[pathlib.Path, SaveIndex] = {} # directories visited so far
+    def open_index(directory : pathlib.Path) -> SaveIndex:
+        if directory.resolve() not in indexes:
+            indexes[directory.resolve()] = SaveIndex(directory)
+        return indexes[directory.resolve()]
+
+    index = open_index(savedir)
+    last_refresh = time.monotonic()
     selected_save_id = 0
     running = True
     while running:
+        saves = index.entries()
+        if savedir.resolve() != root:
+            saves = [SaveInfo("..", True, 0, 0, indexed=True)] + saves
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
@@ -250,42 +290,59 @@ def select_level_screen(game: Game, savedir : pathlib.Path):
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_d:
                     game.dijkstra_mode = not game.dijkstra_mode
+                if event.key == pygame.K_b:
+                    game.bidirectional = not game.bidirectional
                 if event.key == pygame.K_UP:
                     selected_save_id -= 1
                 if event.key == pygame.K_DOWN:
                     selected_save_id += 1
                 if event.key == pygame.K_BACKSPACE:
                     running = False
-                if event.key == pygame.K_RETURN:
+                if event.key == pygame.K_RETURN and saves:
                     # Savefile was selected in selectio screen
-                    if saves[selected_save_id].is_dir():
-                        savedir = saves[selected_save_id]
-                        saves = [x for x in savedir.glob("*") if x.is_dir or x.suffix == ".graph"] \
-                                + [ savedir.joinpath("..") ]
-                        saves.sort(key=lambda x: x.name)
+                    save = saves[selected_save_id % len(saves)]
+                    if save.is_dir:
+                        savedir = savedir.joinpath(save.name)
+                        index = open_index(savedir)
+                        index.refresh()
+                        selected_save_id = 0
+                        break
                     else:
-                        graphtext = read_file(saves[selected_save_id])
-                        show_level(graphtext, game)
+                        show_level(savedir.joinpath(save.name), game)
+                        index.refresh() # the save may have been edited meanwhile
 
-                selected_save_id = selected_save_id % len(saves)
+        if time.monotonic() - last_refresh > config.INDEX_REFRESH_SECONDS:
+            index.refresh()
+            last_refresh = time.monotonic()
 
         game.screen.fill(config.LEVEL_SELECTION_BACKGROUND)        
         
-        # Draw
+        # Draw, only the saves that fit on the screen
         yDrawPosition = 100 # Where to draw the level name
-        for i, savename in enumerate(saves[selected_save_id:] + saves[:selected_save_id]):
-            color = config.LEVEL_SELECTION_TEXT_BACK
-            if savename == saves[selected_save_id]:
-                color = config.LEVEL_SELECTION_TEXT_BACK_HOVER
-            save_name_screen = game.font.render(savename.name, False, config.LEVEL_SELECTION_TEXT, color)
+        if not saves:
+            text = f"Couldn't find any saves in dir \"{savedir.name}\". You can start the programm with the -d <Directory> flag"
+            game.screen.blit(game.text_cache.render(text, False, config.LEVEL_SELECTION_TEXT, config.LEVEL_SELECTION_TEXT_BACK), (100, yDrawPosition))
+        else:
+            selected_save_id = selected_save_id % len(saves)
+        for i in range(len(saves)):
+            if yDrawPosition > game.screen.get_size()[1] - 40:
+                break
+            save = saves[(selected_save_id + i) % len(saves)]
+            color = config.LEVEL_SELECTION_TEXT_BACK_HOVER if i == 0 else config.LEVEL_SELECTION_TEXT_BACK
+            save_name_screen = game.text_cache.render(save.name, False, config.LEVEL_SELECTION_TEXT, color)
             game.screen.blit(save_name_screen, (100, yDrawPosition))
+            summary_screen = game.text_cache.render(save.summary(), False, config.LEVEL_SELECTION_SUMMARY_TEXT, config.LEVEL_SELECTION_TEXT_BACK)
+            game.screen.blit(summary_screen, (110 + max(save_name_screen.get_size()[0], 300), yDrawPosition))
             yDrawPosition += save_name_screen.get_size()[1]
         
-        if game.dijkstra_mode: # If dijkstra is chosen
-            dijkstramode_text = "Current mode is: Dijkstra   Press D to switch to A*"
+        mode, other_mode = ("Dijkstra", "A*") if game.dijkstra_mode else ("A*", "Dijkstra")
+        if game.bidirectional:
+            dijkstramode_text = f"Current mode is: bidirectional {mode}   Press D to switch to {other_mode}, B for one direction"
         else:
-            dijkstramode_text = "Current mode is: A*         Press D to switch to Dijkstra"
-        dijkstramode_font = game.font.render(dijkstramode_text, False, config.LEGEND_TEXT)
+            dijkstramode_text = f"Current mode is: {mode}   Press D to switch to {other_mode}, B for bidirectional"
+        if index.pending():
+            dijkstramode_text = f"Indexing {index.pending()} saves   " + dijkstramode_text
+        dijkstramode_font = game.text_cache.render(dijkstramode_text, False, config.LEGEND_TEXT)
         game.screen.blit(dijkstramode_font, (game.screen.get_size()[0]-dijkstramode_font.get_size()[0], game.screen.get_size()[1]-20))
 
         pygame.display.flip()
@@ -293,7 +350,7 @@ def select_level_screen(game: Game, savedir : pathlib.Path):
 
 def start_game(safedir = "."):
     # pygame setup
-    game = Game()
+    game = Game.create()
 
     running = True
     while running:
@@ -311,7 +368,7 @@ def start_game(safedir = "."):
         pygame.draw.rect(game.screen, "white", 
             (game.screen.get_size()[0]/2-button_size[0]/2, game.screen.get_size()[1]/2-button_size[1]/2, button_size[0], button_size[1]), 2)
         
-        text_surface = game.font.render("Press enter to start", True, "white", "black")
+        text_surface = game.text_cache.render("Press enter to start", True, "white", "black")
         game.screen.blit(text_surface, (game.screen.get_size()[0]/2 - text_surface.get_size()[0]/2, game.screen.get_size()[1]/2 - text_surface.get_size()[1]/2))
 
         pygame.display.flip()
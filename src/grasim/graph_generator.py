@@ -1,7 +1,15 @@
-import igraph as ig
+"""Random graphs for tests and benchmarks, used by `grasim generate`"""
+import io
+import pathlib
+import sys
+from dataclasses import dataclass
+from typing import TextIO
 import numpy as np
 from grasim.savefile import WaypointGraph
 
+# Nodes and edges are generated and written in chunks of this size
+GENERATE_CHUNK_SIZE = 1 << 16
+
 character = list("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
 def number_to_alphabet(i : int):
     full = ""
@@ -13,21 +21,205 @@ def number_to_alphabet(i : int):
         i = i // len(character)
     return full[::-1]
 
-def create_random_graph() -> str:
+@dataclass
+class GeneratedGraph:
+    """
+    Nodes with coordinates and undirected edges (every pair once).
+    The edges are at least as long as the euclidean distance of their nodes,
+    so the distance to END is an admissible heuristic.
+    """
+    points : np.ndarray
+    sources : np.ndarray
+    targets : np.ndarray
+    weights : np.ndarray
+    start_idx : int
+    end_idx : int
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.points)
+
+    def heuristics(self) -> np.ndarray:
+        return np.hypot(*(self.points - self.points[self.end_idx]).T)
+
+def _corners(points : np.ndarray) -> tuple[int, int]:
+    """START and END in opposite corners, so the search has to cross the graph"""
+    diagonal = points.sum(1)
+    return int(np.argmin(diagonal)), int(np.argmax(diagonal))
+
+def _unique_pairs(sources : np.ndarray, targets : np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Undirected edges without self loops, every pair once"""
+    low, high = np.minimum(sources, targets), np.maximum(sources, targets)
+    keep = low != high
+    width = np.int64(high.max(initial=0)) + 1
+    keys = np.unique(low[keep].astype(np.int64) * width + high[keep])
+    return keys // width, keys % width
+
+def _lengths(points : np.ndarray, sources : np.ndarray, targets : np.ndarray) -> np.ndarray:
+    return np.hypot(*(points[sources] - points[targets]).T)
+
+def knn_graph(num_nodes : int, rng : np.random.Generator, degree : int = 4) -> GeneratedGraph:
+    """
+    Random points, every point is connected to its degree nearest neighbours.
+    Neighbours are searched in the 3x3 cells of a grid with about degree points per cell.
+    """
+    points = rng.random((num_nodes, 2)) * np.sqrt(num_nodes) * 10
+    cells_per_axis = max(1, int(np.sqrt(num_nodes / degree)))
+    cell = np.minimum((points / (points.max(0) + 1e-9) * cells_per_axis).astype(np.int64), cells_per_axis - 1)
+    cell_ids = cell[:, 1] * cells_per_axis + cell[:, 0]
+    # Number the nodes cell by cell, so neighbours are close in memory
+    order = np.argsort(cell_ids, kind="stable")
+    points, cell, cell_ids = points[order], cell[order], cell_ids[order]
+
+    # Nodes of every cell in a padded table, the last row is an empty cell for the border
+    num_cells = cells_per_axis ** 2
+    counts = np.bincount(cell_ids, minlength=num_cells)
+    first = np.cumsum(counts) - counts
+    slots = np.arange(counts.max())
+    table = np.where(slots < counts[:, None], first[:, None] + slots, -1)
+    table = np.vstack((table, np.full(len(slots), -1)))
+
+    offsets = np.array([(dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1)])
+    x, y = points.T.copy()
+    sources, targets = [], []
+    for begin in range(0, num_nodes, GENERATE_CHUNK_SIZE):
+        nodes = np.arange(begin, min(begin + GENERATE_CHUNK_SIZE, num_nodes))
+        neighbor_cells = cell[nodes, None, :] + offsets
+        inside = ((neighbor_cells >= 0) & (neighbor_cells < cells_per_axis)).all(2)
+        neighbor_ids = np.where(inside, neighbor_cells[..., 1] * cells_per_axis + neighbor_cells[..., 0], num_cells)
+        candidates = table[neighbor_ids].reshape(len(nodes), -1)
+
+        # Squared distances, the empty slots (-1) of the table are never chosen
+        distances = np.square(x[candidates] - x[nodes, None]) + np.square(y[candidates] - y[nodes, None])
+        distances[(candidates == -1) | (candidates == nodes[:, None])] = np.inf
+        nearest = min(degree, candidates.shape[1] - 1)
+        chosen = np.argpartition(distances, nearest, axis=1)[:, :nearest]
+        found = np.isfinite(np.take_along_axis(distances, chosen, 1))
+        sources.append(np.broadcast_to(nodes[:, None], chosen.shape)[found])
+        targets.append(np.take_along_axis(candidates, chosen, 1)[found])
+
+    sources, targets = _unique_pairs(np.concatenate(sources), np.concatenate(targets))
+    return GeneratedGraph(points, sources, targets, _lengths(points, sources, targets), *_corners(points))
+
+def grid_graph(num_nodes : int, rng : np.random.Generator, degree : int = 4) -> GeneratedGraph:
+    """
+    Road like: a jittered grid where some streets are missing and the others
+    are up to 30% longer than the straight line between their crossings
+    """
+    columns = int(np.ceil(np.sqrt(num_nodes)))
+    nodes = np.arange(num_nodes)
+    points = np.column_stack((nodes % columns, nodes // columns)) * 10.0 + rng.uniform(-3, 3, (num_nodes, 2))
+
+    right = nodes[(nodes % columns != columns - 1) & (nodes + 1 < num_nodes)]
+    down = nodes[nodes + columns < num_nodes]
+    sources = np.concatenate((right, down))
+    targets = np.concatenate((right + 1, down + columns))
+    # degree 4 keeps 90% of the streets, lower degrees fewer
+    keep = rng.random(len(sources)) < min(degree, 4) / 4 * 0.9
+    # The streets of an L shaped route between START and END are always kept, so END can be reached
+    start, end = _corners(points)
+    (row_a, column_a), (row_b, column_b) = sorted([divmod(start, columns), divmod(end, columns)])
+    route_right = row_a * columns + np.arange(min(column_a, column_b), max(column_a, column_b))
+    route_down = np.arange(row_a, row_b) * columns + column_b
+    keep |= np.concatenate((np.isin(right, route_right), np.isin(down, route_down)))
+    sources, targets = sources[keep], targets[keep]
+    weights = _lengths(points, sources, targets) * rng.uniform(1, 1.3, len(sources))
+    return GeneratedGraph(points, sources, targets, weights, start, end)
+
+def scalefree_graph(num_nodes : int, rng : np.random.Generator, degree : int = 4, exponent : float = 2.5) -> GeneratedGraph:
+    """
+    Random points connected by a random tree (so the graph is connected) and
+    degree * num_nodes / 2 edges between nodes drawn with power law weights
+    (Chung-Lu), which gives a few hubs with very many edges
+    """
+    points = rng.random((num_nodes, 2)) * np.sqrt(num_nodes) * 10
+    nodes = np.arange(1, num_nodes)
+    parents = (rng.random(num_nodes - 1) * nodes).astype(np.int64)
+
+    popularity = np.arange(1, num_nodes + 1) ** (-1 / (exponent - 1))
+    popularity = rng.permutation(popularity / popularity.sum())
+    extra = max(0, num_nodes * degree // 2 - (num_nodes - 1))
+    ends = rng.choice(num_nodes, size=(2, extra), p=popularity)
+
+    sources, targets = _unique_pairs(np.concatenate((nodes, ends[0])), np.concatenate((parents, ends[1])))
+    return GeneratedGraph(points, sources, targets, _lengths(points, sources, targets), *_corners(points))
+
+GENERATORS = {"knn": knn_graph, "grid": grid_graph, "scalefree": scalefree_graph}
+
+def generate_graph(kind : str, num_nodes : int, seed : int | None = None, degree : int = 4) -> GeneratedGraph:
+    """The same seed gives the same graph"""
+    return GENERATORS[kind](num_nodes, np.random.default_rng(seed), degree)
+
+def node_names(first : int, last : int) -> list[str]:
+    return [f"n{i}" for i in range(first, last)]
+
+def write_graph_text(generated : GeneratedGraph, f : TextIO):
+    """
+    Write the graph language chunk by chunk. Distances are rounded up and
+    heuristics down, so the heuristics stay admissible.
+    """
+    heuristics = np.floor(generated.heuristics() * 1000) / 1000
+    for begin in range(0, generated.num_nodes, GENERATE_CHUNK_SIZE):
+        end = min(begin + GENERATE_CHUNK_SIZE, generated.num_nodes)
+        f.writelines(f"{name}({heuristic:.3f})\n" for name, heuristic in zip(node_names(begin, end), heuristics[begin:end].tolist()))
+
+    weights = np.ceil(generated.weights * 1000) / 1000
+    for begin in range(0, len(weights), GENERATE_CHUNK_SIZE):
+        end = begin + GENERATE_CHUNK_SIZE
+        f.writelines(f"n{node1} -{weight:.3f}- n{node2}\n" for node1, weight, node2
+                     in zip(generated.sources[begin:end].tolist(), weights[begin:end].tolist(), generated.targets[begin:end].tolist()))
+
+    f.write(f"START n{generated.start_idx}\nEND n{generated.end_idx}\n")
+
+def to_waypoint_graph(generated : GeneratedGraph) -> WaypointGraph:
+    """The graph as parse_file would return it, without writing and parsing the text"""
+    names = node_names(0, generated.num_nodes)
+    names[generated.start_idx] = "START " + names[generated.start_idx]
+    if generated.end_idx != generated.start_idx:
+        names[generated.end_idx] = "END " + names[generated.end_idx]
+    return WaypointGraph.from_edges(
+        np.concatenate((generated.sources, generated.targets)),
+        np.concatenate((generated.targets, generated.sources)),
+        np.tile(generated.weights, 2),
+        generated.num_nodes,
+        generated.start_idx,
+        generated.end_idx,
+        dict(zip(names, range(generated.num_nodes))),
+        generated.heuristics(),
+    )
+
+def create_random_graph(num_nodes : int = 20, kind : str = "knn", seed : int | None = None) -> str:
     """Create a random generated graph"""
-    k = 20
-    # Generate points in euklidean space so use of a* is always valid
-    points = np.random.randint(0, 100, size=(k, 2))
-    
-    # choose random start and end
-    start_idx = np.random.choice(points.shape[0])
-    stop_idx = np.random.choice(points.shape[0])
-    
-    return ""
+    text = io.StringIO()
+    write_graph_text(generate_graph(kind, num_nodes, seed), text)
+    return text.getvalue()
+
+def generate_command(args) -> int:
+    generated = generate_graph(args.kind, args.nodes, args.seed, args.degree)
+    if args.output is None:
+        write_graph_text(generated, sys.stdout)
+    elif pathlib.Path(args.output).suffix == ".npz":
+        from grasim import cache # cache imports most of the package
+        cache.write_compiled(to_waypoint_graph(generated), pathlib.Path(args.output))
+    else:
+        with open(args.output, "w") as f:
+            write_graph_text(generated, f)
+    print(f"{generated.num_nodes} nodes, {len(generated.weights)} edges", file=sys.stderr)
+    return 0
+
+def add_generate_parser(subparsers):
+    parser = subparsers.add_parser("generate", help="Write a random graph")
+    parser.add_argument("kind", choices=list(GENERATORS))
+    parser.add_argument("nodes", type=int, help="Number of nodes")
+    parser.add_argument("-o", "--output", help=".graph file or .npz for the compiled form, default is stdout")
+    parser.add_argument("-s", "--seed", type=int, help="Seed of the random generator")
+    parser.add_argument("-k", "--degree", type=int, default=4, help="Average number of neighbours")
+    parser.set_defaults(func=generate_command)
 
 
 def famous_graphs_to_files():
     """Function can be used to extract famous graphs out of igraph library"""
+    import igraph as ig
     famous = [
         "Bull",
         "Chvatal",
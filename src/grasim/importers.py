@@ -0,0 +1,178 @@
+"""
+Import of DIMACS (.gr, .co) and CSV edge lists, used by `grasim import`.
+
+The files are read chunk by chunk straight into the edge arrays. Nodes are
+the integer ids of the file, their names are not stored in a dict
+(savefile.NumberedNodes), so the memory is about 40 bytes per edge.
+"""
+import io
+import os
+import pathlib
+import sys
+import warnings
+from typing import Callable, Iterator
+import numpy as np
+from grasim.errors import ParseError
+from grasim.savefile import NumberedNodes, WaypointGraph, _GrowableArray
+
+# Bytes read and parsed at once
+IMPORT_CHUNK_BYTES = 1 << 24
+
+
+def _read_chunks(path : pathlib.Path, progress : Callable[[int, int], None] | None = None) -> Iterator[str]:
+    """Text of the file in chunks of whole lines"""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        rest = b""
+        while chunk := f.read(IMPORT_CHUNK_BYTES):
+            chunk = rest + chunk
+            last_line_end = chunk.rfind(b"\n") + 1
+            rest = chunk[last_line_end:]
+            if progress is not None:
+                progress(f.tell(), size)
+            yield chunk[:last_line_end].decode()
+        if rest:
+            yield rest.decode()
+
+def _load_rows(text : str, path : pathlib.Path, comments, usecols, delimiter=None) -> np.ndarray:
+    try:
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", "loadtxt: input contained no data")
+            return np.loadtxt(io.StringIO(text), comments=comments, usecols=usecols, delimiter=delimiter, ndmin=2)
+    except ValueError as e:
+        raise ParseError(f"Invalid line: {e}", (str(path), None, None, None)) from None
+
+def _dimacs_problem_size(path : pathlib.Path) -> int | None:
+    """Number of nodes in the problem line (p sp n m) at the start of the file"""
+    with open(path) as f:
+        for line in f:
+            if line.startswith("p"):
+                return int(line.split()[2])
+            if not line.startswith("c"):
+                return None
+    return None
+
+def _node_indices(path : pathlib.Path, ids : np.ndarray, node_ids : np.ndarray, name : str = "Node") -> np.ndarray:
+    """Positions of node_ids in the sorted ids, the first one that is not there is named in a ParseError"""
+    idx = np.searchsorted(ids, node_ids)
+    unknown = idx == len(ids)
+    unknown[~unknown] = ids[idx[~unknown]] != node_ids[~unknown]
+    if unknown.any():
+        raise ParseError(f"{name} {node_ids[unknown][0]} is not a node of the graph", (str(path), None, None, None))
+    return idx
+
+def _build_graph(path : pathlib.Path, sources : np.ndarray, targets : np.ndarray, weights : np.ndarray,
+                 ids : np.ndarray | None, start : int, end : int) -> WaypointGraph:
+    """Graph of edges between node ids, ids are all ids (sorted) or None to use the ones of the edges"""
+    if ids is None:
+        ids, inverse = np.unique(np.concatenate((sources, targets)), return_inverse=True)
+        sources, targets = inverse[:len(sources)], inverse[len(sources):]
+    else:
+        # e.g. DIMACS arcs of nodes above the node count of the problem line
+        sources, targets = _node_indices(path, ids, sources), _node_indices(path, ids, targets)
+    start_idx = int(_node_indices(path, ids, np.array([start]), "START")[0])
+    end_idx = int(_node_indices(path, ids, np.array([end]), "END")[0])
+    return WaypointGraph.from_edges(sources, targets, weights, len(ids), start_idx, end_idx,
+                                    NumberedNodes(ids, start_idx, end_idx), np.zeros(len(ids)),
+                                    filename=str(path), keep_shortest=True)
+
+def read_dimacs_coordinates(path : pathlib.Path, ids : np.ndarray) -> np.ndarray:
+    """[latitude, longitude] of the nodes from a .co file (v id longitude latitude in millionths of degrees)"""
+    coords = np.full((len(ids), 2), np.nan)
+    for text in _read_chunks(path):
+        rows = _load_rows(text, path, ("c", "p"), (1, 2, 3))
+        coords[_node_indices(path, ids, rows[:, 0].astype(np.int64))] = rows[:, [2, 1]] / 1e6
+    return coords
+
+def read_dimacs(path : str | os.PathLike, start : int, end : int, coordinates : str | os.PathLike | None = None,
+                progress : Callable[[int, int], None] | None = None) -> WaypointGraph:
+    """Graph of a DIMACS shortest path file (a u v w lines are directed arcs), optionally with its .co file"""
+    path = pathlib.Path(path)
+    sources, targets, weights = _GrowableArray(np.int64), _GrowableArray(np.int64), _GrowableArray(np.float64)
+    for text in _read_chunks(path, progress):
+        rows = _load_rows(text, path, ("c", "p"), (1, 2, 3))
+        sources.extend(rows[:, 0].astype(np.int64))
+        targets.extend(rows[:, 1].astype(np.int64))
+        weights.extend(rows[:, 2])
+
+    num_nodes = _dimacs_problem_size(path)
+    ids = None if num_nodes is None else np.arange(1, num_nodes + 1)
+    graph = _build_graph(path, sources.view(), targets.view(), weights.view(), ids, start, end)
+    if coordinates is not None:
+        graph.coords = read_dimacs_coordinates(pathlib.Path(coordinates), graph.node_lookup.ids)
+        graph.metric = "haversine"
+    return graph
+
+def read_csv(path : str | os.PathLike, start : int, end : int, delimiter : str = ",", columns : tuple[int, int, int] = (0, 1, 2),
+             undirected : bool = False, progress : Callable[[int, int], None] | None = None) -> WaypointGraph:
+    """
+    Graph of a CSV edge list with integer node ids, columns are the source,
+    target and weight columns. A header line is skipped.
+    """
+    path = pathlib.Path(path)
+    sources, targets, weights = _GrowableArray(np.int64), _GrowableArray(np.int64), _GrowableArray(np.float64)
+    for i, text in enumerate(_read_chunks(path, progress)):
+        if i == 0:
+            first_line, _, rest = text.partition("\n")
+            try:
+                [float(first_line.split(delimiter)[column]) for column in columns]
+            except (ValueError, IndexError):
+                text = rest # header
+        rows = _load_rows(text, path, "#", columns, delimiter)
+        sources.extend(rows[:, 0].astype(np.int64))
+        targets.extend(rows[:, 1].astype(np.int64))
+        weights.extend(rows[:, 2])
+
+    sources, targets, weights = sources.view(), targets.view(), weights.view()
+    if undirected:
+        sources, targets, weights = np.concatenate((sources, targets)), np.concatenate((targets, sources)), np.tile(weights, 2)
+    return _build_graph(path, sources, targets, weights, None, start, end)
+
+def import_file(path : str | os.PathLike, start : int, end : int, **options) -> WaypointGraph:
+    """Import by file extension: .gr (DIMACS, a .co file next to it is read too), otherwise CSV"""
+    path = pathlib.Path(path)
+    if path.suffix == ".gr":
+        coordinates = options.pop("coordinates", None)
+        if coordinates is None and path.with_suffix(".co").exists():
+            coordinates = path.with_suffix(".co")
+        return read_dimacs(path, start, end, coordinates, **options)
+    return read_csv(path, start, end, **options)
+
+def import_command(args) -> int:
+    from grasim import cache # cache imports most of the package
+    def progress(done : int, total : int):
+        print(f"\r{done / 2**20:.0f} of {total / 2**20:.0f} MB", end="", file=sys.stderr, flush=True)
+
+    path = pathlib.Path(args.path)
+    if path.suffix == ".gr":
+        options = dict(coordinates=args.coordinates)
+    else:
+        options = dict(delimiter=args.delimiter, columns=tuple(args.columns), undirected=args.undirected)
+    try:
+        graph = import_file(path, args.start, args.end, progress=progress, **options)
+    except (OSError, ParseError) as e:
+        print(f"\nfailed {path}: {e}", file=sys.stderr)
+        return 1
+    if args.coordinate_scale is not None and graph.coords is not None:
+        graph.coordinate_scale = args.coordinate_scale
+        graph.heuristics = graph.coordinate_heuristics()
+
+    output = pathlib.Path(args.output) if args.output is not None else path.with_suffix(".npz")
+    cache.write_compiled(graph, output)
+    print(f"\n{graph.num_nodes} nodes, {graph.num_edges} edges written to {output}", file=sys.stderr)
+    return 0
+
+def add_import_parser(subparsers):
+    parser = subparsers.add_parser("import", help="Convert a DIMACS .gr or CSV edge list to a compiled .npz graph")
+    parser.add_argument("path", help=".gr file (DIMACS) or CSV edge list")
+    parser.add_argument("--start", type=int, required=True, help="Id of the START node")
+    parser.add_argument("--end", type=int, required=True, help="Id of the END node")
+    parser.add_argument("-o", "--output", help="Compiled graph, default is the path with .npz")
+    parser.add_argument("--coordinates", help="DIMACS .co file, default is the .co file next to the .gr file")
+    parser.add_argument("--coordinate-scale", type=float,
+                        help="Use the great circle distance in km times this as heuristic (needs coordinates)")
+    parser.add_argument("--delimiter", default=",", help="CSV delimiter")
+    parser.add_argument("--columns", type=int, nargs=3, default=[0, 1, 2], metavar=("SOURCE", "TARGET", "WEIGHT"),
+                        help="CSV columns of the source, target and weight")
+    parser.add_argument("--undirected", action="store_true", help="CSV edges go both ways")
+    parser.set_defaults(func=import_command)
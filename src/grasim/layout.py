@@ -0,0 +1,117 @@
+"""Node positions of a graph, stored next to the save"""
+import hashlib
+import os
+import pathlib
+import tempfile
+import numpy as np
+import grasim.config as config
+from grasim.coordinates import project
+from grasim.savefile import WaypointGraph
+
+# Increase when the stored layouts are no longer valid
+LAYOUT_VERSION = 1
+
+_process_pool = None # ProcessPoolExecutor for large layouts, created on first use
+
+
+def layout_edges(graph : WaypointGraph) -> np.ndarray:
+    """Every connection once, direction does not matter for the layout"""
+    edges = np.column_stack((graph.edge_sources(), graph.indices))
+    return np.unique(np.sort(edges, axis=1), axis=0)
+
+def layout_algorithm(num_nodes : int) -> str:
+    if num_nodes < 5:
+        return "circle"
+    if num_nodes > config.LAYOUT_LARGE_GRAPH_NODES:
+        return "drl"
+    return "auto"
+
+def compute_layout(num_nodes : int, edges : np.ndarray, seed : np.ndarray | None = None) -> np.ndarray:
+    """Use igraph to make the graph pretty: position nodes better. seed are start positions for Fruchterman-Reingold"""
+    # Fix issue https://github.com/green-sh/grasim/issues/15 ugly graphs
+    import igraph as ig
+    graph = ig.Graph(n=num_nodes, edges=edges.tolist())
+    if seed is not None:
+        return np.array(graph.layout("fr", seed=seed.tolist()).coords).reshape(num_nodes, 2)
+    return np.array(graph.layout(layout_algorithm(num_nodes)).coords).reshape(num_nodes, 2)
+
+def coordinate_seed(graph : WaypointGraph) -> np.ndarray:
+    """Projected coordinates, nodes without them start at random positions around the others"""
+    points = project(graph.coords, graph.metric)
+    missing = np.isnan(points).any(1)
+    low, high = np.nanmin(points, 0), np.nanmax(points, 0)
+    points[missing] = np.random.default_rng(0).uniform(low, high, (missing.sum(), 2))
+    return points
+
+def content_hash(save : pathlib.Path) -> str:
+    digest = hashlib.sha1()
+    with open(save, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def layout_file(save : pathlib.Path) -> pathlib.Path:
+    """Hidden file next to the save"""
+    return save.with_name(f".{save.name}.layout.npz")
+
+def load_layout(save : pathlib.Path, digest : str, num_nodes : int) -> np.ndarray | None:
+    """The stored layout of the save, None if there is none for this content"""
+    try:
+        with np.load(layout_file(save), allow_pickle=False) as data:
+            if data["version"] == LAYOUT_VERSION and str(data["content_hash"]) == digest \
+                and data["points"].shape == (num_nodes, 2):
+                return data["points"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+def store_layout(save : pathlib.Path, digest : str, points : np.ndarray):
+    target = layout_file(save)
+    temporary = None
+    try:
+        # Hidden like the layout file, so the save index does not list it while it is written
+        with tempfile.NamedTemporaryFile(dir=target.parent, prefix=".", suffix=".tmp", delete=False) as f:
+            temporary = f.name
+            np.savez(f, version=LAYOUT_VERSION, content_hash=digest, points=points)
+        os.replace(temporary, target)
+    except OSError:
+        # The stored layout is only an optimization
+        if temporary is not None:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+
+def _process_pool_executor():
+    global _process_pool
+    if _process_pool is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        _process_pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+    return _process_pool
+
+def load_or_compute_layout(save : pathlib.Path | None, graph : WaypointGraph) -> np.ndarray:
+    """Stored layout of the save, otherwise compute it (large graphs in a separate process) and store it"""
+    seed = None
+    if graph.coords is not None and not np.isnan(graph.coords).any():
+        # Nodes are shown at their coordinates, igraph is not needed
+        return project(graph.coords, graph.metric)
+    if graph.coords is not None and not np.isnan(graph.coords).all():
+        seed = coordinate_seed(graph)
+
+    digest = None
+    if save is not None:
+        digest = content_hash(save)
+        points = load_layout(save, digest, graph.num_nodes)
+        if points is not None:
+            return points
+
+    edges = layout_edges(graph)
+    if graph.num_nodes > config.LAYOUT_IN_PROCESS_NODES:
+        points = _process_pool_executor().submit(compute_layout, graph.num_nodes, edges, seed).result()
+    else:
+        points = compute_layout(graph.num_nodes, edges, seed)
+
+    if save is not None:
+        store_layout(save, digest, points)
+    return points
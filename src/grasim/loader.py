@@ -0,0 +1,124 @@
+"""
+Loading a level (graph, layout and landmarks) on a background thread.
+
+The game shows the progress while it waits, other code can use the same
+loader to load the next graph while the current one is used:
+
+    for save, level in prefetch(saves):
+        ...
+"""
+import os
+import pathlib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+import numpy as np
+from grasim import cache, layout
+from grasim.dijkstra.landmarks import Landmarks
+from grasim.savefile import WaypointGraph
+
+# Levels loaded at the same time, one shown and one prefetched
+LOADER_THREADS = 2
+
+_thread_pool : ThreadPoolExecutor | None = None
+
+
+class LoadCancelled(Exception):
+    pass
+
+@dataclass
+class LoadedLevel:
+    graph : WaypointGraph
+    points : np.ndarray
+    landmarks : Landmarks | None # only for graphs without heuristics if landmarks were asked for
+
+class LevelLoader:
+    """
+    Parses a save (or loads it from the compiled cache), loads or computes
+    its layout and, if landmarks > 0 and the save has no heuristics, its
+    landmarks. phase, done_bytes and total_bytes can be read while it runs.
+    """
+
+    def __init__(self, save : str | os.PathLike, landmarks : int = 0):
+        global _thread_pool
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=LOADER_THREADS, thread_name_prefix="loader")
+        self.save = pathlib.Path(save)
+        self.landmarks = landmarks
+        self.phase = "waiting"
+        self.done_bytes = 0
+        self.total_bytes = 0
+        self._cancelled = threading.Event()
+        self.started = time.perf_counter()
+        self.future : Future = _thread_pool.submit(self._load)
+
+    def _progress(self, done_bytes : int, total_bytes : int):
+        if self._cancelled.is_set():
+            raise LoadCancelled(str(self.save))
+        self.done_bytes, self.total_bytes = done_bytes, total_bytes
+
+    def _enter(self, phase : str):
+        self._progress(self.done_bytes, self.total_bytes)
+        self.phase = phase
+
+    def _load(self) -> LoadedLevel:
+        self._enter("parse")
+        self.total_bytes = self.save.stat().st_size
+        graph = cache.load_graph(self.save, progress=self._progress)
+        self.done_bytes = self.total_bytes
+
+        self._enter("layout")
+        points = layout.load_or_compute_layout(self.save, graph)
+
+        landmarks = None
+        if self.landmarks > 0 and not graph.heuristics.any():
+            self._enter("landmarks")
+            landmarks = cache.load_landmarks(self.save, graph, self.landmarks)
+        self._enter("done")
+        return LoadedLevel(graph, points, landmarks)
+
+    def cancel(self):
+        """Stop at the next progress report, result() then raises LoadCancelled"""
+        self._cancelled.set()
+        self.future.cancel()
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def describe(self) -> str:
+        """Phase and progress for the loading screen"""
+        if self.phase == "parse" and self.total_bytes:
+            return f"Parsing {self.done_bytes / 2**20:.1f} of {self.total_bytes / 2**20:.1f} MB"
+        return {"waiting": "Waiting", "layout": "Computing layout", "landmarks": "Selecting landmarks"}.get(self.phase, "Loading")
+
+    def result(self, timeout : float | None = None) -> LoadedLevel:
+        """The loaded level, raises the error of the load (ParseError, LoadCancelled, ...)"""
+        if self.future.cancelled():
+            raise LoadCancelled(str(self.save))
+        return self.future.result(timeout)
+
+def prefetch(saves : Iterable[str | os.PathLike], landmarks : int = 0) -> Iterator[tuple[pathlib.Path, LoadedLevel | Exception]]:
+    """
+    Load saves one after another, the next one is loaded while the current one
+    is used. Saves that fail to load are yielded with the exception.
+    """
+    saves = iter(saves)
+    loader = next((LevelLoader(save, landmarks) for save in saves), None)
+    while loader is not None:
+        next_loader = next((LevelLoader(save, landmarks) for save in saves), None)
+        try:
+            level = loader.result()
+        except Exception as e:
+            level = e
+        try:
+            yield loader.save, level
+        except GeneratorExit:
+            if next_loader is not None:
+                next_loader.cancel()
+            raise
+        loader = next_loader
@@ -0,0 +1,123 @@
+"""
+Timings of the phases of every frame and counters of the search.
+
+The viewer reports to the module level profiler, other code can read it
+with hooks:
+
+    from grasim import profiling
+    profiling.profiler.add_hook(lambda frame: print(frame["phases"]))
+
+Recorded frames can be written as JSON or as a Chrome trace
+(chrome://tracing, https://ui.perfetto.dev).
+"""
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+# Frames kept for the averages of the HUD
+HISTORY_FRAMES = 20
+# Recorded frames are dropped from the start after this many
+MAX_RECORDED_FRAMES = 100_000
+
+
+class Profiler:
+    def __init__(self):
+        self.phases : dict[str, float] = {} # seconds per phase of the current frame
+        self.counters : dict[str, float] = {}
+        self.history : deque[dict] = deque(maxlen=HISTORY_FRAMES)
+        self.recorded : deque[dict] | None = None # all frames while recording
+        self.hooks : list[Callable[[dict], None]] = []
+        self._spans : list[tuple[str, float, float]] = [] # phase, start, duration for the trace
+        self._frame_start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name : str) -> Iterator[None]:
+        """Time a block, the time is added to the phase of the current frame"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - started
+            self.phases[name] = self.phases.get(name, 0.0) + duration
+            if self.recorded is not None:
+                self._spans.append((name, started, duration))
+
+    def set_counters(self, **counters : float):
+        self.counters.update(counters)
+
+    def end_frame(self) -> dict:
+        """Close the current frame and pass it to the hooks"""
+        now = time.perf_counter()
+        frame = {"start": self._frame_start, "time": now - self._frame_start,
+                 "phases": self.phases, "counters": dict(self.counters)}
+        self.history.append(frame)
+        if self.recorded is not None:
+            frame["spans"] = self._spans
+            self.recorded.append(frame)
+            self._spans = []
+        for hook in self.hooks:
+            hook(frame)
+        self.phases = {}
+        self._frame_start = now
+        return frame
+
+    def add_hook(self, hook : Callable[[dict], None]):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook : Callable[[dict], None]):
+        self.hooks.remove(hook)
+
+    def averages(self) -> tuple[float, dict[str, float]]:
+        """Average frame time and time per phase of the last frames"""
+        if not self.history:
+            return 0.0, {}
+        phases : dict[str, float] = {}
+        for frame in self.history:
+            for name, seconds in frame["phases"].items():
+                phases[name] = phases.get(name, 0.0) + seconds / len(self.history)
+        return sum(frame["time"] for frame in self.history) / len(self.history), phases
+
+    def summary(self) -> list[str]:
+        """Lines of the HUD: frame time, time per phase and the counters"""
+        frame_time, phases = self.averages()
+        lines = [f"frame {frame_time * 1000:6.2f} ms  {1 / frame_time if frame_time else 0:5.1f} fps"]
+        lines.extend(f"{name:<8}{seconds * 1000:6.2f} ms" for name, seconds in sorted(phases.items(), key=lambda x: -x[1]))
+        lines.extend(f"{name:<8}{value}" for name, value in self.counters.items())
+        if self.recording:
+            lines.append(f"recording {len(self.recorded)} frames, o stops")
+        return lines
+
+    @property
+    def recording(self) -> bool:
+        return self.recorded is not None
+
+    def start_recording(self):
+        self.recorded = deque(maxlen=MAX_RECORDED_FRAMES)
+        self._spans = []
+
+    def stop_recording(self) -> list[dict]:
+        frames, self.recorded = list(self.recorded or []), None
+        return frames
+
+    def write_json(self, frames : list[dict], path : str | os.PathLike):
+        """Frame times, phases and counters, one object per frame"""
+        with open(path, "w") as f:
+            json.dump([{key: value for key, value in frame.items() if key != "spans"} for frame in frames], f)
+
+    def write_chrome_trace(self, frames : list[dict], path : str | os.PathLike):
+        """The phases as complete events and the counters as counter events"""
+        events = []
+        for frame in frames:
+            timestamp = frame["start"] * 1e6
+            events.append({"name": "frame", "ph": "X", "ts": timestamp, "dur": frame["time"] * 1e6, "pid": 1, "tid": 1})
+            for name, started, duration in frame.get("spans", []):
+                events.append({"name": name, "ph": "X", "ts": started * 1e6, "dur": duration * 1e6, "pid": 1, "tid": 1})
+            if frame["counters"]:
+                events.append({"name": "search", "ph": "C", "ts": timestamp, "pid": 1, "args": frame["counters"]})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+profiler = Profiler()
@@ -0,0 +1,170 @@
+"""
+`grasim record`: run a search without a window and save it as an animation,
+a directory of PNG frames or an animated GIF (needs Pillow).
+
+The frames are rendered on the main thread and encoded on a thread pool.
+pygame is only imported when recording starts.
+"""
+import os
+import pathlib
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+import grasim.config as config
+from grasim.errors import ParseError
+
+
+class RecordError(Exception):
+    """The recording can not be written"""
+
+class FrameEncoder:
+    """
+    Encodes frames on a thread pool while the next ones are rendered.
+    Frames are copied into a queue of at most max_pending frames, submit()
+    waits when the encoder falls behind, so the memory stays bounded.
+
+    A .gif output is written when close() is called, any other output is a
+    directory that gets frame_00000.png, frame_00001.png, ...
+    """
+
+    def __init__(self, output : pathlib.Path, fps : float = config.RECORD_FPS, workers : int | None = None,
+                 max_pending : int = config.RECORD_QUEUE_FRAMES):
+        self.output = output
+        self.fps = fps
+        self.gif = output.suffix.lower() == ".gif"
+        if self.gif:
+            try:
+                import PIL.Image # noqa: F401
+            except ImportError:
+                raise RecordError("GIF output needs Pillow, install grasim with the gif extra (grasim[gif]), PNG frames work without it") from None
+        else:
+            output.mkdir(parents=True, exist_ok=True)
+        self.executor = ThreadPoolExecutor(workers)
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.frames : list[Future] = []
+        self.waited = 0.0 # seconds submit() waited for a free slot
+
+    def submit(self, surface):
+        """Queue a copy of surface, the caller can draw the next frame right away"""
+        import pygame
+        started = time.perf_counter()
+        self.slots.acquire()
+        self.waited += time.perf_counter() - started
+        number = len(self.frames)
+        if self.gif:
+            frame = (pygame.image.tobytes(surface, "RGB"), surface.get_size())
+            future = self.executor.submit(self._gif_frame, *frame)
+        else:
+            future = self.executor.submit(pygame.image.save, surface.copy(), str(self.output / f"frame_{number:05d}.png"))
+        future.add_done_callback(lambda _: self.slots.release())
+        self.frames.append(future)
+
+    @staticmethod
+    def _gif_frame(data : bytes, size : tuple[int, int]):
+        from PIL import Image
+        # The colors of a level are few, a fast palette without dithering keeps lines sharp
+        return Image.frombytes("RGB", size, data).quantize(256, Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+
+    def close(self):
+        """Wait for all frames and write the GIF"""
+        try:
+            frames = [future.result() for future in self.frames]
+        finally:
+            self.executor.shutdown()
+        if self.gif and frames:
+            durations = [round(1000 / self.fps)] * len(frames)
+            durations[-1] = round(config.RECORD_FINAL_FRAME_SECONDS * 1000)
+            frames[0].save(self.output, save_all=True, append_images=frames[1:], duration=durations, loop=0)
+
+def frame_steps(num_steps : int, max_frames : int) -> np.ndarray:
+    """Steps that get a frame: every step of short searches, evenly spaced ones of long searches, always the last"""
+    if num_steps <= 1:
+        return np.array([1])
+    return np.unique(np.linspace(1, num_steps, min(num_steps, max_frames)).round().astype(np.int64))
+
+def record_search(save : pathlib.Path, output : pathlib.Path, dijkstra_mode : bool = False, bidirectional : bool = False,
+                  size : tuple[int, int] = (1280, 720), max_frames : int = config.RECORD_MAX_FRAMES,
+                  fps : float = config.RECORD_FPS, workers : int | None = None, progress=None) -> dict:
+    """
+    Search save until END is done, like c in the game, and record it to
+    output. Uses SDL's dummy video driver unless SDL_VIDEODRIVER is set.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from grasim.game import Game, start_search
+    from grasim.loader import LevelLoader
+    from grasim.renderer import LevelRenderer, fit_points
+    from grasim.textcache import TextCache
+
+    timings = {}
+    encoder = FrameEncoder(output, fps, workers)
+    started = time.perf_counter()
+    # Landmarks are only needed by A* on graphs without heuristics
+    level = LevelLoader(save, 0 if dijkstra_mode else config.LANDMARKS).result()
+    timings["load"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    search = start_search(level, dijkstra_mode, bidirectional)
+    graph = level.graph
+    while search.dijkstra_table[graph.end_idx, 2] != 1 and search.step():
+        pass
+    num_steps = max(search.position, 1)
+    timings["search"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    pygame.init()
+    font = pygame.font.Font(pygame.font.get_default_font(), config.FONT_SIZE)
+    game = Game(pygame.display.set_mode(size), pygame.time.Clock(), font, TextCache(font), dijkstra_mode, bidirectional)
+    renderer = LevelRenderer(game, graph, fit_points(level.points, size), dijkstra_mode, bidirectional)
+    steps = frame_steps(num_steps, max_frames)
+    for frame, step in enumerate(steps.tolist()):
+        search.seek(step)
+        renderer.set_timeline(step, num_steps)
+        if frame == 0:
+            renderer.draw(search.dijkstra_table, step - 1)
+        else:
+            renderer.draw_changes(search.dijkstra_table, step - 1, search.touched)
+        encoder.submit(game.screen)
+        if progress is not None:
+            print(f"\rframe {frame + 1} of {len(steps)}", end="", file=progress, flush=True)
+    timings["render"] = time.perf_counter() - started - encoder.waited
+    timings["wait_for_encoder"] = encoder.waited
+
+    started = time.perf_counter()
+    encoder.close()
+    timings["finish_encoding"] = time.perf_counter() - started
+    if progress is not None:
+        print(file=progress)
+    return {"file": str(save), "output": str(output), "steps": num_steps, "frames": len(steps), "time": timings}
+
+def record_command(args) -> int:
+    save = pathlib.Path(args.save)
+    output = pathlib.Path(args.output) if args.output is not None else pathlib.Path(f"{save.stem}_frames")
+    try:
+        width, height = map(int, args.size.split("x"))
+    except ValueError:
+        print(f"failed: size {args.size} is not WIDTHxHEIGHT", file=sys.stderr)
+        return 1
+    try:
+        result = record_search(save, output, args.algorithm == "dijkstra", args.bidirectional, (width, height),
+                               args.frames, args.fps, args.workers, sys.stderr)
+    except (OSError, ParseError, RecordError) as e:
+        print(f"failed {save}: {e}", file=sys.stderr)
+        return 1
+    print(result)
+    return 0
+
+def add_record_parser(subparsers):
+    parser = subparsers.add_parser("record", help="Record a search without a window as PNG frames or an animated GIF")
+    parser.add_argument("save", help=".graph file")
+    parser.add_argument("-o", "--output", help="Directory of the PNG frames or a .gif file (needs Pillow), default is <save>_frames")
+    parser.add_argument("-a", "--algorithm", choices=["astar", "dijkstra"], default="astar")
+    parser.add_argument("--bidirectional", action="store_true", help="Search from START and END at the same time")
+    parser.add_argument("--size", default="1280x720", help="Size of the frames as WIDTHxHEIGHT")
+    parser.add_argument("--frames", type=int, default=config.RECORD_MAX_FRAMES,
+                        help="Longer searches skip steps between the frames")
+    parser.add_argument("--fps", type=float, default=config.RECORD_FPS, help="Frames per second of the GIF")
+    parser.add_argument("-w", "--workers", type=int, help="Threads encoding the frames")
+    parser.set_defaults(func=record_command)
@@ -0,0 +1,427 @@
+import time
+from dataclasses import dataclass
+import numpy as np
+import pygame
+import grasim.config as config
+from grasim.dijkstra.dijkstra import extract_path
+from grasim.savefile import WaypointGraph
+from grasim.spatial import GridIndex
+from grasim.profiling import profiler
+
+NODE_RADIUS = 5
+# Color key of the text layers, everything in this color is transparent
+TRANSPARENT = (255, 0, 255)
+# Lines of the legend in the bottom right corner, from top to bottom
+LEGEND = [
+    "Edge under the mouse: [x] close, []] slower, [[] faster | Navigate: +, -, <ARROWS>",
+    "Inputs: Step: <ENTER>, <BACK>, [c]ontinue, [r]otate, [h]ide labels, [e]xport trace, [p]rofile, rec[o]rd profile | Rewind: <,> <.> <HOME> <END>",
+]
+TIMELINE_HEIGHT = 8
+
+def fit_points(points : np.ndarray, screen_size) -> np.ndarray:
+    """Layout points scaled into the screen, as a level is first shown"""
+    points = points + abs(points.min(0))
+    return (points / (abs(points).max(0) + 0.02)) * screen_size * 0.9
+
+def interpolate_coords(point1 : np.ndarray, point2 : np.ndarray, percent : float) -> np.ndarray:
+    return (point2 - point1) * percent + point1
+
+def draw_thick_lines(surface, color, points1 : np.ndarray, points2 : np.ndarray, width : float):
+    """
+    Draw lines as polygons, the corners of all of them are computed at once.
+    Unlike pygame.draw.line the pixels do not depend on the clipping area, so
+    a clipped redraw matches a full one.
+    """
+    direction = points2 - points1
+    length = np.hypot(*direction.T)
+    keep = length != 0
+    normals = direction[keep, ::-1] * [-1, 1] / length[keep, None] * width / 2
+    points1, points2 = points1[keep], points2[keep]
+    draw_polygon = pygame.draw.polygon
+    corners = iter(np.hstack((points1 + normals, points2 + normals, points2 - normals, points1 - normals)).ravel().tolist())
+    for x1, y1, x2, y2, x3, y3, x4, y4 in zip(*[corners] * 8):
+        draw_polygon(surface, color, ((x1, y1), (x2, y2), (x3, y3), (x4, y4)))
+
+def draw_lines(surface, color, points1 : np.ndarray, points2 : np.ndarray):
+    """pygame.draw.line from every point of points1 to the one of points2"""
+    draw_line = pygame.draw.line
+    # A flat list is much faster to create than one list per point
+    coords = iter(np.hstack((points1, points2)).ravel().tolist())
+    for x1, y1, x2, y2 in zip(coords, coords, coords, coords):
+        draw_line(surface, color, (x1, y1), (x2, y2))
+
+def _pairs(points : np.ndarray):
+    """(x, y) tuples of the rows of points"""
+    coords = iter(points.ravel().tolist())
+    return zip(coords, coords)
+
+def reverse_edges(sources : np.ndarray, targets : np.ndarray, num_nodes : int) -> np.ndarray:
+    """Position of the edge targets[i] -> sources[i] for every edge i, -1 if there is none"""
+    keys = sources.astype(np.int64) * num_nodes + targets
+    back = targets.astype(np.int64) * num_nodes + sources
+    order = np.argsort(keys)
+    found = order[np.minimum(np.searchsorted(keys, back, sorter=order), max(len(keys) - 1, 0))]
+    return np.where(keys[found] == back, found, -1) if len(keys) else found
+
+def _segment_bounds(point1 : np.ndarray, point2 : np.ndarray, width : float) -> np.ndarray:
+    """Bounding boxes (x0, y0, x1, y1) of line segments"""
+    return np.column_stack((np.minimum(point1, point2) - width, np.maximum(point1, point2) + width))
+
+def _intersecting(bounds : np.ndarray, rect : pygame.Rect) -> np.ndarray:
+    """Indices of the bounding boxes that intersect rect"""
+    return np.where((bounds[:, 0] <= rect.right) & (bounds[:, 2] >= rect.left)
+                    & (bounds[:, 1] <= rect.bottom) & (bounds[:, 3] >= rect.top))[0]
+
+@dataclass
+class Segments:
+    """Line segments on screen with their bounding boxes, computed once per frame and drawn per dirty rect"""
+    points1 : np.ndarray
+    points2 : np.ndarray
+    bounds : np.ndarray
+
+    @classmethod
+    def between(cls, points1 : np.ndarray, points2 : np.ndarray, margin : float) -> "Segments":
+        return cls(points1, points2, _segment_bounds(points1, points2, margin))
+
+    def draw(self, surface, color, width : float, rect : pygame.Rect):
+        """Draw the segments that intersect rect"""
+        visible = _intersecting(self.bounds, rect)
+        draw_thick_lines(surface, color, self.points1[visible], self.points2[visible], width)
+
+class LevelRenderer:
+    """
+    Draws a level in layers.
+
+    The static layers (open edges, edge labels, node names, heuristics and the
+    legend) only change on pan, zoom, rotation or when labels are hidden and
+    are kept as surfaces. Only nodes and edges that a spatial index finds in
+    the viewport are drawn, labels are left out when they would be
+    unreadable. The search state (node colors, explored edges, final path,
+    estimated totals and the step counter) is drawn on top of them.
+    After a search step only the rectangles around the nodes and edges that
+    changed are restored from the static layers and redrawn.
+
+    Layer order: static shapes, search shapes, static text, search text
+    """
+
+    def __init__(self, game, graph : WaypointGraph, points : np.ndarray, dijkstra_mode : bool, bidirectional : bool = False):
+        self.game = game
+        self.graph = graph
+        self.dijkstra_mode = dijkstra_mode
+        self.bidirectional = bidirectional
+        self.edge_sources = graph.edge_sources()
+        # Positions in graph.indices do not change when edge weights do
+        self.reverse_edges = reverse_edges(self.edge_sources, graph.indices, graph.num_nodes)
+        self.node_names = list(graph.node_lookup.keys())
+
+        self.points = points
+        self.zoom = 1.0
+        self.offset = np.zeros(2)
+        self.hide_labels = False
+        self.indexed_points = None
+        self.path_shown = False
+        self.counter_rect = pygame.Rect(0, 0, 0, 0)
+        self.message : tuple[str, str] | None = None # text and color under the step counter
+        self.message_until = 0.0
+        self.message_dirty = False
+        self.timeline = (0, 0) # current step, recorded steps
+        self.resize()
+
+    def resize(self):
+        self.screen_size = np.array(self.game.screen.get_size())
+        self.static_shapes = pygame.Surface(self.screen_size)
+        self.static_text = pygame.Surface(self.screen_size)
+        self.static_text.set_colorkey(TRANSPARENT)
+        self.timeline_rect = pygame.Rect(10, 4, self.screen_size[0] - 20, TIMELINE_HEIGHT)
+        self.static_dirty = True
+
+    def set_view(self, points : np.ndarray, zoom : float, offset : np.ndarray, hide_labels : bool):
+        """Update the view, the static layers are rebuilt when anything changed"""
+        if points is not self.points or zoom != self.zoom or hide_labels != self.hide_labels \
+            or not np.array_equal(offset, self.offset):
+            self.points = points
+            self.zoom = zoom
+            self.offset = offset.copy()
+            self.hide_labels = hide_labels
+            self.static_dirty = True
+
+    def set_timeline(self, position : int, num_steps : int):
+        """Step shown on the timeline out of all recorded steps"""
+        self.timeline = (position, num_steps)
+
+    def set_message(self, text : str, color : str = "white"):
+        """Show text under the step counter for config.MESSAGE_SECONDS"""
+        self.message = (text, color)
+        self.message_until = time.monotonic() + config.MESSAGE_SECONDS
+        self.message_dirty = True
+
+    def message_changed(self) -> bool:
+        """True if the message was set or timed out since the last full redraw"""
+        if self.message is not None and time.monotonic() > self.message_until:
+            self.message = None
+            self.message_dirty = True
+        return self.message_dirty
+
+    def timeline_step(self, x : float) -> int:
+        """The step under the x coordinate of the timeline"""
+        position, num_steps = self.timeline
+        fraction = (x - self.timeline_rect.left) / max(self.timeline_rect.width, 1)
+        return round(min(max(fraction, 0), 1) * num_steps)
+
+    def _update_index(self):
+        """Spatial index over the layout points and the edges, rebuilt when the points change (rotation)"""
+        points = self.points
+        self.node_index = GridIndex(np.column_stack((points, points)))
+        self.edge_index = GridIndex(_segment_bounds(points[self.edge_sources], points[self.graph.indices], 0))
+        self.indexed_points = points
+
+    def _visible(self) -> tuple[np.ndarray, np.ndarray]:
+        """Nodes and edges that intersect the screen"""
+        if self.points is not self.indexed_points:
+            self._update_index()
+        # The screen corners in layout coordinates
+        screen_size = self.screen_size
+        corners = np.array([[0, 0], screen_size]) - screen_size/2
+        (x0, y0), (x1, y1) = np.sort(corners / self.zoom - self.offset + screen_size/2, axis=0)
+        # Labels of nodes right outside of the screen can still reach into it
+        margin = config.LABEL_MARGIN / abs(self.zoom)
+        visible_nodes = self.node_index.query(x0 - margin, y0 - margin, x1 + margin, y1 + margin)
+        visible_edges = self.edge_index.query(x0, y0, x1, y1)
+        return visible_nodes, visible_edges
+
+    def _labels_readable(self, visible_nodes : np.ndarray, visible_edges : np.ndarray) -> bool:
+        """Level of detail: labels are left out if there are too many or the graph is too small on screen"""
+        if len(visible_nodes) > config.MAX_LABELED_NODES:
+            return False
+        if len(visible_edges) == 0:
+            return True
+        lengths = np.hypot(*(self.positions[self.edge_sources[visible_edges]] - self.positions[self.graph.indices[visible_edges]]).T)
+        return np.median(lengths) >= config.MIN_LABELED_EDGE_LENGTH
+
+    def _build_static(self):
+        graph = self.graph
+        font = self.game.text_cache
+        screen_size = self.screen_size
+        self.positions = positions = (self.points - screen_size/2) * self.zoom + self.offset * self.zoom + screen_size/2
+        self.visible_nodes, self.visible_edges = self._visible()
+        visible_edges = self.visible_edges
+        self.show_labels = self._labels_readable(self.visible_nodes, visible_edges)
+
+        self.static_shapes.fill(config.BACKGROUND_COLOR)
+        self.static_text.fill(TRANSPARENT)
+
+        # Open paths and their distances, closed ones on top
+        sources, targets = self.edge_sources[visible_edges], graph.indices[visible_edges]
+        points1, points2 = positions[sources], positions[targets]
+        distances1 = graph.weights[visible_edges]
+        closed = distances1 == np.inf
+        draw_lines(self.static_shapes, config.PATH_OPEN, points1[~closed], points2[~closed])
+        draw_lines(self.static_shapes, config.PATH_CLOSED, points1[closed], points2[closed])
+        if self.show_labels:
+            # Distance of the way back, -1 if there is none
+            reverse = self.reverse_edges[visible_edges]
+            distances2 = np.where(reverse == -1, -1, graph.weights[reverse])
+            distances2[distances2 == np.inf] = -1
+            # Two way connections are labeled once next to the middle, directed ones near their end
+            two_way = ~closed & (distances1 == distances2) & (sources < targets)
+            directed = ~closed & (distances1 != distances2) & ((sources < targets) | (distances2 == -1))
+            back = directed & (distances2 != -1)
+            anchors = [(points1[two_way] + points2[two_way]) / 2 + (points1[two_way] - points2[two_way]) * config.NODE_TEXT_OFFSET,
+                       interpolate_coords(points1[directed], points2[directed], 0.8),
+                       interpolate_coords(points1[back], points2[back], 0.2)]
+            labels = [distances1[two_way], distances1[directed], distances2[back]]
+            self.static_text.blits([(font.render(f"{distance:.0f}", True, config.PATH_TEXT_COLOR), anchor)
+                                    for distance, anchor in zip(np.concatenate(labels).tolist(), _pairs(np.concatenate(anchors)))],
+                                   doreturn=False)
+
+        # Node names and heuristics, the estimated totals are placed above them
+        visible_positions = positions[self.visible_nodes]
+        self.total_anchors = visible_positions.copy()
+        if self.show_labels:
+            heuristics = graph.heuristics[self.visible_nodes].tolist()
+            blits = []
+            for slot, (node_idx, (x, y)) in enumerate(zip(self.visible_nodes.tolist(), _pairs(visible_positions))):
+                heuristic_text = "" if self.dijkstra_mode else f"{heuristics[slot]:.0f}"
+                draw_name = "" if self.hide_labels else self.node_names[node_idx]
+
+                font_screen = font.render(f"{draw_name}", False, config.NODE_NAME_COLOR, config.NODE_NAME_BACKGROUND)
+                heur_screen = font.render(f"{heuristic_text}", False, config.NODE_HEURISTIC_COLOR)
+                width, height = font_screen.get_size()
+                blits.append((font_screen, (x - width/2, y - (height+10))))
+                blits.append((heur_screen, (x - width/2, y - (height*3+10))))
+                self.total_anchors[slot] = (x - width/2, y - (height*2+10))
+            self.static_text.blits(blits, doreturn=False)
+
+        bottom = screen_size[1]
+        for line in reversed(LEGEND):
+            font_screen = font.render(line, True, config.LEGEND_TEXT, config.LEGEND_BACKGROUND)
+            bottom -= font_screen.get_size()[1]
+            self.static_text.blit(font_screen, (screen_size[0] - font_screen.get_size()[0], bottom))
+
+        # Area of the circle and the estimated total of every visible node as (x0, y0, x1, y1)
+        self.visible_slot = np.full(graph.num_nodes, -1, dtype=np.int64)
+        self.visible_slot[self.visible_nodes] = np.arange(len(self.visible_nodes))
+        self.node_bounds = np.column_stack((visible_positions - NODE_RADIUS, visible_positions + NODE_RADIUS))
+        self.total_bounds = np.column_stack((self.total_anchors, self.total_anchors))
+        self.static_dirty = False
+
+    def edge_at(self, position, max_distance : float = 8) -> int | None:
+        """Position (in graph.indices) of the visible edge closest to the screen position, None if none is near"""
+        edges = self.visible_edges
+        if len(edges) == 0:
+            return None
+        point1, point2 = self.positions[self.edge_sources[edges]], self.positions[self.graph.indices[edges]]
+        direction = point2 - point1
+        length_squared = np.maximum((direction ** 2).sum(1), 1e-9)
+        along = np.clip(((np.asarray(position) - point1) * direction).sum(1) / length_squared, 0, 1)
+        distances = np.hypot(*(point1 + along[:, None] * direction - position).T)
+        closest = int(np.argmin(distances))
+        return int(edges[closest]) if distances[closest] <= max_distance else None
+
+    def _total_label(self, dijkstra_table, node_idx : int):
+        return self.game.text_cache.render(f"{dijkstra_table[node_idx, 3]:.0f}", False, config.NODE_ESTIMATED_TOTAL_COLOR)
+
+    def _search_segments(self, dijkstra_table) -> tuple[Segments, Segments]:
+        """
+        Explored edges (from every done node with a predecessor to it) and the
+        final path, shared by all regions drawn for one search state
+        """
+        positions = self.positions
+        done = np.where(dijkstra_table[:, 2] == 1)[0]
+        predecessors = dijkstra_table[done, 1].astype(np.int64)
+        tree = predecessors != done
+        path = np.array(extract_path(dijkstra_table, self.graph.start_idx, self.graph.end_idx) or [], dtype=np.int64)
+        return (Segments.between(positions[done[tree]], positions[predecessors[tree]], 3),
+                Segments.between(positions[path[:-1]], positions[path[1:]], 6))
+
+    def _draw_region(self, dijkstra_table, counter : int, rect : pygame.Rect | None, explored : Segments, path : Segments):
+        """Restore rect (None means everything) from the static layers and draw the search state on top"""
+        screen = self.game.screen
+        positions = self.positions
+        if rect is None:
+            slots = np.arange(len(self.visible_nodes))
+        else:
+            slots = np.union1d(_intersecting(self.node_bounds, rect), _intersecting(self.total_bounds, rect))
+            screen.set_clip(rect)
+        nodes = self.visible_nodes[slots]
+
+        with profiler.phase("edges"):
+            if rect is None:
+                screen.blit(self.static_shapes, (0, 0))
+            else:
+                screen.blit(self.static_shapes, rect.topleft, rect)
+            area = screen.get_rect() if rect is None else rect
+            explored.draw(screen, config.PATH_DONE, 5, area)
+            path.draw(screen, config.PATH_FINAL_COLOR, 10, area)
+
+        with profiler.phase("nodes"):
+            # Draw nodes, if node is not done draw purple, otherwise green
+            rows = dijkstra_table[nodes]
+            styles = np.select([nodes == self.graph.end_idx, rows[:, 0] == np.inf, rows[:, 2] != 1], [0, 1, 2], 3)
+            colors = [config.NODE_END_COLOR, config.NODE_UNIDSCOVERED_COLOR, config.NODE_DISCOVERED_COLOR, config.NODE_DONE_COLOR]
+            draw_circle = pygame.draw.circle
+            for style, color in enumerate(colors):
+                for point in _pairs(positions[nodes[styles == style]]):
+                    draw_circle(screen, color, point, NODE_RADIUS)
+
+        with profiler.phase("text"):
+            if rect is None:
+                screen.blit(self.static_text, (0, 0))
+            else:
+                screen.blit(self.static_text, rect.topleft, rect)
+
+            if self.show_labels:
+                for slot, node_idx in zip(slots, nodes):
+                    total_screen = self._total_label(dijkstra_table, node_idx)
+                    screen.blit(total_screen, self.total_anchors[slot])
+                    self.total_bounds[slot, 2:] = self.total_anchors[slot] + total_screen.get_size()
+
+            counter_screen = self._counter_label(counter)
+            screen.blit(counter_screen, self.counter_rect)
+            if self.message is not None:
+                text, color = self.message
+                message_screen = self.game.text_cache.render(text, True, color, "black")
+                screen.blit(message_screen, (self.screen_size[0] - message_screen.get_width(), self.counter_rect.bottom))
+        self._draw_timeline()
+        screen.set_clip(None)
+
+    def _draw_timeline(self):
+        position, num_steps = self.timeline
+        if num_steps == 0:
+            return
+        screen = self.game.screen
+        rect = self.timeline_rect
+        pygame.draw.rect(screen, config.TIMELINE_BACKGROUND, rect)
+        played = rect.copy()
+        played.width = round(rect.width * position / num_steps)
+        pygame.draw.rect(screen, config.TIMELINE_COLOR, played)
+        pygame.draw.rect(screen, config.PATH_OPEN, (played.right - 1, rect.top, 3, rect.height))
+
+    def _counter_label(self, counter : int):
+        mode = "Dijkstra" if self.dijkstra_mode else "A*"
+        if self.bidirectional:
+            mode = f"bidirectional {mode}"
+        counter_screen = self.game.text_cache.render(f"Steps: {counter} ({mode})", True, "white", "black")
+        width, height = counter_screen.get_size()
+        self.counter_rect = pygame.Rect(self.screen_size[0] - width, height, width, height)
+        return counter_screen
+
+    def draw(self, dijkstra_table, counter : int):
+        """Redraw the whole screen"""
+        if self.static_dirty:
+            with profiler.phase("static"):
+                self._build_static()
+        self.path_shown = dijkstra_table[self.graph.end_idx, 2] == 1
+        self.message_dirty = False
+        # last_idx and done as drawn, to clear explored paths when a step is undone
+        self.drawn_rows = dijkstra_table[:, 1:3].copy()
+        self._draw_region(dijkstra_table, counter, None, *self._search_segments(dijkstra_table))
+        with profiler.phase("flip"):
+            pygame.display.flip()
+
+    def draw_hud(self, lines : list[str]):
+        """Performance overlay in the top left corner, drawn last so the frame updates can't cover it"""
+        font = self.game.text_cache.font
+        # The numbers change every frame, so they are rendered without the text cache
+        rect = pygame.Rect(10, TIMELINE_HEIGHT + 10, config.HUD_WIDTH, font.get_linesize() * len(lines) + 8)
+        screen = self.game.screen
+        screen.fill(config.HUD_BACKGROUND, rect)
+        for i, line in enumerate(lines):
+            screen.blit(font.render(line, True, config.HUD_TEXT), (rect.left + 4, rect.top + 4 + i * font.get_linesize()))
+        pygame.display.update(rect)
+
+    def draw_changes(self, dijkstra_table, counter : int, touched : list[int]):
+        """Only redraw the area around the nodes a search step touched"""
+        if self.static_dirty or self.message_dirty or (dijkstra_table[self.graph.end_idx, 2] == 1) != self.path_shown \
+            or len(touched) > config.MAX_DIRTY_RECTS:
+            self.draw(dijkstra_table, counter)
+            return
+
+        positions = self.positions
+        dirty_rects = [self.counter_rect.copy(), self.timeline_rect.inflate(4, 0)]
+        self._counter_label(counter)
+        dirty_rects.append(self.counter_rect.copy())
+        for node_idx in touched:
+            area = pygame.Rect(positions[node_idx] - NODE_RADIUS - 1, (2*NODE_RADIUS + 2, 2*NODE_RADIUS + 2))
+            # Old and new estimated total
+            slot = self.visible_slot[node_idx]
+            if slot != -1 and self.show_labels:
+                label_size = self._total_label(dijkstra_table, node_idx).get_size()
+                x0, y0 = self.total_anchors[slot]
+                x1, y1 = np.maximum(self.total_bounds[slot, 2:], self.total_anchors[slot] + label_size)
+                area.union_ip(pygame.Rect(x0, y0, x1 - x0 + 1, y1 - y0 + 1))
+            # The path to the predecessor is explored once the node is done, before and after the change
+            for predecessor, done in (self.drawn_rows[node_idx], dijkstra_table[node_idx, 1:3]):
+                if done == 1 and predecessor != node_idx:
+                    x0, y0, x1, y1 = _segment_bounds(positions[[node_idx]], positions[[int(predecessor)]], 4)[0]
+                    area.union_ip(pygame.Rect(x0, y0, x1 - x0, y1 - y0))
+            self.drawn_rows[node_idx] = dijkstra_table[node_idx, 1:3]
+            dirty_rects.append(area)
+
+        screen_rect = self.game.screen.get_rect()
+        dirty_rects = [rect.clip(screen_rect) for rect in dirty_rects if rect.colliderect(screen_rect)]
+        segments = self._search_segments(dijkstra_table)
+        for rect in dirty_rects:
+            self._draw_region(dijkstra_table, counter, rect, *segments)
+        with profiler.phase("flip"):
+            pygame.display.update(dirty_rects)
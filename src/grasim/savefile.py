@@ -1,91 +1,316 @@
-from typing import Any
+from collections.abc import Mapping
+from functools import cached_property
+from typing import Any, Callable, Iterable, Iterator
+import mmap
+import os
+import pathlib
 import numpy as np
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import re
 import numpy.typing as nptype
 from grasim.errors import ParseError
+from grasim.coordinates import METRICS, coordinate_distances
 
-# list of (node1, distance, node2)
-NodeDistance = tuple[str, int, str]
+# Largest graph for which the dense graph_matrix view may be created
+DENSE_MATRIX_MAX_NODES = 2000
+
+class NumberedNodes(Mapping):
+    """
+    node_lookup of imported graphs whose nodes are integer ids: node i is
+    named str(ids[i]) (with the START and END prefix), without building a dict
+    """
+
+    def __init__(self, ids : nptype.NDArray[np.int64], start_idx : int, end_idx : int):
+        self.ids = ids # sorted
+        self.start_idx = start_idx
+        self.end_idx = end_idx
+
+    def _name(self, idx : int) -> str:
+        if idx == self.start_idx:
+            return f"START {self.ids[idx]}"
+        if idx == self.end_idx:
+            return f"END {self.ids[idx]}"
+        return str(self.ids[idx])
+
+    def __getitem__(self, name : str) -> int:
+        if not isinstance(name, str):
+            raise KeyError(name)
+        try:
+            node_id = int(name.split(" ")[-1])
+        except ValueError:
+            raise KeyError(name) from None
+        idx = int(np.searchsorted(self.ids, node_id))
+        if idx == len(self.ids) or self._name(idx) != name:
+            raise KeyError(name)
+        return idx
+
+    def __iter__(self) -> Iterator[str]:
+        return map(self._name, range(len(self.ids)))
+
+    def __len__(self) -> int:
+        return len(self.ids)
 
 @dataclass
 class WaypointGraph:
-    graph_matrix : nptype.NDArray[Any] # Adjancy with distances, -1 means not connected
+    """
+    Directed graph stored in compressed sparse row (CSR) form.
+
+    The outgoing edges of node i are indices[indptr[i]:indptr[i+1]] with the
+    distances weights[indptr[i]:indptr[i+1]], sorted by target index.
+    The transposed arrays (rev_*) hold the incoming edges the same way.
+    """
+    indptr : nptype.NDArray[np.int64] # Row i starts at indptr[i], len num_nodes + 1
+    indices : nptype.NDArray[np.int32] # Target node of every edge
+    weights : nptype.NDArray[np.float64] # Distance of every edge
     start_idx : int
     end_idx : int
-    node_lookup : dict[str, int] # NodeName => index in graph_matrix
-    heuristics : list[float] # NodeIndex => heuristic
-
-def parse_text(unparsed_text : list[str]) -> WaypointGraph:
-    # TODO function: parse_graph
-    nodes : set = set()
-    heuristics_dict : dict[str, int] = {} # NodeName => heuristic
-    distances : list[NodeDistance] = []
+    node_lookup : Mapping[str, int] # NodeName => index
+    heuristics : nptype.NDArray[np.float64] # NodeIndex => heuristic
+    coords : nptype.NDArray[np.float64] | None = None # NodeIndex => [x, y] or [lat, lon], nan if not given
+    metric : str = "euclidean" # how coords are measured, see coordinates.METRICS
+    coordinate_scale : float = 1.0 # heuristic per unit of coordinate distance
+    rev_indptr : nptype.NDArray[np.int64] = field(init=False, repr=False)
+    rev_indices : nptype.NDArray[np.int32] = field(init=False, repr=False)
+    rev_weights : nptype.NDArray[np.float64] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        sources = self.edge_sources()
+        order = np.argsort(self.indices, kind="stable")
+        self.rev_indptr = _indptr_from_rows(self.indices, self.num_nodes)
+        self.rev_indices = sources[order].astype(np.int32)
+        self.rev_weights = self.weights[order]
+
+    @classmethod
+    def from_edges(cls, sources, targets, weights, num_nodes : int, start_idx : int, end_idx : int,
+                   node_lookup : Mapping[str, int], heuristics, edge_lines=None, filename : str = "<text>",
+                   coords=None, metric : str = "euclidean", coordinate_scale : float = 1.0,
+                   keep_shortest : bool = False) -> "WaypointGraph":
+        """
+        Build the CSR arrays from unsorted edge arrays.
+        Duplicate edges are merged, duplicates with different distances raise a ParseError
+        that points to edge_lines (line number of every edge) if it is given,
+        or the shortest one is kept with keep_shortest.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+
+        if keep_shortest:
+            order = np.lexsort((weights, sources * num_nodes + targets))
+        else:
+            order = np.argsort(sources * num_nodes + targets, kind="stable")
+        sources, targets, weights = sources[order], targets[order], weights[order]
+
+        same_edge = (sources[1:] == sources[:-1]) & (targets[1:] == targets[:-1])
+        conflicts = np.where(same_edge & (weights[1:] != weights[:-1]))[0]
+        if len(conflicts) != 0 and not keep_shortest:
+            names = list(node_lookup.keys())
+            node1, node2 = names[sources[conflicts[0]]], names[targets[conflicts[0]]]
+            line_number = None
+            if edge_lines is not None:
+                line_number = int(max(edge_lines[order[conflicts[0]]], edge_lines[order[conflicts[0] + 1]]))
+            raise ParseError(f"Ambiguous edges with different values: {node1} {node2}", (filename, line_number, None, None))
+        keep = np.ones(len(sources), dtype=bool)
+        keep[1:] = ~same_edge
+
+        return cls(
+            _indptr_from_rows(sources[keep], num_nodes),
+            targets[keep].astype(np.int32),
+            weights[keep],
+            start_idx,
+            end_idx,
+            node_lookup,
+            np.asarray(heuristics, dtype=np.float64),
+            None if coords is None else np.asarray(coords, dtype=np.float64),
+            metric,
+            coordinate_scale,
+        )
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices)
+
+    @property
+    def node_names(self) -> list[str]:
+        """Names by node index without the START and END prefix"""
+        return [name.split(" ")[-1] for name in self.node_lookup.keys()]
+
+    def neighbors(self, idx : int) -> tuple[nptype.NDArray[np.int32], nptype.NDArray[np.float64]]:
+        """Targets and distances of the outgoing edges of idx"""
+        begin, end = self.indptr[idx], self.indptr[idx + 1]
+        return self.indices[begin:end], self.weights[begin:end]
+
+    def predecessors(self, idx : int) -> tuple[nptype.NDArray[np.int32], nptype.NDArray[np.float64]]:
+        """Sources and distances of the incoming edges of idx"""
+        begin, end = self.rev_indptr[idx], self.rev_indptr[idx + 1]
+        return self.rev_indices[begin:end], self.rev_weights[begin:end]
+
+    def edge_sources(self) -> nptype.NDArray[np.int64]:
+        """Source node of every edge, parallel to indices and weights"""
+        return np.repeat(np.arange(self.num_nodes), np.diff(self.indptr))
+
+    def edge_weight(self, idx1 : int, idx2 : int) -> float:
+        """Distance of the edge idx1 -> idx2, -1 means not connected"""
+        targets, lengths = self.neighbors(idx1)
+        position = np.searchsorted(targets, idx2)
+        if position < len(targets) and targets[position] == idx2:
+            return float(lengths[position])
+        return -1
+
+    def set_edge_weight(self, idx1 : int, idx2 : int, weight : float) -> float:
+        """Change the distance of the existing edge idx1 -> idx2 (inf closes it), returns the old one"""
+        begin, end = self.indptr[idx1], self.indptr[idx1 + 1]
+        position = begin + np.searchsorted(self.indices[begin:end], idx2)
+        if position == end or self.indices[position] != idx2:
+            raise ValueError(f"There is no edge from {idx1} to {idx2}")
+        old_weight = float(self.weights[position])
+        self.weights[position] = weight
+        # The incoming edges of a node are sorted by source as well
+        begin = self.rev_indptr[idx2]
+        self.rev_weights[begin + np.searchsorted(self.rev_indices[begin:self.rev_indptr[idx2 + 1]], idx1)] = weight
+        self.__dict__.pop("graph_matrix", None)
+        return old_weight
+
+    def coordinate_heuristics(self, end_idx : int | None = None) -> nptype.NDArray[np.float64]:
+        """
+        Distance of the coordinates of every node to the ones of end_idx (END by default)
+        times coordinate_scale, 0 for nodes without coordinates
+        """
+        end_idx = self.end_idx if end_idx is None else end_idx
+        if self.coords is None:
+            return np.zeros(self.num_nodes)
+        distances = coordinate_distances(self.coords, end_idx, self.metric) * self.coordinate_scale
+        return np.nan_to_num(distances, nan=0.0)
+
+    def inconsistent_edges(self, heuristics=None, tolerance : float = 1e-9) -> nptype.NDArray[np.int64]:
+        """
+        Positions (in indices and weights) of the edges u -> v with h(u) > w + h(v).
+        Without them and with h(END) = 0 the heuristic is consistent and so admissible.
+        """
+        heuristics = self.heuristics if heuristics is None else heuristics
+        return np.nonzero(heuristics[self.edge_sources()] > self.weights + heuristics[self.indices] + tolerance)[0]
+
+    @cached_property
+    def graph_matrix(self) -> nptype.NDArray[Any]:
+        """Dense adjancy with distances, -1 means not connected. Only available for small graphs"""
+        if self.num_nodes > DENSE_MATRIX_MAX_NODES:
+            raise ValueError(f"Graph has {self.num_nodes} nodes, dense matrix is limited to {DENSE_MATRIX_MAX_NODES}")
+        graph_matrix = np.full((self.num_nodes, self.num_nodes), -1, dtype=np.float64)
+        graph_matrix[self.edge_sources(), self.indices] = self.weights
+        return graph_matrix
+
+def _indptr_from_rows(rows, num_nodes : int) -> nptype.NDArray[np.int64]:
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_nodes), out=indptr[1:])
+    return indptr
+
+# One regex for every kind of line. A line starts with a name which may be followed by
+# an edge (-w-, <-w->, <-w-, -w->), a heuristic, coordinates [x, y] or, after START and END,
+# another name. COORDINATES is followed by the metric and optionally a scale
+LINE_REGEX = re.compile(r"""
+    (?P<name>\w++)
+    (?:
+        \ (?P<left><?)-(?P<distance>[0-9.]+)-(?P<right>>?)\ (?P<node2>\w+)
+      | \((?P<heuristic>[0-9.]+)\)
+      | \[\ *(?P<x>-?[0-9.]+)\ *,\ *(?P<y>-?[0-9.]+)\ *\]
+      | (?<=\bSTART)\ (?P<start>\w+)
+      | (?<=\bEND)\ (?P<end>\w+)
+      | (?<=\bCOORDINATES)\ (?P<metric>\w+)(?:\ (?P<scale>[0-9.]+))?
+    )?
+""", re.VERBOSE)
+
+# Edge directions as they are stored while parsing, "-w-" and "<-w->" are both ways
+BOTH, RIGHT, LEFT = 0, 1, -1
+
+# Number of parsed lines that are buffered before they are moved into numpy arrays
+PARSE_CHUNK_SIZE = 65536
+# parse_file reports its progress every this many lines
+PROGRESS_LINES = 8192
+
+class _GrowableArray:
+    """Preallocated numpy array that doubles its capacity when it is full"""
+    def __init__(self, dtype, capacity : int = PARSE_CHUNK_SIZE):
+        self.data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def extend(self, values : list):
+        if self.size + len(values) > len(self.data):
+            self.data = np.resize(self.data, max(2 * len(self.data), self.size + len(values)))
+        self.data[self.size:self.size + len(values)] = values
+        self.size += len(values)
+
+    def view(self) -> nptype.NDArray[Any]:
+        return self.data[:self.size]
+
+def parse_lines(lines : Iterable[str], filename : str = "<text>") -> WaypointGraph:
+    """Parse the graph language in a single pass over the lines"""
+    # Nodes in order of appearance, NodeName => index
+    nodes : dict[str, int] = {}
+    heuristics_dict : dict[str, float] = {} # NodeName => heuristic
+    coords_dict : dict[str, tuple[float, float]] = {} # NodeName => coordinates
+    metric, coordinate_scale = "euclidean", 1.0
+    # one entry per edge line, the line number is kept for error messages
+    columns = [_GrowableArray(np.int32), _GrowableArray(np.int32), _GrowableArray(np.float64),
+               _GrowableArray(np.int8), _GrowableArray(np.int32)]
+    chunk : list[list] = [[], [], [], [], []] # node1, node2, distance, direction, line number
+    node1s, node2s, distances, directions, edge_lines = chunk
     start : str | None = None
-    end : str | None = None 
-
-    node_node_connection_regex = re.compile(r"(\w+) -([0-9.]+)- (\w+)")
-    node_node_connection_both_regex = re.compile(r"(\w+) <-([0-9.]+)-> (\w+)")
-    node_node_connection_left_regex = re.compile(r"(\w+) <-([0-9.]+)- (\w+)")
-    node_node_connection_right_regex = re.compile(r"(\w+) -([0-9.]+)-> (\w+)")
-    node_heuristic_regex = re.compile(r"(\w+)\(([0-9.]+)\)")
-    node_wihout_heuristic_regex = re.compile(r"(\w+)")
-    node_start_regex = re.compile(r"START (\w+)")
-    node_end_regex = re.compile(r"END (\w+)")
-
-    for line_idx, line in enumerate(unparsed_text):        
-        if match := node_node_connection_regex.match(line) or node_node_connection_both_regex.match(line):
-            node1, estimated_total, node2 = match.groups()
-            nodes.add(node1)
-            nodes.add(node2)
-            distances.append((node1, float(estimated_total), node2))
-            distances.append((node2, float(estimated_total), node1))
-        elif match := node_node_connection_left_regex.match(line):
-            node1, estimated_total, node2 = match.groups()
-            nodes.add(node1)
-            nodes.add(node2)
-            distances.append((node2, float(estimated_total), node1))
-        elif match := node_node_connection_right_regex.match(line):
-            node1, estimated_total, node2 = match.groups()
-            nodes.add(node1)
-            nodes.add(node2)
-            distances.append((node1, float(estimated_total), node2))
-        elif match := node_heuristic_regex.match(line):
-            node, heuristic = match.groups()
-            heuristics_dict[node] = float(heuristic)
-        elif match := node_start_regex.match(line):
-            start = str(match.group(1))
-        elif match := node_end_regex.match(line):
-            end = str(match.group(1))
-        elif match := node_wihout_heuristic_regex.match(line):
-            node = str(match.group(1))
-            nodes.add(node)
-
-    # Create Graph matrix with -1 as not connected
-    graph_matrix = np.full((len(nodes), len(nodes)), -1, dtype=np.float64)
-    
-    # Lookuptable for variables 'A' -> 0, 'B' -> 1
-    node_lookup = dict(zip(list(nodes), range(len(nodes)))) 
-    # Write distance into graph
-    for node1, estimated_total, node2 in distances:
-        idx1 = node_lookup[node1]
-        idx2 = node_lookup[node2]
-        if graph_matrix[idx1, idx2] != -1 and graph_matrix[idx1, idx2] != estimated_total:
-            raise ParseError(f"Ambiguous edges with different values: {node1} {node2}")
-        graph_matrix[idx1, idx2] = estimated_total
+    end : str | None = None
+    start_line = end_line = 0
+
+    line_number = 0
+    line = ""
+    try:
+        for line_number, line in enumerate(lines, start=1):
+            match = LINE_REGEX.match(line)
+            if match is None: # Empty lines and comments
+                continue
+            name, left, distance, right, node2, heuristic, x, y, start_node, end_node, metric_name, scale = match.groups()
+            if node2 is not None:
+                node1s.append(nodes.setdefault(name, len(nodes)))
+                node2s.append(nodes.setdefault(node2, len(nodes)))
+                distances.append(float(distance))
+                directions.append(len(right) - len(left))
+                edge_lines.append(line_number)
+                if len(edge_lines) == PARSE_CHUNK_SIZE:
+                    for column, values in zip(columns, chunk):
+                        column.extend(values)
+                        values.clear()
+            elif heuristic is not None:
+                heuristics_dict[name] = float(heuristic)
+            elif x is not None:
+                coords_dict[name] = (float(x), float(y))
+            elif start_node is not None:
+                start, start_line = start_node, line_number
+            elif end_node is not None:
+                end, end_line = end_node, line_number
+            elif metric_name is not None:
+                if metric_name not in METRICS:
+                    raise ParseError(f"Unknown metric {metric_name}, expected one of {', '.join(METRICS)}", (filename, line_number, None, line))
+                metric, coordinate_scale = metric_name, 1.0 if scale is None else float(scale)
+            else:
+                nodes.setdefault(name, len(nodes))
+    except ValueError:
+        raise ParseError(f"Invalid number", (filename, line_number, None, line)) from None
+    for column, values in zip(columns, chunk):
+        column.extend(values)
 
     if start == None or end == None:
-        raise ParseError("File did not contain 'START <NAME>' and 'END <NAME>'")
-    
-    
-    start_idx = node_lookup.get(start)
-    end_idx = node_lookup.get(end)
-    
+        raise ParseError("File did not contain 'START <NAME>' and 'END <NAME>'", (filename, line_number, None, None))
+
+    start_idx = nodes.get(start)
+    end_idx = nodes.get(end)
+
     if start_idx == None or end_idx == None:
-        raise ParseError(f"Path Start or End was invalid and couldn't be found!")
+        line_number = start_line if start_idx == None else end_line
+        raise ParseError(f"Path Start or End was invalid and couldn't be found!", (filename, line_number, None, None))
 
     replaced_node_lookup = {}
-    for k,v in node_lookup.items():
+    for k,v in nodes.items():
         if k == start:
             replaced_node_lookup["START " + start] = v
         elif k == end:
@@ -93,8 +318,64 @@ def parse_text(unparsed_text : list[str]) -> WaypointGraph:
         else:
             replaced_node_lookup[k] = v
 
-    # prefix start and end idx
+    heuristics = np.zeros(len(nodes), dtype=np.float64)
+    coords = None
+    if coords_dict:
+        # Nodes without a heuristic get the distance of their coordinates to END
+        coords = np.full((len(nodes), 2), np.nan)
+        for name, coordinates in coords_dict.items():
+            if name in nodes:
+                coords[nodes[name]] = coordinates
+        heuristics = np.nan_to_num(coordinate_distances(coords, end_idx, metric) * coordinate_scale, nan=0.0)
+    for name, heuristic in heuristics_dict.items():
+        if name in nodes:
+            heuristics[nodes[name]] = heuristic
+
+    # "-w-" and "<-w->" go both ways, "-w->" only from node1 to node2 and "<-w-" only back
+    node1s, node2s, distances, directions, edge_lines = (column.view() for column in columns)
+    forward = directions != LEFT
+    backward = directions != RIGHT
+    return WaypointGraph.from_edges(
+        np.concatenate((node1s[forward], node2s[backward])),
+        np.concatenate((node2s[forward], node1s[backward])),
+        np.concatenate((distances[forward], distances[backward])),
+        len(nodes),
+        start_idx,
+        end_idx,
+        replaced_node_lookup,
+        heuristics,
+        edge_lines=np.concatenate((edge_lines[forward], edge_lines[backward])),
+        filename=filename,
+        coords=coords,
+        metric=metric,
+        coordinate_scale=coordinate_scale,
+    )
+
+def parse_text(unparsed_text : Iterable[str]) -> WaypointGraph:
+    return parse_lines(unparsed_text)
 
-    heuristics = [heuristics_dict.get(x, 0) for x in node_lookup.keys()]
+def _read_lines(path : pathlib.Path, progress : Callable[[int, int], None] | None = None) -> Iterator[str]:
+    """Lazily read the lines of a file through mmap, progress is called with the bytes read and the size"""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for line_number, line in enumerate(iter(mapped.readline, b"")):
+                if progress is not None and line_number % PROGRESS_LINES == 0:
+                    progress(mapped.tell(), size)
+                yield line.decode()
+            if progress is not None:
+                progress(size, size)
 
-    return WaypointGraph(graph_matrix, start_idx, end_idx, replaced_node_lookup, heuristics)
\ No newline at end of file
+def parse_file(path : str | os.PathLike, progress : Callable[[int, int], None] | None = None) -> WaypointGraph:
+    """
+    Parse a save file without reading it into memory first.
+    progress is called with the bytes read so far and the size of the file,
+    an exception raised by it stops the parser.
+    """
+    path = pathlib.Path(path)
+    try:
+        return parse_lines(_read_lines(path, progress), str(path))
+    except UnicodeDecodeError as e:
+        raise ParseError(f"File is not valid UTF-8: {e.reason}", (str(path), None, None, None)) from None
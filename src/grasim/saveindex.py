@@ -0,0 +1,190 @@
+"""
+Index of the saves of a directory for the selection screen.
+
+For every save the index keeps its mtime, size, node and edge counts,
+whether it parses and its START and END. Saves are parsed in a background
+thread, only when they are new or changed since the last run, and the
+index is stored in the cache directory.
+"""
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import threading
+from dataclasses import asdict, dataclass
+from grasim import cache
+from grasim.errors import ParseError
+
+# Increase when the fields of SaveInfo change
+INDEX_VERSION = 1
+
+
+@dataclass
+class SaveInfo:
+    name : str
+    is_dir : bool
+    size : int
+    mtime_ns : int
+    indexed : bool = False # False until the background thread parsed it
+    ok : bool = False
+    error : str = ""
+    num_nodes : int = 0
+    num_edges : int = 0
+    start : str = ""
+    end : str = ""
+
+    def summary(self) -> str:
+        """Short description for the selection screen"""
+        if self.is_dir:
+            return "directory"
+        size = format_size(self.size)
+        if not self.indexed:
+            return f"{size}, indexing..."
+        if not self.ok:
+            return f"{size}, cannot be parsed: {self.error}"
+        return f"{size}, {self.num_nodes} nodes, {self.num_edges} edges, {self.start} -> {self.end}"
+
+def format_size(size : int) -> str:
+    for unit in ["B", "KB", "MB"]:
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+def index_file(directory : pathlib.Path, cache_dir : pathlib.Path) -> pathlib.Path:
+    key = hashlib.sha1(str(directory.resolve()).encode()).hexdigest()
+    return cache_dir.joinpath(f"{key}.index.json")
+
+def describe_save(path : pathlib.Path, info : SaveInfo, cache_dir : pathlib.Path | None = None) -> SaveInfo:
+    """Parse the save (through the compiled cache) and fill in what the index keeps of it"""
+    info.indexed = True
+    try:
+        graph = cache.load_graph(path, cache_dir)
+    except ParseError as parse:
+        info.error = f"line {parse.lineno}: {parse.msg}"
+        return info
+    except Exception as e:
+        info.error = str(e) or type(e).__name__
+        return info
+    names = list(graph.node_lookup.keys())
+    info.ok = True
+    info.num_nodes = graph.num_nodes
+    info.num_edges = graph.num_edges
+    info.start = names[graph.start_idx].removeprefix("START ").removeprefix("END ")
+    info.end = names[graph.end_idx].removeprefix("END ").removeprefix("START ")
+    return info
+
+class SaveIndex:
+    """
+    The saves and subdirectories of a directory. refresh() only stats the
+    files, changed ones are described by a background thread, entries()
+    can be called every frame.
+    """
+
+    def __init__(self, directory : str | os.PathLike, cache_dir : pathlib.Path | None = None):
+        self.directory = pathlib.Path(directory)
+        self.cache_dir = cache.default_cache_dir() if cache_dir is None else cache_dir
+        self.file = index_file(self.directory, self.cache_dir)
+        self._lock = threading.Lock()
+        self._infos : dict[str, SaveInfo] = self._load()
+        self._sorted : list[SaveInfo] | None = None
+        self._queue : list[SaveInfo] = []
+        self._worker : threading.Thread | None = None
+        self.refresh()
+
+    def _load(self) -> dict[str, SaveInfo]:
+        try:
+            with open(self.file) as f:
+                stored = json.load(f)
+            if stored["version"] == INDEX_VERSION:
+                return {name: SaveInfo(**info) for name, info in stored["saves"].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            pass # missing, outdated or broken index
+        return {}
+
+    def save(self):
+        """Atomically write the described saves to the index file"""
+        with self._lock:
+            saves = {name: asdict(info) for name, info in self._infos.items() if info.indexed or info.is_dir}
+        try:
+            self.file.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile("w", dir=self.file.parent, suffix=".tmp", delete=False) as f:
+                json.dump({"version": INDEX_VERSION, "saves": saves}, f)
+            os.replace(f.name, self.file)
+        except OSError:
+            pass # The index is only an optimization
+
+    def refresh(self):
+        """Look for new, changed and removed saves, changed ones are described again in the background"""
+        infos = {}
+        try:
+            scanned = list(os.scandir(self.directory))
+        except OSError:
+            scanned = []
+        with self._lock:
+            for entry in scanned:
+                # Hidden files hold the stored layouts
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                    stat = entry.stat()
+                except OSError:
+                    continue # removed since the scan, e.g. replaced by an atomic save
+                size, mtime_ns = (0, 0) if is_dir else (stat.st_size, stat.st_mtime_ns)
+                known = self._infos.get(entry.name)
+                if known is not None and (known.is_dir, known.size, known.mtime_ns) == (is_dir, size, mtime_ns):
+                    infos[entry.name] = known
+                    continue
+                info = SaveInfo(entry.name, is_dir, size, mtime_ns, indexed=is_dir)
+                infos[entry.name] = info
+                if not is_dir:
+                    self._queue.append(info)
+            if infos.keys() != self._infos.keys() or any(infos[name] is not self._infos[name] for name in infos):
+                self._sorted = None
+            self._infos = infos
+            if self._queue and self._worker is None:
+                self._worker = threading.Thread(target=self._describe_queued, daemon=True)
+                self._worker.start()
+
+    def _describe_queued(self):
+        while True:
+            with self._lock:
+                # Saves removed or changed again since they were queued are skipped
+                queue = [info for info in self._queue if self._infos.get(info.name) is info]
+                self._queue = []
+            # Small saves first, so most of the list is filled in quickly
+            for info in sorted(queue, key=lambda x: x.size):
+                if self._infos.get(info.name) is info:
+                    described = describe_save(self.directory.joinpath(info.name), SaveInfo(**asdict(info)), self.cache_dir)
+                    with self._lock:
+                        if self._infos.get(info.name) is info:
+                            self._infos[info.name] = described
+                            self._sorted = None
+            # Written before the thread is cleared, so the index file is up to date once wait() returns
+            self.save()
+            with self._lock:
+                if not self._queue:
+                    self._worker = None # refresh() starts a new thread for saves queued from now on
+                    return
+
+    def pending(self) -> int:
+        """Number of saves that are not described yet"""
+        with self._lock:
+            return sum(not info.indexed for info in self._infos.values())
+
+    def wait(self, timeout : float | None = None) -> bool:
+        """Wait for the background thread, True if every save is described"""
+        with self._lock:
+            worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+        return self.pending() == 0
+
+    def entries(self) -> list[SaveInfo]:
+        """Directories and saves sorted by name"""
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._infos.values(), key=lambda x: x.name)
+            return self._sorted
@@ -0,0 +1,365 @@
+"""
+`grasim serve`: keeps graphs of a save directory loaded and answers shortest
+path queries over a local socket, and `grasim loadtest`, a client to time it.
+
+The protocol is one JSON object per line in both directions:
+
+    {"graph": "09-sbahn.graph", "start": "altona", "end": "blankenese", "algorithm": "dijkstra", "id": 1}
+    {"graph": "09-sbahn.graph", "algorithm": "dijkstra", "path": [...], "cost": 15.0, "expanded": 22, ..., "id": 1}
+
+start and end default to START and END of the file. Requests of one
+connection are answered as they finish, "id" is copied to the answer.
+{"op": "nodes", "graph": ..., "limit": 100} lists node names and
+{"op": "stats"} the cache and the loaded graphs.
+"""
+import asyncio
+import json
+import os
+import pathlib
+import random
+import sys
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+import grasim.config as config
+from grasim import cache
+from grasim.dijkstra.landmarks import Landmarks
+from grasim.dijkstra.state import SearchStatePool, search
+from grasim.errors import ParseError
+from grasim.savefile import WaypointGraph
+
+ALGORITHMS = ["astar", "dijkstra"]
+
+
+class QueryError(Exception):
+    """A request that can not be answered, the message is sent to the client"""
+
+@dataclass
+class LoadedGraph:
+    graph : WaypointGraph
+    pool : SearchStatePool
+    version : tuple[int, int] # size and modification time of the file it was loaded from
+    names : list[str] # graph.node_names, which builds the list on every call
+    landmarks : Landmarks | None = None
+
+class ResultCache:
+    """LRU cache of answers, keyed by graph name and query"""
+
+    def __init__(self, max_entries : int):
+        self.max_entries = max_entries
+        self.entries : OrderedDict[tuple, dict] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key : tuple) -> dict | None:
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return result
+
+    def put(self, key : tuple, result : dict):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, graph_name : str):
+        """Drop the answers of a graph, its file changed"""
+        for key in [key for key in self.entries if key[0] == graph_name]:
+            del self.entries[key]
+
+class QueryServer:
+    """
+    Graphs of directory, loaded on their first query and loaded again when
+    their file changes. Loading and searching run on a thread pool, so the
+    event loop keeps answering cached and fast queries during slow ones.
+    """
+
+    def __init__(self, directory : str | os.PathLike, workers : int | None = None,
+                 cache_entries : int = config.SERVE_CACHE_ENTRIES, landmarks : int = config.LANDMARKS):
+        self.directory = pathlib.Path(directory).resolve()
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(self.workers)
+        self.results = ResultCache(cache_entries)
+        self.landmarks = landmarks
+        self.graphs : dict[str, LoadedGraph] = {}
+        self._loading : dict[str, asyncio.Future] = {}
+
+    def _save(self, name) -> pathlib.Path:
+        if not isinstance(name, str):
+            raise QueryError("graph is missing")
+        save = self.directory.joinpath(name).resolve()
+        if not save.is_relative_to(self.directory) or not save.is_file():
+            raise QueryError(f"Unknown graph {name}")
+        return save
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def graph(self, name : str) -> LoadedGraph:
+        """The loaded graph, loaded (again) if the file is new or changed"""
+        save = self._save(name)
+        stat = save.stat()
+        version = (stat.st_size, stat.st_mtime_ns)
+        loaded = self.graphs.get(name)
+        if loaded is not None and loaded.version == version:
+            return loaded
+        if name not in self._loading:
+            # Queries that arrive while it is loaded wait for the same load
+            self._loading[name] = asyncio.ensure_future(self._load(name, save, version))
+        try:
+            return await asyncio.shield(self._loading[name])
+        finally:
+            self._loading.pop(name, None)
+
+    async def _load(self, name : str, save : pathlib.Path, version : tuple[int, int]) -> LoadedGraph:
+        def load() -> tuple[WaypointGraph, list[str]]:
+            graph = cache.load_graph(save)
+            return graph, graph.node_names
+        try:
+            graph, names = await self._run(load)
+        except ParseError as e:
+            raise QueryError(f"{name} cannot be parsed: line {e.lineno}: {e.msg}") from None
+        self.results.invalidate(name)
+        loaded = LoadedGraph(graph, SearchStatePool(graph, self.workers), version, names)
+        self.graphs[name] = loaded
+        return loaded
+
+    async def _heuristics(self, name : str, loaded : LoadedGraph, end_idx : int) -> np.ndarray | None:
+        """A* heuristic to end_idx: the one of the file for END, otherwise landmarks (None without)"""
+        graph = loaded.graph
+        if end_idx == graph.end_idx and graph.heuristics.any():
+            return graph.heuristics
+        if not self.landmarks:
+            return None
+        if loaded.landmarks is None:
+            loaded.landmarks = await self._run(cache.load_landmarks, self._save(name), graph, self.landmarks)
+        return loaded.landmarks.heuristics(end_idx)
+
+    @staticmethod
+    def _node(graph : WaypointGraph, name : str | None, default : int) -> int:
+        if name is None:
+            return default
+        if not isinstance(name, str):
+            raise QueryError(f"Node names are strings, got {json.dumps(name)}")
+        lookup = graph.node_lookup
+        for key in (name, f"START {name}", f"END {name}"):
+            if key in lookup:
+                return lookup[key]
+        raise QueryError(f"Unknown node {name}")
+
+    async def query(self, request : dict) -> dict:
+        name = request.get("graph")
+        algorithm = request.get("algorithm", "astar")
+        if algorithm not in ALGORITHMS:
+            raise QueryError(f"Unknown algorithm {algorithm}, expected one of {ALGORITHMS}")
+        loaded = await self.graph(name)
+        graph = loaded.graph
+        start_idx = self._node(graph, request.get("start"), graph.start_idx)
+        end_idx = self._node(graph, request.get("end"), graph.end_idx)
+
+        key = (name, loaded.version, start_idx, end_idx, algorithm)
+        result = self.results.get(key)
+        if result is not None:
+            return {**result, "cached": True}
+
+        heuristics = None
+        if algorithm == "astar":
+            heuristics = await self._heuristics(name, loaded, end_idx)
+        started = time.perf_counter()
+        cost, path, expanded = await self._run(self._search, loaded.pool, start_idx, end_idx, heuristics)
+        names = loaded.names
+        result = {
+            "graph": name,
+            "algorithm": algorithm,
+            "path": None if path is None else [names[idx] for idx in path],
+            "cost": None if path is None else cost,
+            "expanded": expanded,
+            "time": time.perf_counter() - started,
+        }
+        self.results.put(key, result)
+        return {**result, "cached": False}
+
+    @staticmethod
+    def _search(pool : SearchStatePool, start_idx : int, end_idx : int, heuristics) -> tuple[float, list[int] | None, int]:
+        with pool.state() as state:
+            cost = search(pool.graph, state, start_idx, end_idx, heuristics)
+            return cost, state.path(start_idx, end_idx), state.expanded
+
+    async def nodes(self, request : dict) -> dict:
+        loaded = await self.graph(request.get("graph"))
+        names = loaded.names
+        limit = min(int(request.get("limit", 100)), len(names))
+        sample = np.random.default_rng(request.get("seed")).choice(len(names), limit, replace=False)
+        return {"graph": request["graph"], "num_nodes": len(names), "nodes": [names[idx] for idx in sample.tolist()]}
+
+    def stats(self) -> dict:
+        return {
+            "graphs": {name: {"nodes": loaded.graph.num_nodes, "edges": loaded.graph.num_edges}
+                       for name, loaded in self.graphs.items()},
+            "cache": {"entries": len(self.results.entries), "hits": self.results.hits, "misses": self.results.misses},
+        }
+
+    async def answer(self, line : bytes) -> dict:
+        """The answer to one request line, errors are answers too"""
+        try:
+            request = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            return {"error": f"Invalid JSON: {e}"}
+        if not isinstance(request, dict):
+            return {"error": "Expected a JSON object"}
+        try:
+            op = request.get("op", "query")
+            if op == "query":
+                answer = await self.query(request)
+            elif op == "nodes":
+                answer = await self.nodes(request)
+            elif op == "stats":
+                answer = self.stats()
+            else:
+                raise QueryError(f"Unknown op {op}")
+        except (QueryError, OSError, ValueError, TypeError) as e:
+            answer = {"error": str(e)}
+        except Exception as e:
+            # Every request gets an answer, otherwise the client waits for it forever
+            traceback.print_exc()
+            answer = {"error": f"Internal error: {type(e).__name__}: {e}"}
+        if "id" in request:
+            answer["id"] = request["id"]
+        return answer
+
+    async def handle(self, reader : asyncio.StreamReader, writer : asyncio.StreamWriter):
+        """Answer the requests of a connection, each one as soon as it is done"""
+        tasks = set()
+        async def respond(line : bytes):
+            answer = await self.answer(line)
+            writer.write(json.dumps(answer).encode() + b"\n")
+            await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.create_task(respond(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host : str = "127.0.0.1", port : int = config.SERVE_PORT, socket : str | None = None):
+        if socket is not None:
+            return await asyncio.start_unix_server(self.handle, socket)
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+async def _serve(args):
+    server = QueryServer(args.directory, args.workers, args.cache_entries, args.landmarks)
+    listener = await server.start(args.host, args.port, args.socket)
+    address = args.socket or f"{args.host}:{args.port}"
+    print(f"Serving the graphs of {server.directory} on {address}", file=sys.stderr)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+def serve_command(args) -> int:
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+async def open_connection(host : str = "127.0.0.1", port : int = config.SERVE_PORT, socket : str | None = None):
+    if socket is not None:
+        return await asyncio.open_unix_connection(socket)
+    return await asyncio.open_connection(host, port)
+
+async def request(reader : asyncio.StreamReader, writer : asyncio.StreamWriter, message : dict) -> dict:
+    """Send one request and wait for its answer, for connections without other requests in flight"""
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+async def load_test(graph : str, queries : int, concurrency : int, algorithm : str = "astar", seed : int | None = None,
+                    host : str = "127.0.0.1", port : int = config.SERVE_PORT, socket : str | None = None) -> dict:
+    """
+    Send queries between random nodes of graph over concurrency connections
+    and report the latencies. Node pairs repeat, so the cache is used too.
+    """
+    reader, writer = await open_connection(host, port, socket)
+    answer = await request(reader, writer, {"op": "nodes", "graph": graph, "limit": 1000, "seed": seed})
+    writer.close()
+    await writer.wait_closed()
+    if "error" in answer:
+        raise QueryError(answer["error"])
+    rng = random.Random(seed)
+    pairs = [rng.sample(answer["nodes"], 2) if len(answer["nodes"]) > 1 else answer["nodes"] * 2
+             for _ in range(max(queries // 2, 1))]
+    todo = [rng.choice(pairs) for _ in range(queries)]
+    latencies : list[float] = []
+    counts = {"errors": 0, "cached": 0}
+
+    async def client():
+        reader, writer = await open_connection(host, port, socket)
+        while todo:
+            start, end = todo.pop()
+            started = time.perf_counter()
+            answer = await request(reader, writer, {"graph": graph, "start": start, "end": end, "algorithm": algorithm})
+            latencies.append(time.perf_counter() - started)
+            counts["errors"] += "error" in answer
+            counts["cached"] += bool(answer.get("cached"))
+        writer.close()
+        await writer.wait_closed()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]).tolist()
+    return {"graph": graph, "queries": len(latencies), "concurrency": concurrency, "seconds": elapsed,
+            "queries_per_second": len(latencies) / elapsed, "p50": p50, "p95": p95, "p99": p99, **counts}
+
+def loadtest_command(args) -> int:
+    try:
+        result = asyncio.run(load_test(args.graph, args.queries, args.concurrency, args.algorithm, args.seed,
+                                       args.host, args.port, args.socket))
+    except (OSError, QueryError) as e:
+        print(f"failed: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(result))
+    return 1 if result["errors"] else 0
+
+def _add_address_arguments(parser):
+    parser.add_argument("--host", default="127.0.0.1", help="Address of the TCP socket")
+    parser.add_argument("--port", type=int, default=config.SERVE_PORT, help="Port of the TCP socket")
+    parser.add_argument("--socket", help="Path of a Unix socket, used instead of TCP")
+
+def add_serve_parser(subparsers):
+    parser = subparsers.add_parser("serve", help="Keep graphs loaded and answer shortest path queries over a socket")
+    parser.add_argument("directory", nargs="?", default=".", help="Directory of the saves, graphs are named by their path in it")
+    _add_address_arguments(parser)
+    parser.add_argument("-w", "--workers", type=int, help="Threads for loading and searching")
+    parser.add_argument("--cache-entries", type=int, default=config.SERVE_CACHE_ENTRIES, help="Answers kept in the LRU cache")
+    parser.add_argument("--landmarks", type=int, default=config.LANDMARKS, metavar="K",
+                        help="A* to other nodes than END uses K landmarks as heuristic, 0 for Dijkstra")
+    parser.set_defaults(func=serve_command)
+
+def add_loadtest_parser(subparsers):
+    parser = subparsers.add_parser("loadtest", help="Send random queries to grasim serve and report the latencies")
+    parser.add_argument("graph", help="Name of the graph on the server")
+    _add_address_arguments(parser)
+    parser.add_argument("-n", "--queries", type=int, default=1000)
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="Connections sending queries at the same time")
+    parser.add_argument("-a", "--algorithm", choices=ALGORITHMS, default="astar")
+    parser.add_argument("--seed", type=int)
+    parser.set_defaults(func=loadtest_command)
@@ -0,0 +1,76 @@
+import numpy as np
+
+# Boxes that cover more grid cells than this are not put into the grid but checked on every query
+MAX_CELLS_PER_ITEM = 16
+
+class GridIndex:
+    """
+    Uniform grid over axis aligned bounding boxes (x0, y0, x1, y1).
+
+    Every box is stored in each cell it overlaps, the cells are kept in CSR
+    form (cell_indptr, cell_items) like the edges of a WaypointGraph.
+    """
+
+    def __init__(self, bounds : np.ndarray):
+        self.bounds = bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        num_items = len(bounds)
+        self.cells_per_axis = int(np.clip(np.sqrt(num_items), 1, 1024))
+        if num_items == 0:
+            self.origin, self.cell_size = np.zeros(2), np.ones(2)
+        else:
+            self.origin = bounds[:, :2].min(0)
+            extent = bounds[:, 2:].max(0) - self.origin
+            # Cells should not be much smaller than a typical box, otherwise boxes end up in many cells
+            typical_size = np.median(bounds[:, 2:] - bounds[:, :2], axis=0)
+            boxes_per_axis = np.where(extent > 0, extent / np.maximum(typical_size, 1e-9), np.inf)
+            self.cells_per_axis = int(np.clip(min(self.cells_per_axis, *boxes_per_axis), 1, 1024))
+            self.cell_size = np.maximum(extent / self.cells_per_axis, 1e-9)
+
+        first = self._cell(bounds[:, :2])
+        last = self._cell(bounds[:, 2:])
+        widths = last[:, 0] - first[:, 0] + 1
+        counts = widths * (last[:, 1] - first[:, 1] + 1)
+
+        oversized = counts > MAX_CELLS_PER_ITEM
+        self.oversized = np.where(oversized)[0]
+        items = np.where(~oversized)[0]
+        counts = counts[items]
+
+        # Enumerate all cells of every box
+        item_of_cell = np.repeat(items, counts)
+        position = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        widths = np.repeat(widths[items], counts)
+        cell_x = np.repeat(first[items, 0], counts) + position % widths
+        cell_y = np.repeat(first[items, 1], counts) + position // widths
+        cells = cell_y * self.cells_per_axis + cell_x
+
+        order = np.argsort(cells, kind="stable")
+        self.cell_items = item_of_cell[order]
+        self.cell_indptr = np.zeros(self.cells_per_axis ** 2 + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=self.cells_per_axis ** 2), out=self.cell_indptr[1:])
+
+    def _cell(self, points : np.ndarray) -> np.ndarray:
+        cell = np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+        return np.clip(cell, 0, self.cells_per_axis - 1)
+
+    def query(self, x0 : float, y0 : float, x1 : float, y1 : float) -> np.ndarray:
+        """Sorted indices of all boxes intersecting the rectangle"""
+        if len(self.bounds) == 0:
+            return np.zeros(0, dtype=np.int64)
+        (first_x, first_y), (last_x, last_y) = self._cell(np.array([[x0, y0], [x1, y1]]))
+        if first_x == 0 and first_y == 0 and last_x == last_y == self.cells_per_axis - 1:
+            candidates = np.arange(len(self.bounds))
+        else:
+            cells = (np.arange(first_y, last_y + 1)[:, None] * self.cells_per_axis
+                     + np.arange(first_x, last_x + 1)[None, :]).ravel()
+            starts = self.cell_indptr[cells]
+            lengths = self.cell_indptr[cells + 1] - starts
+            positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            # Boxes are in several cells, mark them to get every box once
+            found = np.zeros(len(self.bounds), dtype=bool)
+            found[self.cell_items[positions]] = True
+            found[self.oversized] = True
+            candidates = np.flatnonzero(found)
+
+        bounds = self.bounds[candidates]
+        return candidates[(bounds[:, 0] <= x1) & (bounds[:, 2] >= x0) & (bounds[:, 1] <= y1) & (bounds[:, 3] >= y0)]
@@ -0,0 +1,45 @@
+from collections import OrderedDict
+import grasim.config as config
+
+
+class TextCache:
+    """
+    Least recently used cache of rendered text surfaces.
+
+    render() takes the same arguments as pygame.font.Font.render. Surfaces are
+    dropped, oldest first, as soon as they take more than max_bytes.
+    """
+
+    def __init__(self, font, max_bytes : int = config.TEXT_CACHE_BYTES):
+        self.font = font
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.surfaces = OrderedDict() # (text, color, background, antialias) => (surface, bytes)
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text : str, antialias : bool, color, background=None):
+        key = (text, color, background, antialias)
+        cached = self.surfaces.get(key)
+        if cached is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return cached[0]
+
+        self.misses += 1
+        surface = self.font.render(text, antialias, color, background)
+        size = surface.get_pitch() * surface.get_height()
+        self.surfaces[key] = (surface, size)
+        self.used_bytes += size
+        while self.used_bytes > self.max_bytes and len(self.surfaces) > 1:
+            _, (_, dropped_size) = self.surfaces.popitem(last=False)
+            self.used_bytes -= dropped_size
+        return surface
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.surfaces),
+            "bytes": self.used_bytes,
+        }
@@ -0,0 +1,29 @@
+import pathlib
+from grasim.batch import find_saves, solve_file, solve_many
+
+SAVES = pathlib.Path(__file__).parent.parent.joinpath("saves")
+
+def test_solve_file():
+    result = solve_file(SAVES.joinpath("03-class_slides_03.24.graph"), dijkstra_mode=False)
+    assert result["path"] == ["G", "E", "Z"]
+    assert result["cost"] == 13
+    assert set(result["time"]) == {"parse", "search"}
+
+def test_solve_file_error():
+    result = solve_file(SAVES.joinpath("00-tests", "02-error-two.graph"), dijkstra_mode=True)
+    assert "error" in result
+
+def test_engines_agree():
+    saves = find_saves([SAVES])
+    heap = {x["file"]: x for x in solve_many(saves, dijkstra_mode=True, workers=2, engine="heap")}
+    scan = {x["file"]: x for x in solve_many(saves, dijkstra_mode=True, workers=1, engine="scan")}
+    assert heap.keys() == scan.keys() == {str(x) for x in saves}
+    for file, result in heap.items():
+        assert result.get("path") == scan[file].get("path")
+        assert result.get("expanded") == scan[file].get("expanded")
+
+def test_bidirectional_costs():
+    saves = find_saves([SAVES])
+    heap = {x["file"]: x for x in solve_many(saves, dijkstra_mode=True, workers=1, engine="heap")}
+    for result in solve_many(saves, dijkstra_mode=True, workers=1, engine="bidirectional"):
+        assert result.get("cost") == heap[result["file"]].get("cost")
@@ -0,0 +1,32 @@
+import copy
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pathlib
+from grasim import benchmark
+
+SAVES = pathlib.Path(__file__).parent.parent.joinpath("saves")
+
+def test_all_stages():
+    cases = [case for case in benchmark.shipped_cases(SAVES) if case.name == "09-sbahn.graph"]
+    cases += benchmark.generated_cases([50], "grid")
+    report = benchmark.run_benchmarks(cases, repeat=2)
+    assert report["version"] == benchmark.BENCHMARK_VERSION
+    assert {(x["case"], x["stage"]) for x in report["results"]} \
+        == {(case.name, stage) for case in cases for stage in benchmark.STAGES}
+    assert all(len(x["runs"]) == 2 and x["seconds"] == min(x["runs"]) for x in report["results"])
+
+def test_large_graphs_skip_slow_stages():
+    report = benchmark.run_benchmarks(benchmark.generated_cases([200]), repeat=1, stages=["layout", "search_scan", "search_heap"],
+                                      max_layout_nodes=100, max_scan_nodes=100)
+    assert [x["stage"] for x in report["results"]] == ["search_heap"]
+
+def test_compare_with_baseline():
+    report = {"results": [{"case": "a", "stage": "parse", "seconds": 0.5}, {"case": "a", "stage": "render", "seconds": 0.2},
+                          {"case": "b", "stage": "parse", "seconds": 0.0005}]}
+    baseline = copy.deepcopy(report)
+    baseline["results"][0]["seconds"] = 0.25 # parse got twice as slow
+    baseline["results"][2]["seconds"] = 0.0001 # but too fast to tell
+    comparison = benchmark.compare(report, baseline, tolerance=0.2)
+    assert [(x["case"], x["stage"], x["regression"]) for x in comparison] \
+        == [("a", "parse", True), ("a", "render", False), ("b", "parse", False)]
+    assert comparison[0]["ratio"] == 2
@@ -0,0 +1,49 @@
+import pathlib
+import pytest
+from grasim.savefile import parse_file, parse_text
+from grasim.errors import ParseError
+from grasim.dijkstra.dijkstra import extract_path
+from grasim.dijkstra.heap import HeapSearch
+from grasim.dijkstra.bidirectional import BidirectionalSearch
+
+# Hidden files are stored layouts
+SAVES = sorted(x for x in pathlib.Path(__file__).parent.parent.joinpath("saves").rglob("*")
+               if x.is_file() and not x.name.startswith("."))
+
+def solve(search, graph):
+    expanded = 0
+    while search.dijkstra_table[graph.end_idx, 2] != 1 and search.step():
+        expanded += 1
+    return extract_path(search.dijkstra_table, graph.start_idx, graph.end_idx), expanded
+
+@pytest.mark.parametrize("dijkstra_mode", [True, False], ids=["dijkstra", "astar"])
+@pytest.mark.parametrize("save", SAVES, ids=[x.name for x in SAVES])
+def test_same_cost_as_heap(save, dijkstra_mode):
+    try:
+        graph = parse_file(save)
+    except ParseError:
+        pytest.skip("save is not parseable")
+
+    heap = HeapSearch(graph, dijkstra_mode)
+    expected, _ = solve(heap, graph)
+    bidirectional = BidirectionalSearch(graph, dijkstra_mode)
+    path, _ = solve(bidirectional, graph)
+    if expected is None:
+        assert path is None
+        return
+    cost = sum(graph.edge_weight(i, j) for i, j in zip(path, path[1:]))
+    assert path[0] == graph.start_idx and path[-1] == graph.end_idx
+    assert cost == bidirectional.dijkstra_table[graph.end_idx, 0] == heap.dijkstra_table[graph.end_idx, 0]
+
+def test_directed_edges():
+    # The short way only exists in the other direction
+    graph = parse_text(["A -1- B", "B <-1- C", "A -5- C", "START A", "END C"])
+    path, _ = solve(BidirectionalSearch(graph, True), graph)
+    assert [graph.node_names[idx] for idx in path] == ["A", "C"]
+
+def test_fewer_expanded_nodes_on_corridor():
+    graph = parse_file(SAVES[0].parent.parent.joinpath("09-sbahn.graph"))
+    _, expanded = solve(HeapSearch(graph, True), graph)
+    search = BidirectionalSearch(graph, True)
+    solve(search, graph)
+    assert search.expanded < 0.7 * expanded
@@ -0,0 +1,32 @@
+import os
+import numpy as np
+import pytest
+from grasim import cache, savefile
+
+@pytest.fixture
+def save(tmp_path):
+    save = tmp_path.joinpath("test.graph")
+    save.write_text("A(2)\nA -1- B\nB -2-> C\nSTART A\nEND C\n")
+    return save
+
+def test_cached_graph_is_not_parsed(save, tmp_path, monkeypatch):
+    graph = cache.load_graph(save, tmp_path.joinpath("cache"))
+
+    def fail(path):
+        raise AssertionError("parsed again")
+    monkeypatch.setattr(savefile, "parse_file", fail)
+    cached = cache.load_graph(save, tmp_path.joinpath("cache"))
+
+    assert cached.node_lookup == graph.node_lookup
+    assert (cached.start_idx, cached.end_idx) == (graph.start_idx, graph.end_idx)
+    for name in ["indptr", "indices", "weights", "heuristics", "rev_indptr", "rev_indices", "rev_weights"]:
+        assert np.array_equal(getattr(cached, name), getattr(graph, name))
+
+def test_changed_save_is_parsed_again(save, tmp_path):
+    cache.load_graph(save, tmp_path.joinpath("cache"))
+    save.write_text("A -1- B\nSTART A\nEND B\n")
+    stat = save.stat()
+    os.utime(save, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    graph = cache.load_graph(save, tmp_path.joinpath("cache"))
+    assert graph.node_names == ["A", "B"]
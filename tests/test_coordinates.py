@@ -0,0 +1,61 @@
+import pathlib
+import numpy as np
+import pytest
+from grasim import cache, coordinates, layout
+from grasim.batch import check_file
+from grasim.errors import ParseError
+from grasim.savefile import parse_file, parse_text
+
+SAVES = pathlib.Path(__file__).parent.parent.joinpath("saves")
+
+def test_parse_coordinates():
+    graph = parse_text("A[0, 0]\nB[3, -4]\nC(1)\nC[ 0.5 , 1.5 ]\nA -5- B\nB -1- C\nD -1- C\nSTART A\nEND B\n".split("\n"))
+    assert graph.metric == "euclidean"
+    assert np.array_equal(graph.coords, [[0, 0], [3, -4], [0.5, 1.5], [np.nan, np.nan]], equal_nan=True)
+    # Distance to END, explicit heuristics win, nodes without coordinates get 0
+    assert graph.heuristics.tolist() == [5, 0, 1, 0]
+    assert graph.coordinate_heuristics().tolist() == pytest.approx([5, 0, np.hypot(2.5, 5.5), 0])
+
+def test_unknown_metric():
+    with pytest.raises(ParseError) as error:
+        parse_text("COORDINATES manhattan\nA -1- B\nSTART A\nEND B\n".split("\n"))
+    assert error.value.lineno == 1
+
+def test_haversine():
+    hamburg, berlin = [53.55, 10.0], [52.52, 13.40]
+    distances = coordinates.coordinate_distances(np.array([hamburg, berlin]), 1, "haversine")
+    assert distances[1] == 0
+    assert distances[0] == pytest.approx(255, abs=2)
+
+    graph = parse_text("COORDINATES haversine 0.5\nA[53.55, 10.0]\nB[52.52, 13.40]\nA -300- B\nSTART A\nEND B\n".split("\n"))
+    assert (graph.metric, graph.coordinate_scale) == ("haversine", 0.5)
+    assert graph.heuristics[0] == pytest.approx(distances[0] / 2)
+
+def test_inconsistent_edges():
+    graph = parse_text("A(1)\nB(0)\nC(5)\nA -0- B\nA -1- C\nSTART A\nEND B\n".split("\n"))
+    edges = graph.inconsistent_edges()
+    assert [(graph.node_names[source], graph.node_names[target]) for source, target
+            in zip(graph.edge_sources()[edges], graph.indices[edges])] == [("A", "B"), ("C", "A")]
+    assert len(graph.inconsistent_edges(np.zeros(3))) == 0
+
+def test_check_file():
+    assert check_file(str(SAVES / "10-cities.graph")) == {"file": str(SAVES / "10-cities.graph"), "end_heuristic": 0.0, "inconsistent": []}
+    result = check_file(str(SAVES / "00-tests" / "06-zero-distance-astar.graph"))
+    assert result["inconsistent"] == [{"from": "A", "to": "B", "distance": 0.0, "heuristic_from": 1.0, "heuristic_to": 0.0}]
+
+def test_layout_from_coordinates(monkeypatch):
+    def fail(*args):
+        raise AssertionError("igraph layout")
+    monkeypatch.setattr(layout, "compute_layout", fail)
+    graph = parse_file(SAVES / "10-cities.graph")
+    points = layout.load_or_compute_layout(None, graph)
+    kiel, magdeburg = graph.node_lookup["START Kiel"], graph.node_lookup["END Magdeburg"]
+    # North is up
+    assert points[kiel, 1] < points[magdeburg, 1]
+
+def test_compiled_coordinates(tmp_path):
+    graph = parse_file(SAVES / "10-cities.graph")
+    cache.write_compiled(graph, tmp_path / "cities.npz")
+    compiled, _ = cache.read_compiled(tmp_path / "cities.npz")
+    assert np.array_equal(compiled.coords, graph.coords)
+    assert (compiled.metric, compiled.coordinate_scale) == ("haversine", 1.0)
@@ -0,0 +1,47 @@
+import pathlib
+import numpy as np
+import pytest
+from grasim.savefile import parse_text
+from grasim.errors import ParseError
+from grasim.dijkstra import dijkstra
+from grasim.dijkstra.heap import HeapSearch
+
+# Hidden files are stored layouts
+SAVES = sorted(x for x in pathlib.Path(__file__).parent.parent.joinpath("saves").rglob("*")
+               if x.is_file() and not x.name.startswith("."))
+
+@pytest.mark.parametrize("dijkstra_mode", [True, False], ids=["dijkstra", "astar"])
+@pytest.mark.parametrize("save", SAVES, ids=[x.name for x in SAVES])
+def test_heap_matches_table_scan(save, dijkstra_mode):
+    try:
+        graph = parse_text(save.read_text().split("\n"))
+    except ParseError:
+        pytest.skip("save is not parseable")
+
+    dijkstra_table = dijkstra.init_dijkstra_table(graph.num_nodes, graph.start_idx)
+    search = HeapSearch(graph, dijkstra_mode)
+
+    while True:
+        stepped = dijkstra.dijkstra_step(dijkstra_table, graph, dijkstra_mode)
+        assert search.step() == stepped
+        assert np.array_equal(search.dijkstra_table, dijkstra_table)
+        if not stepped:
+            break
+
+@pytest.mark.parametrize("engine", ["table_scan", "heap"])
+def test_relaxation_keeps_shorter_distances(engine):
+    """A node reached again on a shorter way gets the shorter distance, even if its heuristic is large"""
+    save = pathlib.Path(__file__).parent.parent.joinpath("saves", "09-sbahn.graph")
+    graph = parse_text(save.read_text().split("\n"))
+    dijkstra_table = dijkstra.init_dijkstra_table(graph.num_nodes, graph.start_idx)
+    search = HeapSearch(graph, dijkstra_mode=False)
+    if engine == "heap":
+        dijkstra_table = search.dijkstra_table
+    step = search.step if engine == "heap" else lambda: dijkstra.dijkstra_step(dijkstra_table, graph, False)
+    while step():
+        done = np.flatnonzero(dijkstra_table[:, 2] == 1)
+        for idx in done.tolist():
+            for target, weight in zip(graph.indices[graph.indptr[idx]:graph.indptr[idx + 1]].tolist(),
+                                      graph.weights[graph.indptr[idx]:graph.indptr[idx + 1]].tolist()):
+                if dijkstra_table[target, 2] == 0:
+                    assert dijkstra_table[target, 0] <= dijkstra_table[idx, 0] + weight
@@ -0,0 +1,58 @@
+import io
+import argparse
+import numpy as np
+import pytest
+from grasim import cache, graph_generator
+from grasim.graph_generator import generate_graph, to_waypoint_graph, write_graph_text
+from grasim.savefile import parse_text
+from grasim.dijkstra.heap import HeapSearch
+from grasim.dijkstra.landmarks import shortest_distances
+
+def cost(graph, dijkstra_mode):
+    search = HeapSearch(graph, dijkstra_mode)
+    while search.dijkstra_table[graph.end_idx, 2] != 1 and search.step():
+        pass
+    return search.dijkstra_table[graph.end_idx, 0]
+
+@pytest.mark.parametrize("kind", list(graph_generator.GENERATORS))
+def test_heuristics_are_admissible(kind):
+    text = io.StringIO()
+    write_graph_text(generate_graph(kind, 500, seed=1), text)
+    graph = parse_text(text.getvalue().split("\n"))
+    distances = shortest_distances(graph.rev_indptr, graph.rev_indices, graph.rev_weights, graph.end_idx)
+    assert (graph.heuristics <= distances).all()
+    assert cost(graph, False) == cost(graph, True) < np.inf
+
+@pytest.mark.parametrize("kind", list(graph_generator.GENERATORS))
+def test_same_seed_same_graph(kind):
+    first, second = generate_graph(kind, 300, seed=7), generate_graph(kind, 300, seed=7)
+    for name in ["points", "sources", "targets", "weights"]:
+        assert np.array_equal(getattr(first, name), getattr(second, name))
+    assert not np.array_equal(first.points, generate_graph(kind, 300, seed=8).points)
+
+def test_knn_degree():
+    generated = generate_graph("knn", 2000, seed=0, degree=5)
+    assert (np.bincount(np.concatenate((generated.sources, generated.targets)), minlength=2000) >= 5).all()
+
+def test_compiled_output(tmp_path):
+    generated = generate_graph("grid", 400, seed=3)
+    text = io.StringIO()
+    write_graph_text(generated, text)
+    parsed = parse_text(text.getvalue().split("\n"))
+
+    target = tmp_path.joinpath("grid.npz")
+    args = argparse.Namespace(kind="grid", nodes=400, seed=3, degree=4, output=str(target))
+    assert graph_generator.generate_command(args) == 0
+    compiled, _ = cache.read_compiled(target)
+    assert compiled.num_edges == parsed.num_edges == 2 * len(generated.weights)
+    # The text rounds the distances up
+    assert cost(compiled, True) == pytest.approx(cost(parsed, True), abs=0.001 * compiled.num_nodes)
+    assert compiled.node_names == to_waypoint_graph(generated).node_names
+
+@pytest.mark.parametrize("num_nodes", [2, 30, 97, 100])
+def test_sparse_grid_connects_start_and_end(num_nodes):
+    for seed in range(5):
+        text = io.StringIO()
+        write_graph_text(generate_graph("grid", num_nodes, seed=seed, degree=1), text)
+        graph = parse_text(text.getvalue().split("\n"))
+        assert cost(graph, True) < np.inf
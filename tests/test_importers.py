@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from grasim import cache, importers
+from grasim.batch import solve_file
+from grasim.errors import ParseError
+from grasim.savefile import NumberedNodes
+
+DIMACS = """c duplicate arcs keep the shortest one
+p sp 6 7
+a 1 2 3
+a 2 3 4
+a 1 2 2
+a 3 5 1
+a 1 4 10
+a 4 5 1
+a 5 1 7
+"""
+
+COORDINATES = """c millionths of degrees, longitude first
+p aux sp co 6
+v 1 10000000 53550000
+v 2 10500000 53000000
+v 3 11000000 52800000
+v 5 12000000 52500000
+"""
+
+@pytest.fixture
+def gr(tmp_path):
+    path = tmp_path / "road.gr"
+    path.write_text(DIMACS)
+    return path
+
+def test_numbered_nodes():
+    nodes = NumberedNodes(np.array([3, 7, 12]), 0, 2)
+    assert list(nodes) == ["START 3", "7", "END 12"]
+    assert nodes["7"] == 1 and nodes["END 12"] == 2
+    assert "12" not in nodes and "8" not in nodes and "x" not in nodes and 7 not in nodes
+    assert dict(nodes) == {"START 3": 0, "7": 1, "END 12": 2}
+
+def test_read_dimacs(gr, monkeypatch):
+    monkeypatch.setattr(importers, "IMPORT_CHUNK_BYTES", 16) # lines are split over chunks
+    graph = importers.read_dimacs(gr, 1, 5)
+    # Node 6 only appears in the problem line
+    assert graph.num_nodes == 6 and graph.num_edges == 6
+    assert graph.edge_weight(0, 1) == 2
+    assert graph.edge_weight(4, 0) == 7 and graph.edge_weight(0, 4) == -1
+    assert graph.coords is None and not graph.heuristics.any()
+
+def test_dimacs_coordinates(gr):
+    gr.with_suffix(".co").write_text(COORDINATES)
+    graph = importers.import_file(gr, 1, 5)
+    assert graph.metric == "haversine"
+    assert graph.coords[0].tolist() == [53.55, 10.0]
+    assert np.isnan(graph.coords[3]).all()
+    heuristics = graph.coordinate_heuristics()
+    assert heuristics[4] == 0 and heuristics[3] == 0
+    assert heuristics[0] == pytest.approx(177.5, abs=0.5)
+
+def test_unknown_node_ids(gr, tmp_path):
+    path = tmp_path / "bad.gr"
+    path.write_text("p sp 3 2\na 1 2 1\na 2 7 1\n")
+    with pytest.raises(ParseError, match="Node 7 "):
+        importers.read_dimacs(path, 1, 2)
+    gr.with_suffix(".co").write_text(COORDINATES + "v 9 10000000 53550000\n")
+    with pytest.raises(ParseError, match="Node 9 "):
+        importers.import_file(gr, 1, 5)
+
+def test_read_csv(tmp_path):
+    path = tmp_path / "edges.csv"
+    path.write_text("weight;from;to\n1.5;10;200\n2;200;40\n5;10;40\n")
+    graph = importers.read_csv(path, 10, 40, delimiter=";", columns=(1, 2, 0), undirected=True)
+    assert list(graph.node_lookup) == ["START 10", "END 40", "200"]
+    assert graph.edge_weight(1, 2) == 2 and graph.edge_weight(2, 1) == 2
+
+    with pytest.raises(ParseError):
+        importers.read_csv(path, 10, 41, delimiter=";", columns=(1, 2, 0))
+
+def test_compiled_roundtrip(gr, tmp_path):
+    gr.with_suffix(".co").write_text(COORDINATES)
+    graph = importers.import_file(gr, 1, 5)
+    cache.write_compiled(graph, tmp_path / "road.npz")
+    compiled = cache.load_graph(tmp_path / "road.npz")
+    assert isinstance(compiled.node_lookup, NumberedNodes)
+    assert list(compiled.node_lookup) == list(graph.node_lookup)
+    assert np.array_equal(compiled.coords, graph.coords, equal_nan=True)
+
+    result = solve_file(str(tmp_path / "road.npz"), True)
+    assert result["cost"] == 7 and result["path"] == ["1", "2", "3", "5"]
@@ -0,0 +1,66 @@
+import pathlib
+import numpy as np
+import pytest
+from grasim import cache
+from grasim.savefile import parse_file, parse_text
+from grasim.dijkstra.landmarks import select_landmarks, shortest_distances
+from grasim.dijkstra.heap import HeapSearch
+from grasim.dijkstra.bidirectional import BidirectionalSearch
+from grasim.dijkstra.dijkstra import extract_path
+
+SAVES = pathlib.Path(__file__).parent.parent.joinpath("saves")
+
+def expanded_nodes(search, graph) -> int:
+    expanded = 0
+    while search.dijkstra_table[graph.end_idx, 2] != 1 and search.step():
+        expanded += 1
+    return expanded
+
+@pytest.mark.parametrize("save", ["09-sbahn.graph", "01-iwanowskis_examples/00-sbahnDirectedBlankeneseDollern.txt"])
+def test_heuristics_are_admissible_and_consistent(save):
+    graph = parse_file(SAVES.joinpath(save))
+    alt = select_landmarks(graph, 4)
+    sources = graph.edge_sources()
+    for target in range(graph.num_nodes):
+        heuristics = alt.heuristics(target)
+        distances = shortest_distances(graph.rev_indptr, graph.rev_indices, graph.rev_weights, target)
+        assert (heuristics <= distances + 1e-9).all()
+        assert (heuristics[sources] <= graph.weights + heuristics[graph.indices] + 1e-9).all()
+        from_target = shortest_distances(graph.indptr, graph.indices, graph.weights, target)
+        assert (alt.heuristics_from(target) <= from_target + 1e-9).all()
+
+def test_fewer_expanded_nodes():
+    graph = parse_file(SAVES.joinpath("09-sbahn.graph"))
+    dijkstra = HeapSearch(graph, True)
+    without = expanded_nodes(dijkstra, graph)
+
+    alt = select_landmarks(graph, 8)
+    graph.heuristics = alt.heuristics(graph.end_idx)
+    astar = HeapSearch(graph, False)
+    assert expanded_nodes(astar, graph) < without / 2
+    assert astar.dijkstra_table[graph.end_idx, 0] == dijkstra.dijkstra_table[graph.end_idx, 0]
+
+    bidirectional = BidirectionalSearch(graph, False, alt.heuristics_from(graph.start_idx))
+    expanded_nodes(bidirectional, graph)
+    assert extract_path(bidirectional.dijkstra_table, graph.start_idx, graph.end_idx)
+    assert bidirectional.dijkstra_table[graph.end_idx, 0] == dijkstra.dijkstra_table[graph.end_idx, 0]
+
+def test_every_component_gets_a_landmark():
+    graph = parse_text(["A -1- B", "C -1- D", "START A", "END B"])
+    alt = select_landmarks(graph, 2)
+    assert sorted(alt.landmarks // 2) == [0, 1]
+    assert not alt.heuristics(graph.end_idx)[2:].any() # not connected to END
+
+def test_landmarks_are_cached(tmp_path, monkeypatch):
+    save = tmp_path.joinpath("test.graph")
+    save.write_text("A -1- B\nB -2-> C\nSTART A\nEND C\n")
+    graph = parse_file(save)
+    alt = cache.load_landmarks(save, graph, 2, tmp_path)
+
+    def fail(graph, count):
+        raise AssertionError("selected again")
+    monkeypatch.setattr(cache, "select_landmarks", fail)
+    cached = cache.load_landmarks(save, graph, 2, tmp_path)
+    assert np.array_equal(cached.from_landmark, alt.from_landmark)
+    with pytest.raises(AssertionError):
+        cache.load_landmarks(save, graph, 3, tmp_path)
@@ -0,0 +1,42 @@
+import os
+import numpy as np
+import pytest
+from grasim import layout
+from grasim.savefile import parse_file
+
+@pytest.fixture
+def save(tmp_path):
+    save = tmp_path.joinpath("test.graph")
+    save.write_text("A -1- B\nB -1- C\nC -1- D\nD -1- E\nE -1- A\nSTART A\nEND C\n")
+    return save
+
+def test_layout_is_stored(save, monkeypatch):
+    graph = parse_file(save)
+    points = layout.load_or_compute_layout(save, graph)
+    assert points.shape == (5, 2)
+    assert layout.layout_file(save).exists()
+
+    def fail(num_nodes, edges):
+        raise AssertionError("computed again")
+    monkeypatch.setattr(layout, "compute_layout", fail)
+    assert np.array_equal(layout.load_or_compute_layout(save, graph), points)
+
+def test_changed_save_gets_new_layout(save):
+    layout.load_or_compute_layout(save, parse_file(save))
+    save.write_text("A -1- B\nB -1- C\nSTART A\nEND C\n")
+    assert layout.load_or_compute_layout(save, parse_file(save)).shape == (3, 2)
+
+def test_layout_edges(save):
+    # Both directions of a connection are one edge for the layout
+    assert layout.layout_edges(parse_file(save)).tolist() == [[0, 1], [0, 4], [1, 2], [2, 3], [3, 4]]
+
+def test_failed_store_leaves_no_temporary_file(save, monkeypatch):
+    written = []
+    def fail(source, target):
+        written.append(source)
+        raise OSError("disk full")
+    monkeypatch.setattr(layout.os, "replace", fail)
+    layout.store_layout(save, "digest", np.zeros((5, 2)))
+    # Hidden while it is written, so the save index does not list it
+    assert len(written) == 1 and os.path.basename(written[0]).startswith(".")
+    assert [path.name for path in save.parent.iterdir()] == ["test.graph"]
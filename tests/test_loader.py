@@ -0,0 +1,58 @@
+import pathlib
+import pytest
+from grasim import cache, savefile
+from grasim.errors import ParseError
+from grasim.loader import LevelLoader, LoadCancelled, prefetch
+
+SAVES = pathlib.Path(__file__).parent.parent.joinpath("saves")
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache.config, "CACHE_DIR", tmp_path / "cache")
+
+def write_save(tmp_path, text, name="test.graph"):
+    save = tmp_path / name
+    save.write_text(text)
+    return save
+
+def test_loads_graph_and_layout(tmp_path):
+    save = write_save(tmp_path, (SAVES / "09-sbahn.graph").read_text())
+    level_loader = LevelLoader(save)
+    level = level_loader.result(60)
+    assert level.graph.num_nodes == savefile.parse_file(save).num_nodes
+    assert level.points.shape == (level.graph.num_nodes, 2)
+    assert level.landmarks is None
+    assert level_loader.phase == "done" and level_loader.done_bytes == save.stat().st_size
+
+def test_landmarks_only_without_heuristics(tmp_path):
+    save = write_save(tmp_path, "A -1- B\nB -2- C\nSTART A\nEND C\n")
+    assert LevelLoader(save, landmarks=2).result(60).landmarks.landmarks.shape == (2,)
+    save = write_save(tmp_path, "A(3)\nA -1- B\nB -2- C\nSTART A\nEND C\n", "heuristics.graph")
+    assert LevelLoader(save, landmarks=2).result(60).landmarks is None
+
+def test_parse_progress(tmp_path, monkeypatch):
+    monkeypatch.setattr(savefile, "PROGRESS_LINES", 10)
+    save = write_save(tmp_path, "".join(f"A{i} -1- A{i + 1}\n" for i in range(100)) + "START A0\nEND A100\n")
+    reports = []
+    savefile.parse_file(save, lambda done, total: reports.append((done, total)))
+    size = save.stat().st_size
+    assert len(reports) == 12 and reports[-1] == (size, size)
+    assert [done for done, _ in reports] == sorted(done for done, _ in reports)
+
+def test_cancel(tmp_path, monkeypatch):
+    monkeypatch.setattr(savefile, "PROGRESS_LINES", 1)
+    save = write_save(tmp_path, "".join(f"A{i} -1- A{i + 1}\n" for i in range(1000)) + "START A0\nEND A1000\n")
+    level_loader = LevelLoader(save)
+    level_loader.cancel()
+    with pytest.raises(LoadCancelled):
+        level_loader.result(60)
+
+def test_prefetch(tmp_path):
+    saves = [write_save(tmp_path, "A -1- B\nSTART A\nEND B\n", "a.graph"),
+             write_save(tmp_path, "A -1- B\nSTART A\nEND C\n", "broken.graph"),
+             write_save(tmp_path, "A -1- B\nB -1- C\nSTART A\nEND C\n", "c.graph")]
+    loaded = list(prefetch(saves))
+    assert [save for save, _ in loaded] == saves
+    assert loaded[0][1].graph.num_nodes == 2
+    assert isinstance(loaded[1][1], ParseError)
+    assert loaded[2][1].graph.num_nodes == 3
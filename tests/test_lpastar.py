@@ -0,0 +1,90 @@
+import pathlib
+import numpy as np
+import pytest
+from grasim import graph_generator
+from grasim.savefile import parse_file
+from grasim.dijkstra.dijkstra import extract_path
+from grasim.dijkstra.heap import HeapSearch
+from grasim.dijkstra.lpastar import LPAStar
+from grasim.dijkstra.trace import TracedSearch
+
+SAVES = pathlib.Path(__file__).parent.parent.joinpath("saves")
+
+def heap_distance(graph, dijkstra_mode):
+    search = HeapSearch(graph, dijkstra_mode)
+    while search.dijkstra_table[graph.end_idx, 2] != 1 and search.step():
+        pass
+    return search.dijkstra_table[graph.end_idx, 0], search.expanded
+
+def path_length(graph, path):
+    return sum(graph.edge_weight(idx1, idx2) for idx1, idx2 in zip(path, path[1:]))
+
+def test_set_edge_weight():
+    graph = parse_file(SAVES / "02-Andre_Keller.graph")
+    idx1, idx2 = int(graph.edge_sources()[0]), int(graph.indices[0])
+    old_weight = graph.edge_weight(idx1, idx2)
+    assert graph.set_edge_weight(idx1, idx2, 42) == old_weight
+    assert graph.edge_weight(idx1, idx2) == 42
+    sources, weights = graph.predecessors(idx2)
+    assert weights[sources.tolist().index(idx1)] == 42
+    with pytest.raises(ValueError):
+        graph.set_edge_weight(idx1, idx1, 1)
+
+@pytest.mark.parametrize("dijkstra_mode", [True, False])
+def test_repairs_match_full_search(dijkstra_mode):
+    graph = graph_generator.to_waypoint_graph(graph_generator.generate_graph("grid", 400, 3))
+    search = LPAStar(graph, dijkstra_mode)
+    search.run()
+    expected, full_expanded = heap_distance(graph, dijkstra_mode)
+    assert search.distance() == expected
+
+    rng = np.random.default_rng(0)
+    repaired = 0
+    for i in range(20):
+        path = extract_path(search.dijkstra_table, graph.start_idx, graph.end_idx)
+        if i % 2 == 0 and path is not None:
+            # Mostly edges of the current path, the others rarely change it
+            position = rng.integers(len(path) - 1)
+            idx1, idx2 = path[position], path[position + 1]
+        else:
+            edge = rng.integers(len(graph.indices))
+            idx1, idx2 = int(graph.edge_sources()[edge]), int(graph.indices[edge])
+        weight = graph.edge_weight(idx1, idx2)
+        # Only slower edges keep the heuristic admissible
+        factor = rng.uniform(0.5 if dijkstra_mode else 1, 3)
+        search.update_edge(idx1, idx2, np.inf if i % 5 == 4 else weight * factor)
+        repaired += search.run()
+
+        expected, full_expanded = heap_distance(graph, dijkstra_mode)
+        assert search.distance() == pytest.approx(expected)
+        path = extract_path(search.dijkstra_table, graph.start_idx, graph.end_idx)
+        if expected != np.inf:
+            assert path_length(graph, path) == pytest.approx(expected)
+    assert repaired < 20 * graph.num_nodes / 2
+
+def test_takes_over_heap_search():
+    graph = parse_file(SAVES / "09-sbahn.graph")
+    heap = HeapSearch(graph, False)
+    for _ in range(10):
+        heap.step()
+    search = LPAStar(graph, False, heap.dijkstra_table)
+    search.run()
+    assert search.distance() == heap_distance(graph, False)[0]
+
+def test_traced_update_edge():
+    graph = parse_file(SAVES / "09-sbahn.graph")
+    search = TracedSearch(graph, True)
+    search.seek(search.run_to_end())
+    before = search.dijkstra_table.copy()
+    path = extract_path(search.dijkstra_table, graph.start_idx, graph.end_idx)
+    steps = search.trace.num_steps
+
+    search.update_edge(path[1], path[2], graph.edge_weight(path[1], path[2]) + 100)
+    assert isinstance(search.search, LPAStar)
+    assert search.position == search.trace.num_steps == steps + 1
+    search.seek(search.run_to_end())
+    assert search.dijkstra_table[graph.end_idx, 0] == heap_distance(graph, True)[0]
+
+    # The search before the change can still be replayed
+    search.seek(steps)
+    assert np.array_equal(search.dijkstra_table, before)
@@ -0,0 +1,76 @@
+import json
+import pathlib
+from grasim.savefile import parse_file
+from grasim.dijkstra.heap import HeapSearch
+from grasim.dijkstra.bidirectional import BidirectionalSearch
+from grasim.dijkstra.trace import TracedSearch
+from grasim.profiling import Profiler, HISTORY_FRAMES
+
+SAVES = pathlib.Path(__file__).parent.parent.joinpath("saves")
+
+def test_phases_are_summed_per_frame():
+    profiler = Profiler()
+    for _ in range(3):
+        with profiler.phase("nodes"):
+            pass
+    with profiler.phase("text"):
+        pass
+    frame = profiler.end_frame()
+    assert set(frame["phases"]) == {"nodes", "text"}
+    assert frame["time"] >= sum(frame["phases"].values())
+    assert profiler.phases == {}
+
+def test_hooks_and_history():
+    profiler = Profiler()
+    frames = []
+    profiler.add_hook(frames.append)
+    for i in range(HISTORY_FRAMES + 5):
+        profiler.set_counters(expanded=i)
+        profiler.end_frame()
+    assert len(frames) == HISTORY_FRAMES + 5
+    assert frames[-1]["counters"] == {"expanded": HISTORY_FRAMES + 4}
+    assert len(profiler.history) == HISTORY_FRAMES
+
+    profiler.remove_hook(frames.append)
+    profiler.end_frame()
+    assert len(frames) == HISTORY_FRAMES + 5
+    assert profiler.summary()[0].startswith("frame")
+
+def test_recording_and_chrome_trace(tmp_path):
+    profiler = Profiler()
+    profiler.end_frame() # not recorded
+    profiler.start_recording()
+    for _ in range(2):
+        with profiler.phase("search"):
+            pass
+        profiler.set_counters(frontier=4)
+        profiler.end_frame()
+    frames = profiler.stop_recording()
+    assert len(frames) == 2 and not profiler.recording
+
+    profiler.write_json(frames, tmp_path / "profile.json")
+    written = json.loads((tmp_path / "profile.json").read_text())
+    assert [list(frame["phases"]) for frame in written] == [["search"], ["search"]]
+
+    profiler.write_chrome_trace(frames, tmp_path / "profile.trace.json")
+    events = json.loads((tmp_path / "profile.trace.json").read_text())["traceEvents"]
+    assert [event["name"] for event in events] == ["frame", "search", "search"] * 2
+    assert [event["ph"] for event in events] == ["X", "X", "C"] * 2
+    assert events[2]["args"] == {"frontier": 4}
+
+def test_search_counters():
+    graph = parse_file(SAVES.joinpath("09-sbahn.graph"))
+    heap = HeapSearch(graph, True)
+    bidirectional = BidirectionalSearch(graph, True)
+    traced = TracedSearch(graph, True)
+    for search in (heap, bidirectional):
+        while search.step():
+            pass
+    traced.run_to_end()
+    traced.seek(3)
+
+    assert heap.counters()["expanded"] == graph.num_nodes
+    assert heap.counters()["relaxed"] >= graph.num_nodes - 1
+    assert heap.counters()["frontier"] == 0
+    assert bidirectional.counters()["expanded"] == bidirectional.expanded
+    assert traced.counters() == {**heap.counters(), "position": 3, "recorded": traced.trace.num_steps}
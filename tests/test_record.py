@@ -0,0 +1,40 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pathlib
+import sys
+import pytest
+import grasim.config as config
+from grasim.record import RecordError, frame_steps, record_search
+
+SAVES = pathlib.Path(__file__).parent.parent.joinpath("saves")
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CACHE_DIR", str(tmp_path / "cache"))
+
+def test_frame_steps():
+    assert frame_steps(5, 100).tolist() == [1, 2, 3, 4, 5]
+    steps = frame_steps(1000, 10)
+    assert len(steps) == 10 and (steps[0], steps[-1]) == (1, 1000)
+    assert frame_steps(0, 10).tolist() == [1]
+
+@pytest.mark.parametrize("dijkstra_mode, bidirectional", [(False, False), (True, True)])
+def test_png_frames(tmp_path, dijkstra_mode, bidirectional):
+    output = tmp_path / "frames"
+    result = record_search(SAVES / "09-sbahn.graph", output, dijkstra_mode, bidirectional, size=(320, 200), max_frames=8)
+    assert result["frames"] == min(8, result["steps"])
+    files = sorted(output.iterdir())
+    assert [file.name for file in files] == [f"frame_{i:05d}.png" for i in range(result["frames"])]
+    assert all(file.stat().st_size > 0 for file in files)
+
+def test_gif(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    output = tmp_path / "search.gif"
+    result = record_search(SAVES / "09-sbahn.graph", output, size=(320, 200), max_frames=5)
+    with Image.open(output) as gif:
+        assert (gif.size, gif.n_frames) == ((320, 200), result["frames"])
+
+def test_gif_without_pillow(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "PIL", None) # import PIL raises ImportError
+    with pytest.raises(RecordError, match="Pillow"):
+        record_search(SAVES / "09-sbahn.graph", tmp_path / "search.gif")
@@ -0,0 +1,87 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pathlib
+from types import SimpleNamespace
+import numpy as np
+import pygame
+import pytest
+import grasim.config as config
+from grasim.dijkstra.heap import HeapSearch
+from grasim.dijkstra.bidirectional import BidirectionalSearch
+from grasim.dijkstra.trace import TracedSearch
+from grasim.renderer import LevelRenderer, reverse_edges
+from grasim.savefile import parse_file, parse_text
+from grasim.textcache import TextCache
+
+SAVES = pathlib.Path(__file__).parent.parent.joinpath("saves")
+
+@pytest.fixture(scope="module")
+def game():
+    pygame.init()
+    font = pygame.font.Font(pygame.font.get_default_font(), config.FONT_SIZE)
+    yield SimpleNamespace(screen=pygame.display.set_mode((1280, 720)), text_cache=TextCache(font))
+    pygame.quit()
+
+@pytest.mark.parametrize("engine", [HeapSearch, BidirectionalSearch])
+@pytest.mark.parametrize("save", ["03-class_slides_03.24.graph", "09-sbahn.graph"])
+def test_changes_match_full_redraw(game, save, engine):
+    graph = parse_file(SAVES.joinpath(save))
+    points = np.random.default_rng(0).random((graph.num_nodes, 2)) * [1200, 650] + 40
+    search = engine(graph, dijkstra_mode=False)
+    renderer = LevelRenderer(game, graph, points, dijkstra_mode=False)
+    renderer.draw(search.dijkstra_table, 0)
+
+    counter = 0
+    while search.step():
+        counter += 1
+        renderer.draw_changes(search.dijkstra_table, counter, search.touched)
+        changed = pygame.surfarray.array3d(game.screen)
+        renderer.draw(search.dijkstra_table, counter)
+        assert np.array_equal(changed, pygame.surfarray.array3d(game.screen)), f"step {counter}"
+
+def test_rewind_matches_full_redraw(game):
+    graph = parse_file(SAVES.joinpath("09-sbahn.graph"))
+    points = np.random.default_rng(0).random((graph.num_nodes, 2)) * [1200, 650] + 40
+    search = TracedSearch(graph, dijkstra_mode=False)
+    search.run_to_end()
+    renderer = LevelRenderer(game, graph, points, dijkstra_mode=False)
+    renderer.draw(search.dijkstra_table, 0)
+
+    for step in [5, 10, 9, 3, 4, 2, 1, 0]:
+        search.seek(step)
+        renderer.draw_changes(search.dijkstra_table, step, search.touched)
+        changed = pygame.surfarray.array3d(game.screen)
+        renderer.draw(search.dijkstra_table, step)
+        assert np.array_equal(changed, pygame.surfarray.array3d(game.screen)), f"step {step}"
+
+def test_reverse_edges():
+    graph = parse_text("A -1- B\nB -2-> C\nC -3-> A\nA -4-> C\nSTART A\nEND C\n".split("\n"))
+    sources = graph.edge_sources()
+    reverse = reverse_edges(sources, graph.indices, graph.num_nodes)
+    for edge, back in enumerate(reverse.tolist()):
+        idx1, idx2 = int(sources[edge]), int(graph.indices[edge])
+        if back == -1:
+            assert graph.edge_weight(idx2, idx1) == -1
+        else:
+            assert (sources[back], graph.indices[back]) == (idx2, idx1)
+    assert len(reverse_edges(sources[:0], graph.indices[:0], 3)) == 0
+
+def test_message_is_shown_until_it_times_out(game):
+    graph = parse_file(SAVES.joinpath("09-sbahn.graph"))
+    points = np.random.default_rng(0).random((graph.num_nodes, 2)) * [1200, 650] + 40
+    search = HeapSearch(graph, dijkstra_mode=False)
+    renderer = LevelRenderer(game, graph, points, dijkstra_mode=False)
+    renderer.draw(search.dijkstra_table, 0)
+    without_message = pygame.surfarray.array3d(game.screen)
+    assert not renderer.message_changed()
+
+    renderer.set_message("Exported 3 steps")
+    assert renderer.message_changed()
+    renderer.draw(search.dijkstra_table, 0)
+    assert not renderer.message_changed()
+    assert not np.array_equal(without_message, pygame.surfarray.array3d(game.screen))
+
+    renderer.message_until = 0 # timed out
+    assert renderer.message_changed() and renderer.message is None
+    renderer.draw(search.dijkstra_table, 0)
+    assert np.array_equal(without_message, pygame.surfarray.array3d(game.screen))
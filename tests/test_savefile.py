@@ -1,5 +1,7 @@
-from grasim.savefile import parse_text
+from grasim.savefile import parse_file, parse_text
+from grasim.errors import ParseError
 import numpy as np
+import pytest
 
 def test_minimal():
     graph = parse_text(
@@ -19,7 +21,7 @@ START A
 END B
         """.split("\n")
     )
-    assert (graph.graph_matrix == np.array([[-1, -1], [1, -1]])).all()
+    assert (graph.graph_matrix == np.array([[-1, 1], [-1, -1]])).all()
 
 def test_minimal_directed_right():
     graph = parse_text(
@@ -29,7 +31,7 @@ START A
 END B
         """.split("\n")
     )
-    assert (graph.graph_matrix == np.array([[-1, 1], [-1, -1]])).all(), graph.graph_matrix
+    assert (graph.graph_matrix == np.array([[-1, -1], [1, -1]])).all(), graph.graph_matrix
 
 def test_minimal_directed_seperate_double():
     graph = parse_text(
@@ -40,4 +42,60 @@ START A
 END B
         """.split("\n")
     )
-    assert (graph.graph_matrix == np.array([[-1, 1], [2, -1]])).all(), graph.graph_matrix
\ No newline at end of file
+    assert (graph.graph_matrix == np.array([[-1, 1], [2, -1]])).all(), graph.graph_matrix
+
+def test_sparse_rows():
+    graph = parse_text(
+        """
+A -1- B
+A -2-> C
+C -3-> B
+START A
+END B
+        """.split("\n")
+    )
+    # Nodes are numbered in order of appearance
+    assert list(graph.node_lookup.values()) == [0, 1, 2]
+    assert graph.indptr.tolist() == [0, 2, 3, 4]
+    assert graph.indices.tolist() == [1, 2, 0, 1]
+    assert graph.weights.tolist() == [1, 2, 1, 3]
+    # Incoming edges
+    assert graph.rev_indptr.tolist() == [0, 1, 3, 4]
+    assert graph.rev_indices.tolist() == [1, 0, 2, 0]
+    assert graph.rev_weights.tolist() == [1, 1, 3, 2]
+    assert graph.edge_weight(2, 1) == 3
+    assert graph.edge_weight(1, 2) == -1
+
+def test_ambiguous_edges():
+    with pytest.raises(ParseError):
+        parse_text(
+            """
+A -1- B
+A -2-> B
+START A
+END B
+            """.split("\n")
+        )
+
+def test_error_line_number():
+    with pytest.raises(ParseError) as error:
+        parse_text(
+            """# comment
+A -1- B
+B -2- C
+A -3-> B
+START A
+END C
+            """.split("\n")
+        )
+    assert error.value.lineno == 4
+
+def test_parse_file(tmp_path):
+    save = tmp_path.joinpath("test.graph")
+    save.write_text("A(3)\nB(1)\nA -1- B\nB <-2-> C\nC -4-> D\n\nSTART A\nEND D\n")
+    graph = parse_file(save)
+    assert graph.node_names == ["A", "B", "C", "D"]
+    assert graph.heuristics.tolist() == [3, 1, 0, 0]
+    assert graph.indptr.tolist() == [0, 1, 3, 5, 5]
+    assert graph.indices.tolist() == [1, 0, 2, 1, 3]
+    assert (graph.start_idx, graph.end_idx) == (0, 3)
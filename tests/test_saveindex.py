@@ -0,0 +1,84 @@
+import os
+import pathlib
+import time
+from grasim import saveindex
+from grasim.saveindex import SaveIndex
+
+SAVES = pathlib.Path(__file__).parent.parent.joinpath("saves")
+
+def write_save(path : pathlib.Path, text : str, mtime_ns : int):
+    path.write_text(text)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+def test_describes_saves(tmp_path):
+    savedir = tmp_path / "saves"
+    savedir.mkdir()
+    (savedir / "sub").mkdir()
+    (savedir / ".hidden.graph.layout.npz").write_bytes(b"")
+    write_save(savedir / "a.graph", (SAVES / "02-Andre_Keller.graph").read_text(), 10**18)
+    write_save(savedir / "broken.graph", "A -1- B\nSTART A\nEND C\n", 10**18)
+
+    index = SaveIndex(savedir, tmp_path / "cache")
+    assert index.wait(30)
+    entries = {info.name: info for info in index.entries()}
+    assert list(entries) == ["a.graph", "broken.graph", "sub"]
+    assert entries["sub"].is_dir
+    assert entries["a.graph"].ok and (entries["a.graph"].num_nodes, entries["a.graph"].num_edges) == (5, 10)
+    assert (entries["a.graph"].start, entries["a.graph"].end) == ("A", "Z")
+    assert entries["a.graph"].size == (savedir / "a.graph").stat().st_size
+    assert not entries["broken.graph"].ok and entries["broken.graph"].error.startswith("line")
+
+def test_only_changed_saves_are_parsed_again(tmp_path, monkeypatch):
+    savedir = tmp_path / "saves"
+    savedir.mkdir()
+    write_save(savedir / "a.graph", "A -1- B\nSTART A\nEND B\n", 10**18)
+    write_save(savedir / "b.graph", "A -1- B\nSTART A\nEND B\n", 10**18)
+    SaveIndex(savedir, tmp_path / "cache").wait(30)
+
+    described = []
+    describe_save = saveindex.describe_save
+    monkeypatch.setattr(saveindex, "describe_save", lambda path, *args: described.append(path.name) or describe_save(path, *args))
+
+    # Stored between runs
+    index = SaveIndex(savedir, tmp_path / "cache")
+    assert index.pending() == 0 and index.wait(30)
+    assert described == []
+
+    write_save(savedir / "b.graph", "A -1- B\nB -2- C\nSTART A\nEND C\n", 2 * 10**18)
+    write_save(savedir / "c.graph", "X -1- Y\nSTART X\nEND Y\n", 10**18)
+    (savedir / "a.graph").unlink()
+    index.refresh()
+    assert index.wait(30)
+    assert sorted(described) == ["b.graph", "c.graph"]
+    assert [(info.name, info.num_nodes) for info in index.entries()] == [("b.graph", 3), ("c.graph", 2)]
+    assert [info.name for info in SaveIndex(savedir, tmp_path / "cache").entries()] == ["b.graph", "c.graph"]
+
+def test_wait_returns_after_the_index_is_written(tmp_path, monkeypatch):
+    savedir = tmp_path / "saves"
+    savedir.mkdir()
+    write_save(savedir / "a.graph", "A -1- B\nSTART A\nEND B\n", 10**18)
+    save = SaveIndex.save
+    monkeypatch.setattr(SaveIndex, "save", lambda self: time.sleep(0.5) or save(self))
+
+    index = SaveIndex(savedir, tmp_path / "cache")
+    time.sleep(0.1) # the save is described, the index is being written
+    assert index.wait(30)
+    assert index.file.exists()
+
+def test_saves_removed_during_the_scan_are_skipped(tmp_path, monkeypatch):
+    savedir = tmp_path / "saves"
+    savedir.mkdir()
+    write_save(savedir / "a.graph", "A -1- B\nSTART A\nEND B\n", 10**18)
+    write_save(savedir / "b.graph", "A -1- B\nSTART A\nEND B\n", 10**18)
+    scanned = list(os.scandir(savedir))
+    (savedir / "b.graph").unlink()
+    monkeypatch.setattr(saveindex.os, "scandir", lambda directory: iter(scanned))
+
+    index = SaveIndex(savedir, tmp_path / "cache")
+    assert index.wait(30)
+    assert [info.name for info in index.entries()] == ["a.graph"]
+
+def test_summary():
+    info = saveindex.SaveInfo("a.graph", False, 2048, 0)
+    assert info.summary() == "2 KB, indexing..."
+    assert saveindex.SaveInfo("a", True, 0, 0).summary() == "directory"
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import os
+import pathlib
+import shutil
+import pytest
+import grasim.config as config
+from grasim import cache, graph_generator, importers
+from grasim.batch import solve_file
+from grasim.server import QueryServer, ResultCache, load_test, open_connection, request
+
+SAVES = pathlib.Path(__file__).parent.parent.joinpath("saves")
+
+@pytest.fixture
+def directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CACHE_DIR", str(tmp_path / "cache"))
+    directory = tmp_path / "saves"
+    directory.mkdir()
+    shutil.copy(SAVES / "09-sbahn.graph", directory)
+    (directory / "line.graph").write_text("A -1- B\nB -1- C\nSTART A\nEND C\n")
+    return directory
+
+def serve(directory, client, **options):
+    """Run client(port, server) against a server on a free port"""
+    async def main():
+        server = QueryServer(directory, workers=2, **options)
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            async with listener:
+                return await client(port, server)
+        finally:
+            server.close()
+    return asyncio.run(main())
+
+def test_query_and_cache(directory):
+    async def client(port, server):
+        reader, writer = await open_connection(port=port)
+        answers = [await request(reader, writer, {"graph": "09-sbahn.graph", "algorithm": algorithm})
+                   for algorithm in ["dijkstra", "dijkstra", "astar"]]
+        writer.close()
+        await writer.wait_closed()
+        return answers
+    dijkstra, cached, astar = serve(directory, client)
+    expected = solve_file(str(directory / "09-sbahn.graph"), True)
+    assert (dijkstra["path"], dijkstra["cost"], dijkstra["cached"]) == (expected["path"], expected["cost"], False)
+    assert cached == {**dijkstra, "cached": True}
+    # To END A* uses the heuristics of the file, like grasim solve
+    assert astar["cost"] == solve_file(str(directory / "09-sbahn.graph"), False)["cost"]
+
+def test_changed_file_is_loaded_again(directory):
+    async def client(port, server):
+        reader, writer = await open_connection(port=port)
+        query = {"graph": "line.graph", "start": "B", "end": "A"}
+        first = await request(reader, writer, query)
+        stat = os.stat(directory / "line.graph")
+        (directory / "line.graph").write_text("A -5- B\nB -1- C\nSTART A\nEND C\n")
+        os.utime(directory / "line.graph", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        second = await request(reader, writer, query)
+        writer.close()
+        await writer.wait_closed()
+        return first, second, len(server.results.entries)
+    first, second, entries = serve(directory, client)
+    assert (first["cost"], first["path"]) == (1, ["B", "A"])
+    assert (second["cost"], second["cached"]) == (5, False)
+    assert entries == 1
+
+def test_slow_query_does_not_block(directory):
+    with open(directory / "grid.graph", "w") as f:
+        graph_generator.write_graph_text(graph_generator.generate_graph("grid", 20000, 1), f)
+    async def client(port, server):
+        reader, writer = await open_connection(port=port)
+        await request(reader, writer, {"graph": "grid.graph", "start": "n0", "end": "n0"}) # load it
+        writer.write(b'{"graph": "grid.graph", "algorithm": "dijkstra", "id": "slow"}\n'
+                     b'{"graph": "line.graph", "id": "fast"}\n')
+        order = [json.loads(await reader.readline())["id"] for _ in range(2)]
+        writer.close()
+        await writer.wait_closed()
+        return order
+    assert serve(directory, client) == ["fast", "slow"]
+
+def test_errors(directory):
+    async def client(port, server):
+        reader, writer = await open_connection(port=port)
+        answers = [await request(reader, writer, message) for message in [
+            {"graph": "../09-sbahn.graph"}, {"graph": "missing.graph"}, {"graph": "line.graph", "end": "X", "id": 7},
+            {"graph": "line.graph", "algorithm": "bfs"}, {"op": "unknown"}, [1]]]
+        writer.write(b"{\n")
+        answers.append(await reader.readline())
+        writer.close()
+        await writer.wait_closed()
+        return answers
+    answers = serve(directory, client)
+    assert all("error" in answer for answer in answers[:-1])
+    assert answers[2]["id"] == 7
+    assert b"Invalid JSON" in answers[-1]
+
+def test_malformed_requests_are_answered(directory, monkeypatch):
+    (directory / "r.gr").write_text("p sp 3 2\na 1 2 1\na 2 3 1\n")
+    cache.write_compiled(importers.read_dimacs(directory / "r.gr", 1, 3), directory / "r.npz")
+    async def client(port, server):
+        reader, writer = await open_connection(port=port)
+        answers = [await request(reader, writer, {"graph": "r.npz", "start": 2}),
+                   await request(reader, writer, {"graph": "r.npz", "start": "2"})]
+        async def broken(request):
+            raise RuntimeError("broken")
+        monkeypatch.setattr(server, "query", broken)
+        answers.append(await request(reader, writer, {"graph": "r.npz", "id": 1}))
+        writer.close()
+        await writer.wait_closed()
+        return answers
+    integer, name, broken = serve(directory, client)
+    assert "strings" in integer["error"]
+    assert (name["path"], name["cost"]) == (["2", "3"], 1)
+    assert broken == {"error": "Internal error: RuntimeError: broken", "id": 1}
+
+def test_load_test(directory):
+    async def client(port, server):
+        return await load_test("09-sbahn.graph", 200, 4, seed=1, port=port)
+    result = serve(directory, client, landmarks=4)
+    assert result["queries"] == 200 and result["errors"] == 0 and result["cached"] > 0
+
+def test_result_cache():
+    results = ResultCache(2)
+    results.put(("a", 1), {"cost": 1})
+    results.put(("b", 1), {"cost": 2})
+    assert results.get(("a", 1)) == {"cost": 1}
+    results.put(("b", 2), {"cost": 3}) # drops ("b", 1), it was used last longest ago
+    assert results.get(("b", 1)) is None
+    results.invalidate("a")
+    assert list(results.entries) == [("b", 2)]
+    assert (results.hits, results.misses) == (1, 1)
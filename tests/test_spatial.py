@@ -0,0 +1,21 @@
+import numpy as np
+from grasim.spatial import GridIndex
+
+def test_query_matches_brute_force():
+    rng = np.random.default_rng(0)
+    corners = rng.random((2000, 2)) * 1000
+    sizes = rng.exponential(10, (2000, 2))
+    sizes[:20] *= 50 # some boxes span many cells
+    bounds = np.column_stack((corners, corners + sizes))
+    index = GridIndex(bounds)
+
+    for x0, y0, w, h in rng.random((50, 4)) * [1000, 1000, 300, 300]:
+        x1, y1 = x0 + w, y0 + h
+        expected = np.where((bounds[:, 0] <= x1) & (bounds[:, 2] >= x0) & (bounds[:, 1] <= y1) & (bounds[:, 3] >= y0))[0]
+        assert np.array_equal(index.query(x0, y0, x1, y1), expected)
+
+def test_points_and_empty():
+    index = GridIndex(np.array([[1, 1, 1, 1], [5, 5, 5, 5]]))
+    assert index.query(0, 0, 2, 2).tolist() == [0]
+    assert index.query(-10, -10, 10, 10).tolist() == [0, 1]
+    assert GridIndex(np.zeros((0, 4))).query(0, 0, 1, 1).tolist() == []
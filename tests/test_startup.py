@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+import pytest
+
+# Import time of the grasim modules themselves (numpy not included), in seconds
+IMPORT_TIME_BUDGET = 0.3
+HEAVY_MODULES = {"pygame", "igraph", "multiprocessing", "concurrent.futures.process"}
+
+def import_times(module : str) -> dict[str, float]:
+    """Cumulative import time in seconds of every module imported by a fresh interpreter importing module"""
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True).stderr
+    times = {}
+    for line in output.splitlines()[1:]:
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+@pytest.mark.parametrize("module", ["grasim.__main__", "grasim.batch", "grasim.cache", "grasim.loader", "grasim.dijkstra.heap"])
+def test_headless_import(module):
+    times = import_times(module)
+    assert not HEAVY_MODULES & times.keys()
+    assert times[module] - times.get("numpy", 0) < IMPORT_TIME_BUDGET
+
+def test_import_game_opens_no_window():
+    code = "import grasim.game, pygame; assert not pygame.display.get_init()"
+    subprocess.run([sys.executable, "-c", code], check=True, env={**os.environ, "SDL_VIDEODRIVER": "dummy"})
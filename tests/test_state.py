@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from grasim import graph_generator
+from grasim.dijkstra.dijkstra import extract_path, init_dijkstra_table
+from grasim.dijkstra.heap import HeapSearch
+from grasim.dijkstra.state import SearchState, SearchStatePool, search
+
+@pytest.fixture(scope="module")
+def graph():
+    return graph_generator.to_waypoint_graph(graph_generator.generate_graph("knn", 2000, 5))
+
+def heap_query(graph, start_idx, end_idx):
+    heap = HeapSearch(graph, True, init_dijkstra_table(graph.num_nodes, start_idx))
+    while heap.dijkstra_table[end_idx, 2] != 1 and heap.step():
+        pass
+    return heap.dijkstra_table[end_idx, 0], heap.expanded
+
+def queries(graph, count):
+    rng = np.random.default_rng(1)
+    return rng.integers(graph.num_nodes, size=(count, 2)).tolist()
+
+def test_reused_state_matches_heap(graph):
+    state = SearchState(graph.num_nodes)
+    assert state.nbytes < init_dijkstra_table(graph.num_nodes, 0).nbytes
+    for start_idx, end_idx in queries(graph, 20):
+        expected, expanded = heap_query(graph, start_idx, end_idx)
+        assert search(graph, state, start_idx, end_idx) == expected
+        assert state.expanded == expanded
+        path = state.path(start_idx, end_idx)
+        assert path == extract_path(state.to_dijkstra_table(), start_idx, end_idx)
+        assert sum(graph.edge_weight(a, b) for a, b in zip(path, path[1:])) == pytest.approx(expected)
+
+def test_astar(graph):
+    state = SearchState(graph.num_nodes)
+    dijkstra_state = SearchState(graph.num_nodes)
+    # Straight line distance to END, admissible on generated graphs
+    distance = search(graph, state, graph.start_idx, graph.end_idx, graph.heuristics)
+    assert distance == search(graph, dijkstra_state, graph.start_idx, graph.end_idx)
+    assert state.expanded < dijkstra_state.expanded
+
+def test_generation_wraps(graph):
+    state = SearchState(graph.num_nodes)
+    search(graph, state, 0, 1)
+    state.generation = np.iinfo(np.uint32).max
+    state.stamp[:5] = 1 # would look reached in generation 1
+    state.reset()
+    assert state.generation == 1 and not state.reached().any()
+    assert state.path(0, 1) is None
+
+def test_pool_from_threads(graph):
+    pool = SearchStatePool(graph, max_states=3)
+    pairs = queries(graph, 40)
+    expected = [pool.query(start_idx, end_idx) for start_idx, end_idx in pairs]
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda pair: pool.query(*pair), pairs))
+    assert results == expected
+    assert pool.created <= 3
@@ -0,0 +1,41 @@
+from grasim.textcache import TextCache
+
+class FakeSurface:
+    def __init__(self, text):
+        self.text = text
+
+    def get_pitch(self):
+        return 4 * len(self.text)
+
+    def get_height(self):
+        return 10
+
+class FakeFont:
+    def __init__(self):
+        self.rendered = []
+
+    def render(self, text, antialias, color, background=None):
+        self.rendered.append(text)
+        return FakeSurface(text)
+
+def test_rendered_once():
+    font = FakeFont()
+    text_cache = TextCache(font)
+    first = text_cache.render("12", False, "black")
+    assert text_cache.render("12", False, "black") is first
+    text_cache.render("12", False, "black", "white")
+    assert font.rendered == ["12", "12"]
+    assert (text_cache.hits, text_cache.misses) == (1, 2)
+
+def test_least_recently_used_is_dropped():
+    font = FakeFont()
+    text_cache = TextCache(font, max_bytes=2 * 4 * 2 * 10)
+    text_cache.render("aa", False, "black")
+    text_cache.render("bb", False, "black")
+    text_cache.render("aa", False, "black")
+    text_cache.render("cc", False, "black")
+    assert text_cache.stats()["entries"] == 2
+    assert text_cache.stats()["bytes"] == 160
+    text_cache.render("aa", False, "black")
+    text_cache.render("bb", False, "black")
+    assert font.rendered == ["aa", "bb", "cc", "bb"]
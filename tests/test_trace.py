@@ -0,0 +1,50 @@
+import pathlib
+import numpy as np
+import pytest
+from grasim.savefile import parse_file
+from grasim.dijkstra.heap import HeapSearch
+from grasim.dijkstra.trace import SearchTrace, TracedSearch, record_trace
+
+SAVES = pathlib.Path(__file__).parent.parent.joinpath("saves")
+
+def heap_tables(graph, dijkstra_mode):
+    """The table after every step of a HeapSearch"""
+    search = HeapSearch(graph, dijkstra_mode)
+    tables = [search.dijkstra_table.copy()]
+    while search.step():
+        tables.append(search.dijkstra_table.copy())
+    return tables
+
+@pytest.mark.parametrize("save", ["02-Andre_Keller.graph", "03-class_slides_03.24.graph", "09-sbahn.graph"])
+def test_seek_matches_search(save):
+    graph = parse_file(SAVES.joinpath(save))
+    tables = heap_tables(graph, False)
+    search = TracedSearch(graph, False)
+    assert search.run_to_end() == len(tables) - 1
+
+    rng = np.random.default_rng(0)
+    for step in [len(tables) - 1, 0, *rng.integers(0, len(tables), 20)]:
+        search.seek(step)
+        assert np.array_equal(search.dijkstra_table, tables[step])
+
+def test_steps_back_and_forth():
+    graph = parse_file(SAVES.joinpath("03-class_slides_03.24.graph"))
+    tables = heap_tables(graph, True)
+    search = TracedSearch(graph, True)
+    assert search.step() and search.step()
+    search.seek(1)
+    assert np.array_equal(search.dijkstra_table, tables[1])
+    assert search.touched # the rows of step 2 were undone
+    while search.step():
+        pass
+    assert search.position == len(tables) - 1 and search.finished
+    assert np.array_equal(search.dijkstra_table, tables[-1])
+
+def test_save_and_load(tmp_path):
+    graph = parse_file(SAVES.joinpath("03-class_slides_03.24.graph"))
+    trace = record_trace(graph, False)
+    trace.save(tmp_path.joinpath("trace.npz"))
+    loaded = SearchTrace.load(tmp_path.joinpath("trace.npz"))
+    assert loaded.num_steps == trace.num_steps
+    assert loaded.expanded(1) == graph.start_idx
+    assert np.array_equal(loaded.table_at(loaded.num_steps), trace.table_at(trace.num_steps))